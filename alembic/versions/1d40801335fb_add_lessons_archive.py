@@ -0,0 +1,62 @@
+"""Add lessons archive
+
+Revision ID: 1d40801335fb
+Revises: 5a376452c704
+Create Date: 2026-10-19 02:26:44.048914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1d40801335fb'
+down_revision: Union[str, Sequence[str], None] = '5a376452c704'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('lessons_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('teacher_id', sa.Integer(), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('scheduled_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('duration_minutes', sa.Integer(), nullable=True),
+    sa.Column('instrument', sa.String(), nullable=True),
+    sa.Column('lesson_type', sa.String(), nullable=True),
+    sa.Column('status', postgresql.ENUM('SCHEDULED', 'COMPLETED', 'CANCELLED', 'RESCHEDULED', name='lessonstatus', create_type=False), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('instructor_notes', sa.Text(), nullable=True),
+    sa.Column('admin_notes', sa.Text(), nullable=True),
+    sa.Column('cost', sa.Float(), nullable=True),
+    sa.Column('location', sa.String(), nullable=True),
+    sa.Column('room_number', sa.String(), nullable=True),
+    sa.Column('materials_needed', sa.Text(), nullable=True),
+    sa.Column('homework_assigned', sa.Text(), nullable=True),
+    sa.Column('progress_notes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('archived_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_lessons_archive_scheduled_at'), 'lessons_archive', ['scheduled_at'], unique=False)
+    op.create_index('ix_lessons_archive_teacher_scheduled', 'lessons_archive', ['teacher_id', 'scheduled_at'], unique=False)
+    op.create_index('ix_lessons_archive_student_scheduled', 'lessons_archive', ['student_id', 'scheduled_at'], unique=False)
+    op.create_index('ix_lessons_status_scheduled', 'lessons', ['status', 'scheduled_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_lessons_status_scheduled', table_name='lessons')
+    op.drop_index('ix_lessons_archive_student_scheduled', table_name='lessons_archive')
+    op.drop_index('ix_lessons_archive_teacher_scheduled', table_name='lessons_archive')
+    op.drop_index(op.f('ix_lessons_archive_scheduled_at'), table_name='lessons_archive')
+    op.drop_table('lessons_archive')
@@ -0,0 +1,39 @@
+"""Give lessons_archive its own primary key
+
+Revision ID: 8b1f3c6d9e42
+Revises: f4c8d2a61b07
+Create Date: 2026-10-19 14:12:40.331907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b1f3c6d9e42'
+down_revision: Union[str, Sequence[str], None] = 'f4c8d2a61b07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLite hands a deleted lesson's id to the next lesson, so the archive cannot key on it
+    op.add_column('lessons_archive', sa.Column('lesson_id', sa.Integer(), nullable=True))
+    op.execute('UPDATE lessons_archive SET lesson_id = id')
+    with op.batch_alter_table('lessons_archive') as batch_op:
+        batch_op.alter_column('lesson_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_index(batch_op.f('ix_lessons_archive_lesson_id'), ['lesson_id'], unique=False)
+    if op.get_bind().dialect.name == 'postgresql':
+        # Existing rows took the lessons' ids, so move the serial past them
+        op.execute("SELECT setval(pg_get_serial_sequence('lessons_archive', 'id'), "
+                   "COALESCE((SELECT MAX(id) FROM lessons_archive), 0) + 1, false)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('lessons_archive') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_lessons_archive_lesson_id'))
+        batch_op.drop_column('lesson_id')
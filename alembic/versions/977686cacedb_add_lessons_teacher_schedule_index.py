@@ -0,0 +1,28 @@
+"""Add lessons teacher schedule index
+
+Revision ID: 977686cacedb
+Revises: 5d85c43c57e3
+Create Date: 2026-10-19 03:08:24.949834
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '977686cacedb'
+down_revision: Union[str, Sequence[str], None] = '5d85c43c57e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_lessons_teacher_scheduled', 'lessons', ['teacher_id', 'scheduled_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_lessons_teacher_scheduled', table_name='lessons')
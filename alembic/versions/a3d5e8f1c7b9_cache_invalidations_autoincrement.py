@@ -0,0 +1,35 @@
+"""Never reuse cache invalidation ids on SQLite
+
+Revision ID: a3d5e8f1c7b9
+Revises: 8b1f3c6d9e42
+Create Date: 2026-10-19 14:48:05.902316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d5e8f1c7b9'
+down_revision: Union[str, Sequence[str], None] = '8b1f3c6d9e42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Listeners skip ids at or below the last one they saw; without AUTOINCREMENT an
+    # emptied table starts again at 1. PostgreSQL sequences never go back.
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('cache_invalidations', recreate='always',
+                                  table_kwargs={'sqlite_autoincrement': True}):
+            pass
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('cache_invalidations', recreate='always'):
+            pass
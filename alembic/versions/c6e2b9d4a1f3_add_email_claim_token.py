@@ -0,0 +1,28 @@
+"""Add email outbox claim token
+
+Revision ID: c6e2b9d4a1f3
+Revises: a3d5e8f1c7b9
+Create Date: 2026-10-19 15:20:44.117520
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6e2b9d4a1f3'
+down_revision: Union[str, Sequence[str], None] = 'a3d5e8f1c7b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('email_outbox', sa.Column('claimed_by', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('email_outbox', 'claimed_by')
@@ -0,0 +1,32 @@
+"""Add version columns
+
+Revision ID: e7a2b5c81f39
+Revises: c3e91f0d7a24
+Create Date: 2026-10-19 05:02:17.518240
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a2b5c81f39'
+down_revision: Union[str, Sequence[str], None] = 'c3e91f0d7a24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('version_id', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('lessons', sa.Column('version_id', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('lessons_archive', sa.Column('version_id', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('lessons_archive', 'version_id')
+    op.drop_column('lessons', 'version_id')
+    op.drop_column('users', 'version_id')
@@ -0,0 +1,79 @@
+"""Add instructor roles
+
+Revision ID: f4c8d2a61b07
+Revises: e7a2b5c81f39
+Create Date: 2026-10-19 09:31:07.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c8d2a61b07'
+down_revision: Union[str, Sequence[str], None] = 'e7a2b5c81f39'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The catalog previously hardcoded in the admin API
+DEFAULT_ROLES = [
+    ('piano', 'Piano Instructor', 'Piano', 'Teaches piano lessons for all skill levels'),
+    ('guitar', 'Guitar Instructor', 'Guitar', 'Teaches acoustic and electric guitar'),
+    ('violin', 'Violin Instructor', 'Violin', 'Teaches violin for beginners to advanced'),
+    ('drums', 'Drum Instructor', 'Drums', 'Teaches drum kit and percussion'),
+    ('voice', 'Voice Coach', 'Voice', 'Vocal training and singing lessons'),
+    ('saxophone', 'Saxophone Instructor', 'Saxophone', 'Teaches alto, tenor, and soprano saxophone'),
+    ('trumpet', 'Trumpet Instructor', 'Trumpet', 'Brass instrument instruction'),
+    ('flute', 'Flute Instructor', 'Flute', 'Woodwind instrument lessons'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    roles = op.create_table('instructor_roles',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('instrument', sa.String(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    specializations = op.create_table('instructor_specializations',
+    sa.Column('instructor_id', sa.Integer(), nullable=False),
+    sa.Column('role_id', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['instructor_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['role_id'], ['instructor_roles.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('instructor_id', 'role_id')
+    )
+    op.create_index('ix_instructor_specializations_role_instructor', 'instructor_specializations',
+                    ['role_id', 'instructor_id'], unique=False)
+
+    op.bulk_insert(roles, [
+        {'id': role_id, 'name': name, 'instrument': instrument, 'description': description}
+        for role_id, name, instrument, description in DEFAULT_ROLES
+    ])
+
+    # Index the comma-separated specializations: whole words naming a role's id or instrument
+    by_name = {}
+    for role_id, _, instrument, _ in DEFAULT_ROLES:
+        by_name[instrument.lower()] = role_id
+        by_name[role_id] = role_id
+    users = sa.table('users', sa.column('id', sa.Integer), sa.column('specializations', sa.Text))
+    links = []
+    for user_id, text in op.get_bind().execute(
+        sa.select(users.c.id, users.c.specializations).where(users.c.specializations.isnot(None))
+    ):
+        role_ids = {by_name.get(token.strip().lower()) for token in text.split(',')} - {None}
+        links.extend({'instructor_id': user_id, 'role_id': role_id} for role_id in sorted(role_ids))
+    if links:
+        op.bulk_insert(specializations, links)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_instructor_specializations_role_instructor', table_name='instructor_specializations')
+    op.drop_table('instructor_specializations')
+    op.drop_table('instructor_roles')
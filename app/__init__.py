@@ -1,2 +1,7 @@
 
 # Music U Lesson Scheduler FastAPI Application
+
+from dotenv import load_dotenv
+
+# Load environment variables once, before any module reads its configuration
+load_dotenv()
@@ -4,16 +4,31 @@
 Admin API endpoints for Music U Scheduler
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
 
-from ...database import get_db
+from ...database import engine, get_db
 from ...auth.dependencies import require_admin_role
-from ... import crud, schemas, models
+from ... import backup, crud, log, mailer, matching, schemas, models
+from ...query_budget import query_budget
+from ...versioning import check_version, if_match_versions, precondition_failed, set_etag, version_conditions
 
 router = APIRouter(prefix="/admin", tags=["admin"])
+updates_logger = logging.getLogger(log.UPDATES_LOGGER)
+
+MAX_BATCH_IDS = 200  # Per batch-get request
+
+
+def _batch_ids(ids: List[int]) -> List[int]:
+    if len(ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per request")
+    return ids
 
 
 # Dashboard
@@ -51,9 +66,21 @@ async def get_users_count(
     return {"count": crud.get_users_count(db, role=role, is_active=is_active)}
 
 
+@router.get("/users/batch", response_model=List[schemas.User])
+@query_budget(2)
+async def get_users_by_ids(
+    ids: List[int] = Query([], description="Repeat for each id: ?ids=1&ids=2"),
+    current_user: models.User = Depends(require_admin_role),
+    db: Session = Depends(get_db)
+):
+    """Get several users by ID in one request, in the order asked; unknown IDs are left out"""
+    return crud.get_users_by_ids(db, _batch_ids(ids))
+
+
 @router.get("/users/{user_id}", response_model=schemas.User)
 async def get_user_by_id(
     user_id: int,
+    response: Response,
     current_user: models.User = Depends(require_admin_role),
     db: Session = Depends(get_db)
 ):
@@ -61,6 +88,7 @@ async def get_user_by_id(
     user = crud.get_user(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    set_etag(response, user)
     return user
 
 
@@ -97,13 +125,16 @@ async def update_user(
     user_id: int,
     user_update: schemas.UserUpdate,
     request: Request,
+    response: Response,
     current_user: models.User = Depends(require_admin_role),
     db: Session = Depends(get_db)
 ):
-    """Update user information"""
+    """Update user information; send the user's ETag in If-Match to avoid overwriting a newer edit"""
     db_user = crud.get_user(db, user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
+    versions = if_match_versions(request)
+    check_version(db_user, versions)
     
     # Check for email/username conflicts
     if user_update.email and user_update.email != db_user.email:
@@ -114,7 +145,10 @@ async def update_user(
         if crud.get_user_by_username(db, user_update.username):
             raise HTTPException(status_code=400, detail="Username already taken")
     
-    updated_user = crud.update_user(db, user_id, user_update, updated_by=current_user.id)
+    updated_user = crud.update_user(db, user_id, user_update, updated_by=current_user.id,
+                                    conditions=version_conditions(models.User, versions))
+    if updated_user is None:
+        raise precondition_failed(db_user)  # Changed between the read and the update
     
     # Log the action
     crud.log_audit_action(
@@ -124,6 +158,7 @@ async def update_user(
         user_agent=request.headers.get("user-agent")
     )
     
+    set_etag(response, updated_user)
     return updated_user
 
 
@@ -234,6 +269,30 @@ async def get_lessons_count(
     return {"count": crud.get_lessons_count(db, status=status, date_from=date_from, date_to=date_to)}
 
 
+@router.get("/lessons/search", response_model=List[schemas.Lesson])
+@query_budget(3)
+async def search_lessons(
+    q: str = Query(..., min_length=1),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: models.User = Depends(require_admin_role),
+    db: Session = Depends(get_db)
+):
+    """Search lessons by title, description or instrument"""
+    return crud.search_lessons(db, q, skip=skip, limit=limit)
+
+
+@router.get("/lessons/batch", response_model=List[schemas.Lesson])
+@query_budget(2)
+async def get_lessons_by_ids(
+    ids: List[int] = Query([], description="Repeat for each id: ?ids=1&ids=2"),
+    current_user: models.User = Depends(require_admin_role),
+    db: Session = Depends(get_db)
+):
+    """Get several lessons by ID in one request, in the order asked; unknown IDs are left out"""
+    return crud.get_lessons_by_ids(db, _batch_ids(ids))
+
+
 @router.post("/lessons", response_model=schemas.Lesson)
 async def create_lesson(
     lesson: schemas.LessonCreate,
@@ -411,6 +470,7 @@ async def get_audit_logs(
 
 # Reports
 @router.get("/reports/users", response_model=List[schemas.UserReport])
+@query_budget(4)
 async def get_user_reports(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
@@ -419,57 +479,29 @@ async def get_user_reports(
 ):
     """Get user activity reports"""
     users = crud.get_users(db, skip=skip, limit=limit)
+    stats = crud.get_user_lesson_stats(db, [user.id for user in users])
     reports = []
     
     for user in users:
-        # Get lesson statistics for each user
-        total_lessons = db.query(models.Lesson).filter(
-            or_(models.Lesson.teacher_id == user.id, models.Lesson.student_id == user.id)
-        ).count()
-        
-        completed_lessons = db.query(models.Lesson).filter(
-            and_(
-                or_(models.Lesson.teacher_id == user.id, models.Lesson.student_id == user.id),
-                models.Lesson.status == models.LessonStatus.COMPLETED
-            )
-        ).count()
-        
-        cancelled_lessons = db.query(models.Lesson).filter(
-            and_(
-                or_(models.Lesson.teacher_id == user.id, models.Lesson.student_id == user.id),
-                models.Lesson.status == models.LessonStatus.CANCELLED
-            )
-        ).count()
-        
-        upcoming_lessons = db.query(models.Lesson).filter(
-            and_(
-                or_(models.Lesson.teacher_id == user.id, models.Lesson.student_id == user.id),
-                models.Lesson.status == models.LessonStatus.SCHEDULED,
-                models.Lesson.scheduled_at > datetime.utcnow()
-            )
-        ).count()
-        
-        # Get last lesson date
-        last_lesson = db.query(models.Lesson).filter(
-            or_(models.Lesson.teacher_id == user.id, models.Lesson.student_id == user.id)
-        ).order_by(models.Lesson.scheduled_at.desc()).first()
-        
+        user_stats = stats.get(user.id, {})
         reports.append(schemas.UserReport(
             user=user,
-            total_lessons=total_lessons,
-            completed_lessons=completed_lessons,
-            cancelled_lessons=cancelled_lessons,
-            upcoming_lessons=upcoming_lessons,
-            last_lesson_date=last_lesson.scheduled_at if last_lesson else None
+            total_lessons=user_stats.get("total_lessons", 0),
+            completed_lessons=user_stats.get("completed_lessons", 0),
+            cancelled_lessons=user_stats.get("cancelled_lessons", 0),
+            upcoming_lessons=user_stats.get("upcoming_lessons", 0),
+            last_lesson_date=user_stats.get("last_lesson_date")
         ))
     
     return reports
 
 
 @router.get("/reports/lessons", response_model=schemas.LessonReport)
+@query_budget(5)
 async def get_lesson_reports(
     date_from: Optional[datetime] = Query(None),
     date_to: Optional[datetime] = Query(None),
+    include_archived: bool = Query(False, description="Include lessons moved to the archive"),
     current_user: models.User = Depends(require_admin_role),
     db: Session = Depends(get_db)
 ):
@@ -480,54 +512,7 @@ async def get_lesson_reports(
     if not date_to:
         date_to = datetime.utcnow()
     
-    # Get lesson statistics
-    query = db.query(models.Lesson)
-    if date_from:
-        query = query.filter(models.Lesson.scheduled_at >= date_from)
-    if date_to:
-        query = query.filter(models.Lesson.scheduled_at <= date_to)
-    
-    lessons = query.all()
-    
-    total_lessons = len(lessons)
-    completed_lessons = len([l for l in lessons if l.status == models.LessonStatus.COMPLETED])
-    cancelled_lessons = len([l for l in lessons if l.status == models.LessonStatus.CANCELLED])
-    
-    # Calculate revenue
-    revenue = sum([l.cost for l in lessons if l.cost and l.status == models.LessonStatus.COMPLETED])
-    
-    # Popular instruments
-    instruments = {}
-    for lesson in lessons:
-        if lesson.instrument:
-            instruments[lesson.instrument] = instruments.get(lesson.instrument, 0) + 1
-    
-    # Instructor statistics
-    instructor_stats = {}
-    for lesson in lessons:
-        teacher_name = lesson.teacher.full_name
-        if teacher_name not in instructor_stats:
-            instructor_stats[teacher_name] = {
-                "total_lessons": 0,
-                "completed_lessons": 0,
-                "revenue": 0
-            }
-        
-        instructor_stats[teacher_name]["total_lessons"] += 1
-        if lesson.status == models.LessonStatus.COMPLETED:
-            instructor_stats[teacher_name]["completed_lessons"] += 1
-            if lesson.cost:
-                instructor_stats[teacher_name]["revenue"] += lesson.cost
-    
-    return schemas.LessonReport(
-        date_range=f"{date_from.strftime('%Y-%m-%d')} to {date_to.strftime('%Y-%m-%d')}",
-        total_lessons=total_lessons,
-        completed_lessons=completed_lessons,
-        cancelled_lessons=cancelled_lessons,
-        revenue=revenue,
-        popular_instruments=instruments,
-        instructor_stats=instructor_stats
-    )
+    return crud.get_lesson_report(db, date_from, date_to, include_archived=include_archived)
 
 
 # Update Management Endpoints
@@ -584,14 +569,7 @@ async def get_update_logs(
 ):
     """Get system update logs"""
     try:
-        import os
-        
-        logs = []
-        log_file = os.path.join(os.getcwd(), "logs", "updates.log")
-        
-        if os.path.exists(log_file):
-            with open(log_file, 'r') as f:
-                logs = f.readlines()[-50:]  # Get last 50 lines
+        logs = await run_in_threadpool(log.tail_updates_log, 50)
         
         return {
             "logs": [line.strip() for line in logs],
@@ -614,12 +592,8 @@ async def apply_updates(
         import os
         from datetime import datetime
         
-        # Ensure logs directory exists
-        os.makedirs("logs", exist_ok=True)
-        
         # Log update attempt
-        with open("logs/updates.log", "a") as f:
-            f.write(f"[{datetime.utcnow().isoformat()}] Update initiated by {current_user.username}\n")
+        updates_logger.info("Update initiated by %s", current_user.username)
         
         # Pull latest changes
         result = subprocess.run(
@@ -632,8 +606,8 @@ async def apply_updates(
         success = result.returncode == 0
         
         # Log result
-        with open("logs/updates.log", "a") as f:
-            f.write(f"[{datetime.utcnow().isoformat()}] Update {'successful' if success else 'failed'}: {result.stdout if success else result.stderr}\n")
+        updates_logger.info("Update %s: %s", "successful" if success else "failed",
+                            result.stdout if success else result.stderr)
         
         if success:
             return {
@@ -658,92 +632,26 @@ async def apply_updates(
 
 
 # Instructor Role Management Endpoints
-@router.get("/instructor-roles")
+@router.get("/instructor-roles", response_model=List[schemas.InstructorRole])
 async def get_instructor_roles(
     current_user: models.User = Depends(require_admin_role),
     db: Session = Depends(get_db)
 ):
     """Get all available instructor roles"""
-    try:
-        # Return predefined instructor roles
-        roles = [
-            {
-                "id": "piano",
-                "name": "Piano Instructor",
-                "instrument": "Piano",
-                "description": "Teaches piano lessons for all skill levels"
-            },
-            {
-                "id": "guitar",
-                "name": "Guitar Instructor", 
-                "instrument": "Guitar",
-                "description": "Teaches acoustic and electric guitar"
-            },
-            {
-                "id": "violin",
-                "name": "Violin Instructor",
-                "instrument": "Violin", 
-                "description": "Teaches violin for beginners to advanced"
-            },
-            {
-                "id": "drums",
-                "name": "Drum Instructor",
-                "instrument": "Drums",
-                "description": "Teaches drum kit and percussion"
-            },
-            {
-                "id": "voice",
-                "name": "Voice Coach",
-                "instrument": "Voice",
-                "description": "Vocal training and singing lessons"
-            },
-            {
-                "id": "saxophone",
-                "name": "Saxophone Instructor",
-                "instrument": "Saxophone",
-                "description": "Teaches alto, tenor, and soprano saxophone"
-            },
-            {
-                "id": "trumpet",
-                "name": "Trumpet Instructor", 
-                "instrument": "Trumpet",
-                "description": "Brass instrument instruction"
-            },
-            {
-                "id": "flute",
-                "name": "Flute Instructor",
-                "instrument": "Flute",
-                "description": "Woodwind instrument lessons"
-            }
-        ]
-        return roles
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error fetching instructor roles: {str(e)}"
-        )
+    return crud.get_instructor_roles(db)
 
 
-@router.post("/instructor-roles")
+@router.post("/instructor-roles", response_model=schemas.InstructorRole)
 async def create_instructor_role(
-    role_data: dict,
-    current_user: models.User = Depends(require_admin_role)
+    role_data: schemas.InstructorRoleCreate,
+    current_user: models.User = Depends(require_admin_role),
+    db: Session = Depends(get_db)
 ):
     """Create a new instructor role"""
-    try:
-        # For now, return success (could be expanded to store in database)
-        new_role = {
-            "id": role_data.get("id", f"custom-{datetime.utcnow().timestamp()}"),
-            "name": role_data.get("name"),
-            "instrument": role_data.get("instrument"), 
-            "description": role_data.get("description", "")
-        }
-        return new_role
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error creating instructor role: {str(e)}"
-        )
+    role = crud.create_instructor_role(db, role_data)
+    if role is None:
+        raise HTTPException(status_code=400, detail="Instructor role already exists")
+    return role
 
 
 @router.post("/instructor-roles/assign")
@@ -753,219 +661,163 @@ async def assign_instructor_role(
     db: Session = Depends(get_db)
 ):
     """Assign role to instructor"""
-    try:
-        # Handle both camelCase and snake_case
-        instructor_id = assignment_data.get("instructor_id") or assignment_data.get("instructorId")
-        role_id = assignment_data.get("role_id") or assignment_data.get("roleId")
-        
-        # Find instructor
-        instructor = db.query(models.User).filter(
-            models.User.id == instructor_id,
-            models.User.role == models.UserRole.INSTRUCTOR
-        ).first()
-        
-        if not instructor:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Instructor not found"
-            )
-        
-        # Update instructor's specializations (simple string-based approach)
-        current_specs = instructor.specializations or ""
-        if role_id not in current_specs:
-            new_specs = f"{current_specs},{role_id}" if current_specs else role_id
-            instructor.specializations = new_specs
-            db.commit()
-        
-        return {"status": "success", "message": "Role assigned successfully"}
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error assigning role: {str(e)}"
-        )
+    # Handle both camelCase and snake_case
+    instructor_id = assignment_data.get("instructor_id") or assignment_data.get("instructorId")
+    role_id = assignment_data.get("role_id") or assignment_data.get("roleId")
+    
+    instructor = _get_instructor_or_404(db, instructor_id)
+    if crud.get_instructor_role(db, role_id) is None:
+        raise HTTPException(status_code=404, detail="Instructor role not found")
+    
+    crud.assign_instructor_role(db, instructor, role_id)
+    return {"status": "success", "message": "Role assigned successfully"}
 
 
 @router.delete("/instructor-roles/remove/{instructor_id}/{role_id}")
 async def remove_instructor_role(
-    instructor_id: str,
+    instructor_id: int,
     role_id: str,
     current_user: models.User = Depends(require_admin_role),
     db: Session = Depends(get_db)
 ):
     """Remove role from instructor"""
-    try:
-        # Find instructor
-        instructor = db.query(models.User).filter(
-            models.User.id == instructor_id,
-            models.User.role == models.UserRole.INSTRUCTOR
-        ).first()
-        
-        if not instructor:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Instructor not found"
-            )
-        
-        # Remove role from specializations
-        if instructor.specializations:
-            specs = instructor.specializations.split(',')
-            specs = [s.strip() for s in specs if s.strip() != role_id]
-            instructor.specializations = ','.join(specs) if specs else None
-            db.commit()
-        
-        return {"status": "success", "message": "Role removed successfully"}
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error removing role: {str(e)}"
-        )
+    instructor = _get_instructor_or_404(db, instructor_id)
+    crud.remove_instructor_role(db, instructor, role_id)
+    return {"status": "success", "message": "Role removed successfully"}
 
 
-@router.put("/instructor-roles/{role_id}")
+@router.put("/instructor-roles/{role_id}", response_model=schemas.InstructorRole)
 async def update_instructor_role(
     role_id: str,
-    role_data: dict,
-    current_user: models.User = Depends(require_admin_role)
+    role_data: schemas.InstructorRoleUpdate,
+    current_user: models.User = Depends(require_admin_role),
+    db: Session = Depends(get_db)
 ):
     """Update instructor role"""
-    try:
-        # Return updated role (could be expanded to update in database)
-        updated_role = {
-            "id": role_id,
-            "name": role_data.get("name"),
-            "instrument": role_data.get("instrument"),
-            "description": role_data.get("description", "")
-        }
-        return updated_role
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error updating instructor role: {str(e)}"
-        )
+    role = crud.update_instructor_role(db, role_id, role_data)
+    if role is None:
+        raise HTTPException(status_code=404, detail="Instructor role not found")
+    return role
 
 
 @router.delete("/instructor-roles/{role_id}")
 async def delete_instructor_role(
     role_id: str,
-    current_user: models.User = Depends(require_admin_role)
+    current_user: models.User = Depends(require_admin_role),
+    db: Session = Depends(get_db)
 ):
     """Delete instructor role"""
-    try:
-        return {"status": "success", "message": "Role deleted successfully"}
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error deleting instructor role: {str(e)}"
-        )
+    if not crud.delete_instructor_role(db, role_id):
+        raise HTTPException(status_code=404, detail="Instructor role not found")
+    return {"status": "success", "message": "Role deleted successfully"}
+
+
+def _get_instructor_or_404(db: Session, instructor_id: Optional[int]) -> models.User:
+    instructor = db.query(models.User).filter(
+        models.User.id == instructor_id,
+        models.User.role == models.UserRole.INSTRUCTOR
+    ).first()
+    if not instructor:
+        raise HTTPException(status_code=404, detail="Instructor not found")
+    return instructor
 
 
 # Email Settings Endpoints
-@router.get("/email-settings")
+@router.get("/email-settings", response_model=schemas.EmailSettings)
 async def get_email_settings(
-    current_user: models.User = Depends(require_admin_role)
+    current_user: models.User = Depends(require_admin_role),
+    db: Session = Depends(get_db)
 ):
     """Get current email server settings"""
-    try:
-        # Return mock email settings (can be expanded to use real settings)
-        settings = {
-            "smtp_server": "smtp.gmail.com",
-            "smtp_port": 587,
-            "use_tls": True,
-            "sender_email": "noreply@musicu.com",
-            "sender_name": "Music U Scheduler"
-        }
-        return settings
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error fetching email settings: {str(e)}"
-        )
+    return mailer.public_email_settings(mailer.get_email_settings(db))
 
 
-@router.put("/email-settings")
+@router.put("/email-settings", response_model=schemas.EmailSettings)
 async def update_email_settings(
-    settings_data: dict,
-    current_user: models.User = Depends(require_admin_role)
+    settings_update: schemas.EmailSettingsUpdate,
+    current_user: models.User = Depends(require_admin_role),
+    db: Session = Depends(get_db)
 ):
     """Update email server settings"""
+    settings = mailer.save_email_settings(db, settings_update, updated_by=current_user.id)
+    return mailer.public_email_settings(settings)
+
+
+@router.post("/email-settings/test")
+async def test_email_settings(
+    settings_update: schemas.EmailSettingsUpdate,
+    current_user: models.User = Depends(require_admin_role),
+    db: Session = Depends(get_db)
+):
+    """Check that the SMTP server accepts a connection with the given settings"""
+    settings = mailer.get_email_settings(db)
+    overrides = settings_update.model_dump(exclude_unset=True, exclude_none=True)
+    if not overrides.get("smtp_password"):
+        overrides.pop("smtp_password", None)
+    settings.update(overrides)
     try:
-        # For now, just return success (can be expanded to store in database)
-        return {
-            "status": "success",
-            "message": "Email settings updated successfully",
-            "settings": settings_data
-        }
+        await run_in_threadpool(mailer.check_smtp_connection, settings)
     except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error updating email settings: {str(e)}"
-        )
+        return {"success": False, "message": f"SMTP connection failed: {e}"}
+    return {"success": True, "message": f"Connected to {settings['smtp_host']}:{settings['smtp_port']}"}
+
+
+@router.get("/email-outbox/stats", response_model=schemas.EmailOutboxStats)
+async def get_email_outbox_stats(
+    current_user: models.User = Depends(require_admin_role),
+    db: Session = Depends(get_db)
+):
+    """Get outbound email queue counts by status"""
+    return mailer.get_outbox_stats(db)
 
 
 # Backup Management Endpoints
-@router.get("/backups")
+@router.get("/backups", response_model=List[schemas.SystemBackup])
 async def get_backups(
     current_user: models.User = Depends(require_admin_role)
 ):
     """Get list of available backups"""
-    try:
-        # Return mock backup list (can be expanded with real backup system)
-        backups = [
-            {
-                "id": "backup_20250816_120000",
-                "name": "Daily Backup - Aug 16, 2025",
-                "created": "2025-08-16T12:00:00Z",
-                "size": "2.4 MB",
-                "type": "automatic"
-            },
-            {
-                "id": "backup_20250815_120000",
-                "name": "Daily Backup - Aug 15, 2025",
-                "created": "2025-08-15T12:00:00Z",
-                "size": "2.3 MB",
-                "type": "automatic"
-            }
-        ]
-        return backups
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error fetching backups: {str(e)}"
-        )
+    return await run_in_threadpool(backup.list_backups)
 
 
-@router.post("/backups")
+@router.post("/backups", response_model=schemas.SystemBackup)
 async def create_backup(
-    backup_data: dict,
-    current_user: models.User = Depends(require_admin_role)
+    backup_data: schemas.BackupCreate,
+    request: Request,
+    current_user: models.User = Depends(require_admin_role),
+    db: Session = Depends(get_db)
 ):
     """Create a new backup"""
     try:
-        backup_name = backup_data.get("name", f"Manual Backup - {datetime.utcnow().strftime('%b %d, %Y')}")
-        new_backup = {
-            "id": f"backup_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
-            "name": backup_name,
-            "created": datetime.utcnow().isoformat() + "Z",
-            "size": "2.4 MB",
-            "type": "manual"
-        }
-        return {
-            "status": "success",
-            "message": "Backup created successfully",
-            "backup": new_backup
-        }
-    except Exception as e:
+        manifest = await run_in_threadpool(backup.create_backup, backup_data.description, "manual")
+    except backup.BackupError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error creating backup: {str(e)}"
         )
 
+    crud.log_audit_action(
+        db, current_user.id, "CREATE", "backup", None,
+        f"Admin created backup {manifest['id']} ({manifest['throughput_mb_s']} MB/s)",
+        ip_address=request.client.host,
+        user_agent=request.headers.get("user-agent")
+    )
+    return manifest
+
+
+@router.get("/backups/{backup_id}/download")
+async def download_backup(
+    backup_id: str,
+    current_user: models.User = Depends(require_admin_role)
+):
+    """Download a backup file"""
+    manifest = _get_backup_or_404(backup_id)
+    return FileResponse(
+        backup.backup_file_path(manifest),
+        media_type="application/gzip",
+        filename=manifest["filename"]
+    )
+
 
 @router.delete("/backups/{backup_id}")
 async def delete_backup(
@@ -973,95 +825,100 @@ async def delete_backup(
     current_user: models.User = Depends(require_admin_role)
 ):
     """Delete a backup"""
-    try:
-        return {
-            "status": "success",
-            "message": f"Backup {backup_id} deleted successfully"
-        }
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error deleting backup: {str(e)}"
-        )
+    _get_backup_or_404(backup_id)
+    await run_in_threadpool(backup.delete_backup, backup_id)
+    return {
+        "status": "success",
+        "message": f"Backup {backup_id} deleted successfully"
+    }
 
 
-@router.post("/backups/{backup_id}/restore")
+@router.post("/backups/{backup_id}/restore", response_model=schemas.BackupRestoreResult)
 async def restore_backup(
     backup_id: str,
-    current_user: models.User = Depends(require_admin_role)
+    request: Request,
+    current_user: models.User = Depends(require_admin_role),
+    db: Session = Depends(get_db)
 ):
     """Restore from a backup"""
+    _get_backup_or_404(backup_id)
+    # Release this request's connection so it cannot hold a lock during the restore
+    db.rollback()
     try:
-        return {
-            "status": "success",
-            "message": f"System restored from backup {backup_id} successfully"
-        }
-    except Exception as e:
+        result = await run_in_threadpool(backup.restore_backup, backup_id, engine=engine)
+    except backup.BackupError as e:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error restoring backup: {str(e)}"
         )
 
+    crud.log_audit_action(
+        db, current_user.id, "RESTORE", "backup", None,
+        f"Admin restored backup {backup_id}",
+        ip_address=request.client.host,
+        user_agent=request.headers.get("user-agent")
+    )
+    return result
+
+
+def _get_backup_or_404(backup_id: str) -> dict:
+    try:
+        manifest = backup.get_backup(backup_id)
+    except backup.BackupError:
+        manifest = None
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="Backup not found")
+    return manifest
+
 
 # Missing Instructor Role Management Endpoints
-@router.get("/instructors/{instructor_id}/roles")
+@router.get("/instructors/{instructor_id}/roles", response_model=schemas.InstructorWithRoles)
 async def get_instructor_with_roles(
     instructor_id: int,
     current_user: models.User = Depends(require_admin_role),
     db: Session = Depends(get_db)
 ):
     """Get an instructor with their assigned roles"""
+    instructor = crud.get_user(db, instructor_id)
+    if not instructor:
+        raise HTTPException(status_code=404, detail="Instructor not found")
+    
+    if instructor.role != models.UserRole.INSTRUCTOR:
+        raise HTTPException(status_code=400, detail="User is not an instructor")
+    
+    role_ids = set(crud.get_instructor_role_ids(db, instructor_id))
+    return {
+        "id": instructor.id,
+        "username": instructor.username,
+        "email": instructor.email,
+        "full_name": instructor.full_name,
+        "role": instructor.role,
+        "assigned_roles": [role for role in crud.get_instructor_roles(db) if role["id"] in role_ids]
+    }
+
+
+@router.post("/instructors/match", response_model=List[schemas.InstructorMatch])
+@query_budget(4)
+async def match_instructors(
+    match_request: schemas.InstructorMatchRequest,
+    current_user: models.User = Depends(require_admin_role),
+    db: Session = Depends(get_db)
+):
+    """
+    Rank instructor/slot candidates for a new student
+
+    Candidates teach the instrument and are free for the whole lesson in one
+    of the preferred windows; earlier windows rank first, then instructors
+    with fewer lessons that week.
+    """
+    windows = [(window.start, window.end) for window in match_request.windows]
     try:
-        # Get the instructor
-        instructor = crud.get_user(db, instructor_id)
-        if not instructor:
-            raise HTTPException(status_code=404, detail="Instructor not found")
-        
-        if instructor.role != models.UserRole.INSTRUCTOR:
-            raise HTTPException(status_code=400, detail="User is not an instructor")
-        
-        # For now, return mock assigned roles (in future, this would come from a roles table)
-        assigned_roles = []
-        if instructor.specializations:
-            specializations = instructor.specializations.split(',')
-            # Map specializations to role IDs
-            for spec in specializations:
-                spec = spec.strip().lower()
-                if 'piano' in spec:
-                    assigned_roles.append({
-                        "id": "piano",
-                        "name": "Piano Instructor",
-                        "instrument": "Piano",
-                        "description": "Teaches piano lessons for all skill levels"
-                    })
-                elif 'guitar' in spec:
-                    assigned_roles.append({
-                        "id": "guitar", 
-                        "name": "Guitar Instructor",
-                        "instrument": "Guitar",
-                        "description": "Teaches acoustic and electric guitar"
-                    })
-                elif 'violin' in spec:
-                    assigned_roles.append({
-                        "id": "violin",
-                        "name": "Violin Instructor", 
-                        "instrument": "Violin",
-                        "description": "Teaches violin for beginners to advanced"
-                    })
-        
-        return {
-            "id": instructor.id,
-            "username": instructor.username,
-            "email": instructor.email,
-            "full_name": instructor.full_name,
-            "role": instructor.role,
-            "assigned_roles": assigned_roles
-        }
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error fetching instructor roles: {str(e)}"
-        )
+        return matching.match_instructors(db, match_request.instrument, windows,
+                                          match_request.duration_minutes, match_request.limit)
+    except matching.UnknownInstrument:
+        raise HTTPException(status_code=404, detail=f"No instructor role teaches {match_request.instrument}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 # Fix version-info endpoint
@@ -0,0 +1,50 @@
+"""
+Live lesson updates pushed over Server-Sent Events
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from ...database import get_db
+from ... import events, models
+from ...auth.dependencies import get_event_stream_user
+
+# Shares the /lessons prefix; main includes it before the lessons router so
+# /lessons/events is not taken for a lesson id
+router = APIRouter(
+    prefix="/lessons",
+    tags=["lessons"]
+)
+
+
+@router.get("/events")
+async def lesson_events(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_event_stream_user)
+):
+    """
+    Stream lesson changes as Server-Sent Events
+
+    Teachers and students receive created/updated/deleted events for their
+    own lessons, admins for every lesson. A "resync" event means some events
+    were missed and the client should refetch. Replaces polling: the stream
+    stays open, with a heartbeat comment every EVENTS_HEARTBEAT_SECONDS.
+    """
+    user_id, is_admin = current_user.id, current_user.role == models.UserRole.ADMIN
+    # Give the connection back now; the stream may stay open for hours
+    db.close()
+
+    subscriber = events.broker.subscribe(user_id, is_admin=is_admin)
+    if subscriber is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many live update subscribers",
+            headers={"Retry-After": str(events.EVENTS_RETRY_MS // 1000)}
+        )
+
+    return StreamingResponse(
+        events.broker.stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -4,7 +4,7 @@
 Instructor API endpoints for Music U Scheduler
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
@@ -12,9 +12,65 @@ from datetime import datetime, timedelta
 from ...database import get_db
 from ...auth.dependencies import require_instructor_role, require_teacher_role
 from ... import crud, schemas, models
+from ...query_budget import query_budget
+from ...versioning import check_version, if_match_versions, precondition_failed, set_etag, version_conditions
 
 router = APIRouter(prefix="/instructor", tags=["instructor"])
 
+MAX_BULK_LESSONS = 200  # Per bulk status change
+
+
+def _lessons_for_transition(db: Session, lesson_ids: List[int], current_user: models.User) -> List[models.Lesson]:
+    """Load and check a bulk status change in one query; all lessons must be the caller's and scheduled"""
+    lesson_ids = list(dict.fromkeys(lesson_ids))
+    if not lesson_ids or len(lesson_ids) > MAX_BULK_LESSONS:
+        raise HTTPException(status_code=400, detail=f"Give between 1 and {MAX_BULK_LESSONS} lesson ids")
+
+    lessons = crud.get_lessons_for_transition(db, lesson_ids)
+    found = {lesson.id for lesson in lessons}
+    missing = [lesson_id for lesson_id in lesson_ids if lesson_id not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail={"message": "Lessons not found", "lesson_ids": missing})
+
+    not_own = [lesson.id for lesson in lessons if lesson.teacher_id != current_user.id]
+    if not_own:
+        raise HTTPException(status_code=403, detail={"message": "Not authorized to change these lessons",
+                                                     "lesson_ids": not_own})
+
+    not_scheduled = [lesson.id for lesson in lessons if lesson.status != models.LessonStatus.SCHEDULED]
+    if not_scheduled:
+        raise HTTPException(status_code=400, detail={"message": "Only scheduled lessons can be changed",
+                                                     "lesson_ids": not_scheduled})
+    return lessons
+
+
+def _raise_update_refused(db: Session, lesson_id: int, current_user: models.User, action: str,
+                          versions: Optional[List[int]], not_scheduled_detail: Optional[str] = None):
+    """A guarded lesson update matched nothing; read the lesson once to say why"""
+    lesson = crud.get_lesson(db, lesson_id)
+    if not lesson:
+        raise HTTPException(status_code=404, detail="Lesson not found")
+    if lesson.teacher_id != current_user.id:
+        raise HTTPException(status_code=403, detail=f"Not authorized to {action} this lesson")
+    check_version(lesson, versions)
+    if not_scheduled_detail and lesson.status != models.LessonStatus.SCHEDULED:
+        raise HTTPException(status_code=400, detail=not_scheduled_detail)
+    raise HTTPException(status_code=409, detail="Lesson changed meanwhile; reload and try again")
+
+
+def _bulk_transition(db: Session, lessons: List[models.Lesson], request: Request, current_user: models.User,
+                     new_status: models.LessonStatus, audit_action: str, audit_details: str,
+                     values: dict) -> List[int]:
+    lesson_ids = [lesson.id for lesson in lessons]  # Read before the commit expires them
+    updated = crud.bulk_update_lesson_status(
+        db, lessons, new_status, updated_by=current_user.id,
+        audit_action=audit_action, audit_details=audit_details, values=values,
+        ip_address=request.client.host, user_agent=request.headers.get("user-agent")
+    )
+    if not updated:
+        raise HTTPException(status_code=409, detail="Lessons changed meanwhile; reload and try again")
+    return lesson_ids
+
 
 # Dashboard
 @router.get("/dashboard", response_model=schemas.InstructorDashboardStats)
@@ -29,10 +85,12 @@ async def get_instructor_dashboard(
 # Profile Management
 @router.get("/profile", response_model=schemas.User)
 async def get_instructor_profile(
+    response: Response,
     current_user: models.User = Depends(require_teacher_role),
     db: Session = Depends(get_db)
 ):
     """Get instructor's own profile"""
+    set_etag(response, current_user)
     return current_user
 
 
@@ -40,6 +98,7 @@ async def get_instructor_profile(
 async def update_instructor_profile(
     profile_update: schemas.UserUpdate,
     request: Request,
+    response: Response,
     current_user: models.User = Depends(require_teacher_role),
     db: Session = Depends(get_db)
 ):
@@ -57,7 +116,10 @@ async def update_instructor_profile(
         if crud.get_user_by_username(db, profile_update.username):
             raise HTTPException(status_code=400, detail="Username already taken")
     
-    updated_user = crud.update_user(db, current_user.id, profile_update, updated_by=current_user.id)
+    updated_user = crud.update_user(db, current_user.id, profile_update, updated_by=current_user.id,
+                                    conditions=version_conditions(models.User, if_match_versions(request)))
+    if updated_user is None:
+        raise precondition_failed(current_user)
     
     # Log the action
     crud.log_audit_action(
@@ -67,6 +129,7 @@ async def update_instructor_profile(
         user_agent=request.headers.get("user-agent")
     )
     
+    set_etag(response, updated_user)
     return updated_user
 
 
@@ -102,9 +165,44 @@ async def get_today_lessons(
     return crud.get_lessons_today(db, current_user.id)
 
 
+@router.put("/lessons/bulk/complete", response_model=schemas.BulkLessonTransitionResult)
+@query_budget(6)
+async def complete_lessons(
+    completion_data: schemas.BulkLessonComplete,
+    request: Request,
+    current_user: models.User = Depends(require_teacher_role),
+    db: Session = Depends(get_db)
+):
+    """Mark several lessons as completed in one transaction; the same notes apply to each"""
+    lessons = _lessons_for_transition(db, completion_data.lesson_ids, current_user)
+    values = completion_data.model_dump(exclude={"lesson_ids"}, exclude_none=True)
+    lesson_ids = _bulk_transition(db, lessons, request, current_user, models.LessonStatus.COMPLETED,
+                                  "COMPLETE", "Instructor completed lesson", values)
+    return {"message": f"{len(lesson_ids)} lessons marked as completed", "lesson_ids": lesson_ids}
+
+
+@router.put("/lessons/bulk/cancel", response_model=schemas.BulkLessonTransitionResult)
+@query_budget(6)
+async def cancel_lessons(
+    cancellation: schemas.BulkLessonCancel,
+    request: Request,
+    current_user: models.User = Depends(require_teacher_role),
+    db: Session = Depends(get_db)
+):
+    """Cancel several lessons in one transaction"""
+    lessons = _lessons_for_transition(db, cancellation.lesson_ids, current_user)
+    lesson_ids = _bulk_transition(
+        db, lessons, request, current_user, models.LessonStatus.CANCELLED,
+        "CANCEL", f"Instructor cancelled lesson (reason: {cancellation.reason})",
+        {"instructor_notes": f"Cancelled by instructor: {cancellation.reason}"}
+    )
+    return {"message": f"{len(lesson_ids)} lessons cancelled", "lesson_ids": lesson_ids}
+
+
 @router.get("/lessons/{lesson_id}", response_model=schemas.Lesson)
 async def get_lesson(
     lesson_id: int,
+    response: Response,
     current_user: models.User = Depends(require_teacher_role),
     db: Session = Depends(get_db)
 ):
@@ -116,6 +214,7 @@ async def get_lesson(
     if lesson.teacher_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to view this lesson")
     
+    set_etag(response, lesson)
     return lesson
 
 
@@ -124,22 +223,18 @@ async def update_lesson(
     lesson_id: int,
     lesson_update: schemas.LessonUpdate,
     request: Request,
+    response: Response,
     current_user: models.User = Depends(require_teacher_role),
     db: Session = Depends(get_db)
 ):
     """Update a lesson (instructor can only update their own lessons)"""
-    lesson = crud.get_lesson(db, lesson_id)
-    if not lesson:
-        raise HTTPException(status_code=404, detail="Lesson not found")
-    
-    if lesson.teacher_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to update this lesson")
-    
-    # Instructors cannot change teacher_id or student_id
-    if lesson_update.teacher_id or lesson_update.student_id:
-        raise HTTPException(status_code=403, detail="Cannot change lesson participants")
-    
-    updated_lesson = crud.update_lesson(db, lesson_id, lesson_update, updated_by=current_user.id)
+    # LessonUpdate has no teacher_id/student_id, so participants cannot change here
+    versions = if_match_versions(request)
+    updated_lesson = crud.update_lesson(db, lesson_id, lesson_update, updated_by=current_user.id, conditions=[
+        models.Lesson.teacher_id == current_user.id, *version_conditions(models.Lesson, versions)
+    ])
+    if updated_lesson is None:
+        _raise_update_refused(db, lesson_id, current_user, "update", versions)
     
     # Log the action
     crud.log_audit_action(
@@ -149,6 +244,7 @@ async def update_lesson(
         user_agent=request.headers.get("user-agent")
     )
     
+    set_etag(response, updated_lesson)
     return updated_lesson
 
 
@@ -157,24 +253,23 @@ async def complete_lesson(
     lesson_id: int,
     completion_data: schemas.LessonUpdate,
     request: Request,
+    response: Response,
     current_user: models.User = Depends(require_teacher_role),
     db: Session = Depends(get_db)
 ):
     """Mark a lesson as completed with notes"""
-    lesson = crud.get_lesson(db, lesson_id)
-    if not lesson:
-        raise HTTPException(status_code=404, detail="Lesson not found")
-    
-    if lesson.teacher_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to complete this lesson")
-    
-    if lesson.status != models.LessonStatus.SCHEDULED:
-        raise HTTPException(status_code=400, detail="Only scheduled lessons can be completed")
-    
     # Set status to completed
     completion_data.status = models.LessonStatus.COMPLETED
     
-    updated_lesson = crud.update_lesson(db, lesson_id, completion_data, updated_by=current_user.id)
+    versions = if_match_versions(request)
+    updated_lesson = crud.update_lesson(db, lesson_id, completion_data, updated_by=current_user.id, conditions=[
+        models.Lesson.teacher_id == current_user.id,
+        models.Lesson.status == models.LessonStatus.SCHEDULED,
+        *version_conditions(models.Lesson, versions)
+    ])
+    if updated_lesson is None:
+        _raise_update_refused(db, lesson_id, current_user, "complete", versions,
+                              not_scheduled_detail="Only scheduled lessons can be completed")
     
     # Log the action
     crud.log_audit_action(
@@ -184,6 +279,7 @@ async def complete_lesson(
         user_agent=request.headers.get("user-agent")
     )
     
+    set_etag(response, updated_lesson)
     return {"message": "Lesson marked as completed", "lesson": updated_lesson}
 
 
@@ -191,28 +287,27 @@ async def complete_lesson(
 async def cancel_lesson(
     lesson_id: int,
     request: Request,
+    response: Response,
     cancellation_reason: str = Query(..., description="Reason for cancellation"),
     current_user: models.User = Depends(require_teacher_role),
     db: Session = Depends(get_db)
 ):
     """Cancel a lesson"""
-    lesson = crud.get_lesson(db, lesson_id)
-    if not lesson:
-        raise HTTPException(status_code=404, detail="Lesson not found")
-    
-    if lesson.teacher_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to cancel this lesson")
-    
-    if lesson.status != models.LessonStatus.SCHEDULED:
-        raise HTTPException(status_code=400, detail="Only scheduled lessons can be cancelled")
-    
     # Update lesson status and add cancellation note
     lesson_update = schemas.LessonUpdate(
         status=models.LessonStatus.CANCELLED,
         instructor_notes=f"Cancelled by instructor: {cancellation_reason}"
     )
     
-    updated_lesson = crud.update_lesson(db, lesson_id, lesson_update, updated_by=current_user.id)
+    versions = if_match_versions(request)
+    updated_lesson = crud.update_lesson(db, lesson_id, lesson_update, updated_by=current_user.id, conditions=[
+        models.Lesson.teacher_id == current_user.id,
+        models.Lesson.status == models.LessonStatus.SCHEDULED,
+        *version_conditions(models.Lesson, versions)
+    ])
+    if updated_lesson is None:
+        _raise_update_refused(db, lesson_id, current_user, "cancel", versions,
+                              not_scheduled_detail="Only scheduled lessons can be cancelled")
     
     # Log the action
     crud.log_audit_action(
@@ -222,6 +317,7 @@ async def cancel_lesson(
         user_agent=request.headers.get("user-agent")
     )
     
+    set_etag(response, updated_lesson)
     return {"message": "Lesson cancelled successfully", "lesson": updated_lesson}
 
 
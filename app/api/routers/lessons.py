@@ -3,13 +3,16 @@
 Lesson management routes with authentication and role-based authorization
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from ...database import get_db
-from ... import crud, schemas, models
+from ... import changes, crud, schemas, models
 from ...auth.dependencies import get_current_active_user, require_teacher_role
+from ...query_budget import query_budget
+from ...versioning import if_match_versions, precondition_failed, set_etag, version_conditions
 
 router = APIRouter(
     prefix="/lessons",
@@ -70,9 +73,50 @@ async def create_lesson(
     return crud.create_lesson(db=db, lesson=lesson)
 
 
+@router.get("/changes", response_model=schemas.LessonChangeFeed)
+@query_budget(5)
+async def read_lesson_changes(
+    since: Optional[int] = Query(None, ge=0),
+    limit: int = Query(500, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_teacher_role)  # Same audience as the full lesson list
+):
+    """
+    Lessons and users changed after a cursor (teacher only)
+
+    Delta sync for clients that keep the lesson list: without since, returns
+    the current cursor to start from after a full fetch; with since, every
+    insert, update and delete (tombstone) after it, oldest first. Follow
+    has_more with the returned cursor. 410 means the cursor has expired and
+    the client must fetch the full list again.
+    """
+    if since is None:
+        return {"changes": [], "cursor": changes.current_cursor(db), "has_more": False}
+
+    try:
+        entries, cursor, has_more = changes.read_changes(db, since, limit)
+    except changes.CursorExpired as e:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail=str(e))
+
+    def live_ids(resource_type):
+        return [entry["resource_id"] for entry in entries
+                if entry["resource_type"] == resource_type and entry["operation"] != changes.DELETE]
+
+    lessons = {lesson.id: lesson for lesson in crud.get_lessons_by_ids(db, live_ids("lesson"))}
+    users = {user.id: user for user in crud.get_users_by_ids(db, live_ids("user"))}
+    for entry in entries:
+        found = (lessons if entry["resource_type"] == "lesson" else users).get(entry["resource_id"])
+        if found is None:
+            entry["operation"] = changes.DELETE  # Deleted since; its tombstone is further on
+        else:
+            entry[entry["resource_type"]] = found
+    return {"changes": entries, "cursor": cursor, "has_more": has_more}
+
+
 @router.get("/{lesson_id}", response_model=schemas.Lesson)
 async def read_lesson(
     lesson_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
@@ -96,6 +140,7 @@ async def read_lesson(
             detail="Not authorized to view this lesson"
         )
     
+    set_etag(response, db_lesson)
     return db_lesson
 
 
@@ -103,6 +148,8 @@ async def read_lesson(
 async def update_lesson(
     lesson_id: int,
     lesson_update: schemas.LessonUpdate,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
@@ -111,7 +158,22 @@ async def update_lesson(
     
     Only the teacher of the lesson can update it.
     Students can only update the notes field.
+    Send the lesson's ETag in If-Match to get 412 instead of overwriting a newer edit.
     """
+    # Checked by the UPDATE itself; the lesson is only read when it matches nothing
+    notes_only = set(lesson_update.model_dump(exclude_unset=True)) <= {"notes"}
+    if notes_only or current_user.is_teacher:
+        allowed = or_(models.Lesson.teacher_id == current_user.id, models.Lesson.student_id == current_user.id)
+    else:
+        allowed = models.Lesson.teacher_id == current_user.id
+
+    versions = if_match_versions(request)
+    db_lesson = crud.update_lesson(db, lesson_id=lesson_id, lesson_update=lesson_update,
+                                   conditions=[allowed, *version_conditions(models.Lesson, versions)])
+    if db_lesson is not None:
+        set_etag(response, db_lesson)
+        return db_lesson
+
     db_lesson = crud.get_lesson(db, lesson_id=lesson_id)
     if db_lesson is None:
         raise HTTPException(
@@ -127,20 +189,15 @@ async def update_lesson(
             detail="Not authorized to update this lesson"
         )
     
-    # If user is student, they can only update notes
-    if current_user.id == db_lesson.student_id and not current_user.is_teacher:
-        # Extract only the notes field for students
-        allowed_fields = {"notes"}
-        update_dict = lesson_update.model_dump(exclude_unset=True)
-        forbidden_fields = set(update_dict.keys()) - allowed_fields
-        
-        if forbidden_fields:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Students can only update notes field. Forbidden fields: {forbidden_fields}"
-            )
-    
-    return crud.update_lesson(db, lesson_id=lesson_id, lesson_update=lesson_update)
+    if notes_only or current_user.is_teacher or current_user.id == db_lesson.teacher_id:
+        raise precondition_failed(db_lesson)  # Permitted, so only If-Match can have failed
+
+    # Students can only update notes
+    forbidden_fields = set(lesson_update.model_dump(exclude_unset=True)) - {"notes"}
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail=f"Students can only update notes field. Forbidden fields: {forbidden_fields}"
+    )
 
 
 @router.delete("/{lesson_id}")
@@ -1,62 +1,102 @@
 
 """
 Web-based admin dashboard routes
+
+Served under /web/admin, since /admin belongs to the JSON admin API.
 """
 from fastapi import APIRouter, Request, Depends, HTTPException
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from typing import List
 
 from ...database import get_db
 from ...auth.dependencies import get_current_user, require_admin_role
-from ...models import User, Lesson
+from ...models import User, Lesson, LessonStatus, UserRole
 from ...schemas import User as UserSchema
-from ... import crud
+from ... import assets, crud
+from ...fragments import fragment_response, render_fragment
+from ...query_budget import query_budget
 
 router = APIRouter(
-    prefix="/admin",
+    prefix="/web/admin",
     tags=["admin-web"],
     dependencies=[Depends(require_admin_role)]
 )
 
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["static_url"] = assets.static_url
+
+# Dashboard widgets; every admin sees the same figures, so they are shared across admins
+def stats_cards_widget(db: Session, current_user: User):
+    def load():
+        total_users = db.query(User).count()
+        total_lessons = db.query(Lesson).count()
+        active_instructors = db.query(User).filter(
+            User.role == UserRole.INSTRUCTOR, User.is_active == True
+        ).count()
+
+        # Calculate monthly revenue (placeholder)
+        monthly_revenue = 2500.00
+
+        return {"stats": {
+            "total_users": total_users,
+            "total_lessons": total_lessons,
+            "active_instructors": active_instructors,
+            "monthly_revenue": monthly_revenue
+        }}
+
+    return render_fragment(templates, "admin/fragments/stats_cards.html", current_user, load, per_user=False)
+
+
+def recent_lessons_widget(db: Session, current_user: User):
+    def load():
+        recent_lessons = db.query(Lesson).options(
+            joinedload(Lesson.student), joinedload(Lesson.teacher)
+        ).order_by(Lesson.created_at.desc()).limit(10).all()
+        return {"recent_lessons": recent_lessons}
+
+    return render_fragment(templates, "admin/fragments/recent_lessons.html", current_user, load, per_user=False)
+
+
+WIDGETS = {
+    "stats-cards": stats_cards_widget,
+    "recent-lessons": recent_lessons_widget,
+}
+
 
 @router.get("/dashboard", response_class=HTMLResponse)
+@query_budget(6)
 async def admin_dashboard(
     request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Admin dashboard page"""
-    # Get dashboard statistics
-    total_users = db.query(User).count()
-    total_lessons = db.query(Lesson).count()
-    active_instructors = db.query(User).filter(User.role == "instructor", User.is_active == True).count()
-    
-    # Get recent lessons
-    recent_lessons = db.query(Lesson).order_by(Lesson.created_at.desc()).limit(10).all()
-    
-    # Calculate monthly revenue (placeholder)
-    monthly_revenue = 2500.00
-    
-    stats = {
-        "total_users": total_users,
-        "total_lessons": total_lessons,
-        "active_instructors": active_instructors,
-        "monthly_revenue": monthly_revenue
-    }
-    
     return templates.TemplateResponse(
         "admin/dashboard.html",
         {
             "request": request,
             "user": current_user,
-            "stats": stats,
-            "recent_lessons": recent_lessons
+            "stats_cards": stats_cards_widget(db, current_user),
+            "recent_lessons": recent_lessons_widget(db, current_user)
         }
     )
 
+@router.get("/widgets/{name}", response_class=HTMLResponse)
+@query_budget(4)
+async def admin_widget(
+    name: str,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """A single dashboard widget, for hx-get refreshes"""
+    widget = WIDGETS.get(name)
+    if widget is None:
+        raise HTTPException(status_code=404, detail="Widget not found")
+    return fragment_response(request, widget(db, current_user))
+
 @router.get("/users", response_class=HTMLResponse)
 async def admin_users_page(
     request: Request,
@@ -150,30 +190,32 @@ async def admin_lessons_page(
     )
 
 @router.get("/reports", response_class=HTMLResponse)
+@query_budget(4)
 async def admin_reports_page(
     request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Admin reports page"""
-    # Generate report data
-    total_users = db.query(User).count()
-    total_lessons = db.query(Lesson).count()
-    completed_lessons = db.query(Lesson).filter(Lesson.status == "completed").count()
-    
-    reports_data = {
-        "total_users": total_users,
-        "total_lessons": total_lessons,
-        "completed_lessons": completed_lessons,
-        "completion_rate": (completed_lessons / total_lessons * 100) if total_lessons > 0 else 0
-    }
-    
+    def reports_context():
+        total_users = db.query(User).count()
+        total_lessons = db.query(Lesson).count()
+        completed_lessons = db.query(Lesson).filter(Lesson.status == LessonStatus.COMPLETED).count()
+
+        return {"reports": {
+            "total_users": total_users,
+            "total_lessons": total_lessons,
+            "completed_lessons": completed_lessons,
+            "completion_rate": (completed_lessons / total_lessons * 100) if total_lessons > 0 else 0
+        }}
+
     return templates.TemplateResponse(
         "admin/reports.html",
         {
             "request": request,
             "user": current_user,
-            "reports": reports_data
+            "report_cards": render_fragment(templates, "admin/fragments/report_cards.html", current_user,
+                                            reports_context, per_user=False)
         }
     )
 
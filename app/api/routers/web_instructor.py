@@ -1,130 +1,220 @@
 
 """
 Web-based instructor dashboard routes
+
+Served under /web/instructor, since /instructor belongs to the JSON instructor API.
 """
-from fastapi import APIRouter, Request, Depends, HTTPException
+from fastapi import APIRouter, Request, Depends, HTTPException, Query
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from datetime import date, datetime
-from typing import List
+from datetime import date, datetime, timedelta
+from typing import List, Optional
 
 from ...database import get_db
 from ...auth.dependencies import get_current_user, require_instructor_role
-from ...models import User, Lesson
+from ...models import User, Lesson, LessonStatus
 from ...schemas import User as UserSchema
-from ... import crud
+from ... import assets, crud
+from ...fragments import fragment_response, render_fragment
+from ...query_budget import query_budget
 
 router = APIRouter(
-    prefix="/instructor",
+    prefix="/web/instructor",
     tags=["instructor-web"],
     dependencies=[Depends(require_instructor_role)]
 )
 
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["static_url"] = assets.static_url
+
+# Lesson and student tables are paginated so a page never loads a whole history
+PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+MAX_SCHEDULE_LESSONS = 500  # Upper bound for one schedule window
+
+# Dashboard widgets, cached per instructor
+def stats_cards_widget(db: Session, current_user: User):
+    def load():
+        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        total_students = crud.get_teacher_students_count(db, current_user.id)
+        weekly_lessons = crud.get_lessons_by_teacher_count(
+            db, current_user.id, date_from=today_start, date_to=today_start + timedelta(days=7)
+        )
+        completed_lessons = crud.get_lessons_by_teacher_count(db, current_user.id, status=LessonStatus.COMPLETED)
+
+        # Calculate monthly earnings (placeholder)
+        monthly_earnings = 1800.00
+
+        return {"stats": {
+            "total_students": total_students,
+            "weekly_lessons": weekly_lessons,
+            "completed_lessons": completed_lessons,
+            "monthly_earnings": monthly_earnings
+        }}
+
+    return render_fragment(templates, "instructor/fragments/stats_cards.html", current_user, load)
+
+
+def todays_lessons_widget(db: Session, current_user: User):
+    def load():
+        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        todays_lessons = crud.get_lessons_by_teacher(
+            db, current_user.id, limit=MAX_SCHEDULE_LESSONS,
+            date_from=today_start, date_to=today_start + timedelta(days=1)
+        )
+        return {"todays_lessons": todays_lessons}
+
+    return render_fragment(templates, "instructor/fragments/todays_lessons.html", current_user, load)
+
+
+def recent_students_widget(db: Session, current_user: User):
+    def load():
+        # Students of this instructor's most recent lessons
+        recent_students = db.query(User).join(Lesson, Lesson.student_id == User.id).filter(
+            Lesson.teacher_id == current_user.id,
+            Lesson.scheduled_at <= datetime.utcnow()
+        ).group_by(User.id).order_by(func.max(Lesson.scheduled_at).desc()).limit(5).all()
+        return {"recent_students": recent_students}
+
+    return render_fragment(templates, "instructor/fragments/recent_students.html", current_user, load)
+
+
+WIDGETS = {
+    "stats-cards": stats_cards_widget,
+    "todays-lessons": todays_lessons_widget,
+    "recent-students": recent_students_widget,
+}
+
 
 @router.get("/dashboard", response_class=HTMLResponse)
+@query_budget(6)
 async def instructor_dashboard(
     request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Instructor dashboard page"""
-    # Get instructor statistics
-    instructor_lessons = db.query(Lesson).filter(Lesson.instructor_id == current_user.id).all()
-    total_students = len(set(lesson.student_id for lesson in instructor_lessons))
-    
-    # Get this week's lessons
-    today = date.today()
-    weekly_lessons = [l for l in instructor_lessons if l.date and l.date >= today and (l.date - today).days < 7]
-    
-    completed_lessons = len([l for l in instructor_lessons if l.status == "completed"])
-    
-    # Get today's lessons
-    todays_lessons = [l for l in instructor_lessons if l.date == today]
-    
-    # Get recent students
-    recent_students = db.query(User).filter(
-        User.role == "student",
-        User.id.in_([l.student_id for l in instructor_lessons[-5:]])
-    ).limit(5).all()
-    
-    # Calculate monthly earnings (placeholder)
-    monthly_earnings = 1800.00
-    
-    stats = {
-        "total_students": total_students,
-        "weekly_lessons": len(weekly_lessons),
-        "completed_lessons": completed_lessons,
-        "monthly_earnings": monthly_earnings
-    }
-    
     return templates.TemplateResponse(
         "instructor/dashboard.html",
         {
             "request": request,
             "user": current_user,
-            "stats": stats,
-            "todays_lessons": todays_lessons,
-            "recent_students": recent_students
+            "stats_cards": stats_cards_widget(db, current_user),
+            "todays_lessons": todays_lessons_widget(db, current_user),
+            "recent_students": recent_students_widget(db, current_user)
         }
     )
 
+@router.get("/widgets/{name}", response_class=HTMLResponse)
+@query_budget(4)
+async def instructor_widget(
+    name: str,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """A single dashboard widget, for hx-get refreshes"""
+    widget = WIDGETS.get(name)
+    if widget is None:
+        raise HTTPException(status_code=404, detail="Widget not found")
+    return fragment_response(request, widget(db, current_user))
+
+def _pagination(page: int, page_size: int, total: int) -> dict:
+    pages = max((total + page_size - 1) // page_size, 1)
+    return {"page": page, "page_size": page_size, "total": total, "pages": pages,
+            "has_prev": page > 1, "has_next": page < pages}
+
+
+def _own_lesson(db: Session, lesson_id: int, current_user: User) -> Lesson:
+    lesson = crud.get_lesson(db, lesson_id)
+    if not lesson or lesson.teacher_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Lesson not found")
+    return lesson
+
+
+def _lesson_form_students(db: Session, current_user: User) -> List[User]:
+    """The instructor's own active students, most recently taught first, for the lesson form"""
+    rows = crud.get_teacher_students(db, current_user.id, limit=MAX_PAGE_SIZE)
+    return [row["student"] for row in rows if row["student"].is_active]
+
+
 @router.get("/schedule", response_class=HTMLResponse)
+@query_budget(3)
 async def instructor_schedule_page(
     request: Request,
+    start: Optional[date] = Query(None, description="First day shown (default: today)"),
+    days: int = Query(7, ge=1, le=31),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Instructor schedule page"""
-    lessons = db.query(Lesson).filter(Lesson.instructor_id == current_user.id).order_by(Lesson.date, Lesson.time).all()
+    """Instructor schedule page, one date window at a time"""
+    start = start or date.today()
+    window_start = datetime.combine(start, datetime.min.time())
+    window_end = window_start + timedelta(days=days)
+    lessons = crud.get_lessons_by_teacher(db, current_user.id, limit=MAX_SCHEDULE_LESSONS,
+                                          date_from=window_start, date_to=window_end)
     
     return templates.TemplateResponse(
         "instructor/schedule.html",
         {
             "request": request,
             "user": current_user,
-            "lessons": lessons
+            "lessons": lessons,
+            "start": start,
+            "days": days,
+            "previous_start": start - timedelta(days=days),
+            "next_start": start + timedelta(days=days)
         }
     )
 
 @router.get("/students", response_class=HTMLResponse)
+@query_budget(4)
 async def instructor_students_page(
     request: Request,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Instructor students page"""
-    # Get students who have lessons with this instructor
-    instructor_lessons = db.query(Lesson).filter(Lesson.instructor_id == current_user.id).all()
-    student_ids = list(set(lesson.student_id for lesson in instructor_lessons))
-    
-    students = db.query(User).filter(User.id.in_(student_ids)).all() if student_ids else []
+    total = crud.get_teacher_students_count(db, current_user.id)
+    students = crud.get_teacher_students(db, current_user.id, skip=(page - 1) * page_size, limit=page_size)
     
     return templates.TemplateResponse(
         "instructor/students.html",
         {
             "request": request,
             "user": current_user,
-            "students": students
+            "students": students,
+            "pagination": _pagination(page, page_size, total)
         }
     )
 
 @router.get("/lessons", response_class=HTMLResponse)
+@query_budget(4)
 async def instructor_lessons_page(
     request: Request,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    status: Optional[LessonStatus] = Query(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Instructor lessons management page"""
-    lessons = db.query(Lesson).filter(Lesson.instructor_id == current_user.id).order_by(Lesson.date.desc()).all()
+    """Instructor lessons management page, newest first"""
+    total = crud.get_lessons_by_teacher_count(db, current_user.id, status=status)
+    lessons = crud.get_lessons_by_teacher(db, current_user.id, skip=(page - 1) * page_size, limit=page_size,
+                                          status=status, newest_first=True)
     
     return templates.TemplateResponse(
         "instructor/lessons.html",
         {
             "request": request,
             "user": current_user,
-            "lessons": lessons
+            "lessons": lessons,
+            "status": status,
+            "pagination": _pagination(page, page_size, total)
         }
     )
 
@@ -135,8 +225,7 @@ async def instructor_create_lesson_page(
     db: Session = Depends(get_db)
 ):
     """Create lesson form page"""
-    # Get available students
-    students = db.query(User).filter(User.role == "student", User.is_active == True).all()
+    students = _lesson_form_students(db, current_user)
     
     return templates.TemplateResponse(
         "instructor/create_lesson.html",
@@ -148,6 +237,7 @@ async def instructor_create_lesson_page(
     )
 
 @router.get("/lessons/{lesson_id}", response_class=HTMLResponse)
+@query_budget(2)
 async def instructor_lesson_detail_page(
     lesson_id: int,
     request: Request,
@@ -155,13 +245,7 @@ async def instructor_lesson_detail_page(
     db: Session = Depends(get_db)
 ):
     """Lesson detail page"""
-    lesson = db.query(Lesson).filter(
-        Lesson.id == lesson_id,
-        Lesson.instructor_id == current_user.id
-    ).first()
-    
-    if not lesson:
-        raise HTTPException(status_code=404, detail="Lesson not found")
+    lesson = _own_lesson(db, lesson_id, current_user)
     
     return templates.TemplateResponse(
         "instructor/lesson_detail.html",
@@ -180,15 +264,10 @@ async def instructor_edit_lesson_page(
     db: Session = Depends(get_db)
 ):
     """Edit lesson form page"""
-    lesson = db.query(Lesson).filter(
-        Lesson.id == lesson_id,
-        Lesson.instructor_id == current_user.id
-    ).first()
-    
-    if not lesson:
-        raise HTTPException(status_code=404, detail="Lesson not found")
-    
-    students = db.query(User).filter(User.role == "student", User.is_active == True).all()
+    lesson = _own_lesson(db, lesson_id, current_user)
+    students = _lesson_form_students(db, current_user)
+    if lesson.student is not None and lesson.student not in students:
+        students.append(lesson.student)  # Keep the current student selectable
     
     return templates.TemplateResponse(
         "instructor/edit_lesson.html",
@@ -201,22 +280,21 @@ async def instructor_edit_lesson_page(
     )
 
 @router.get("/reports", response_class=HTMLResponse)
+@query_budget(2)
 async def instructor_reports_page(
     request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Instructor reports page"""
-    lessons = db.query(Lesson).filter(Lesson.instructor_id == current_user.id).all()
-    
-    total_lessons = len(lessons)
-    completed_lessons = len([l for l in lessons if l.status == "completed"])
-    upcoming_lessons = len([l for l in lessons if l.status == "scheduled" and l.date >= date.today()])
+    counts = crud.get_teacher_lesson_counts(db, current_user.id)
+    total_lessons = counts["total_lessons"]
+    completed_lessons = counts["completed_lessons"]
     
     reports_data = {
         "total_lessons": total_lessons,
         "completed_lessons": completed_lessons,
-        "upcoming_lessons": upcoming_lessons,
+        "upcoming_lessons": counts["upcoming_lessons"],
         "completion_rate": (completed_lessons / total_lessons * 100) if total_lessons > 0 else 0
     }
     
@@ -0,0 +1,172 @@
+"""
+Fingerprinted, precompressed static assets
+
+scripts/build_assets.py copies every file under static/ to static/dist/
+with a content hash in its name (css/style.css -> css/style.3b1f0c2a9d4e.css),
+writes .gz (and .br when the optional brotli package is installed) next to
+each compressible file, and records the mapping in static/dist/manifest.json.
+
+Templates call static_url("css/style.css"), which returns the hashed URL
+once the manifest exists and the plain /static/ URL otherwise, so
+development works without a build. StaticAssets serves the precompressed
+variant the client accepts and marks hashed files immutable: their content
+can never change under the same URL, so browsers never revalidate them.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import stat
+from typing import Dict, Optional
+
+import anyio
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip variants are always built
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Asset configuration
+STATIC_DIR = os.getenv("STATIC_DIR", "static")
+STATIC_URL = "/static"
+DIST_DIR = "dist"
+MANIFEST_FILE = "manifest.json"
+COMPRESS_MIN_BYTES = 512  # Smaller files gain little and cost a header
+COMPRESSIBLE_TYPES = {".css", ".js", ".html", ".json", ".svg", ".txt", ".map"}
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Preferred first; suffix of the precompressed file for each Content-Encoding
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+_manifest: Optional[Dict[str, str]] = None
+
+
+def _fingerprinted_name(relative_path: str, data: bytes) -> str:
+    root, ext = os.path.splitext(relative_path)
+    return f"{root}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+
+def _write_if_missing(path: str, data: bytes) -> None:
+    if os.path.exists(path):
+        return  # Same name means same content
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+
+
+def build_assets(static_dir: str = STATIC_DIR) -> Dict[str, str]:
+    """Fingerprint and precompress every asset; returns the manifest
+
+    Earlier builds are left in place so pages rendered by workers that still
+    hold the previous manifest keep loading during a rolling restart.
+    """
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    manifest: Dict[str, str] = {}
+    for root, dirs, files in os.walk(static_dir):
+        if os.path.abspath(root) == os.path.abspath(static_dir):
+            dirs[:] = [d for d in dirs if d != DIST_DIR]
+        for filename in sorted(files):
+            source = os.path.join(root, filename)
+            relative_path = os.path.relpath(source, static_dir).replace(os.sep, "/")
+            with open(source, "rb") as f:
+                data = f.read()
+
+            hashed = _fingerprinted_name(relative_path, data)
+            target = os.path.join(dist_dir, *hashed.split("/"))
+            _write_if_missing(target, data)
+            manifest[relative_path] = hashed
+
+            if os.path.splitext(filename)[1].lower() not in COMPRESSIBLE_TYPES or len(data) < COMPRESS_MIN_BYTES:
+                continue
+            variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                variants[".br"] = brotli.compress(data, quality=11)
+            for suffix, compressed in variants.items():
+                if len(compressed) < len(data):
+                    _write_if_missing(target + suffix, compressed)
+
+    os.makedirs(dist_dir, exist_ok=True)
+    manifest_path = os.path.join(dist_dir, MANIFEST_FILE)
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return manifest
+
+
+def load_manifest(static_dir: str = STATIC_DIR) -> Dict[str, str]:
+    """(Re)read the manifest; an unbuilt tree has an empty one"""
+    global _manifest
+    try:
+        with open(os.path.join(static_dir, DIST_DIR, MANIFEST_FILE), encoding="utf-8") as f:
+            _manifest = json.load(f)
+    except FileNotFoundError:
+        _manifest = {}
+    except ValueError as e:
+        logger.warning("Ignoring unreadable asset manifest: %s", e)
+        _manifest = {}
+    return _manifest
+
+
+def static_url(path: str) -> str:
+    """Jinja helper: URL of a static asset, fingerprinted when a build exists"""
+    manifest = _manifest if _manifest is not None else load_manifest()
+    path = path.lstrip("/")
+    hashed = manifest.get(path)
+    if hashed is None:
+        return f"{STATIC_URL}/{path}"
+    return f"{STATIC_URL}/{DIST_DIR}/{hashed}"
+
+
+def _accepted_encodings(headers: Headers) -> set:
+    accepted = set()
+    for item in headers.get("accept-encoding", "").split(","):
+        coding, _, params = item.partition(";")
+        quality = params.strip().lower()
+        try:
+            if quality.startswith("q=") and float(quality[2:]) == 0:
+                continue  # Explicitly refused
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticAssets(StaticFiles):
+    """StaticFiles serving precompressed variants, with immutable caching for fingerprinted files"""
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        fingerprinted = path.split(os.sep, 1)[0] == DIST_DIR
+        response = None
+        if fingerprinted and scope["method"] in ("GET", "HEAD"):
+            response = await self._precompressed_response(path, scope)
+        if response is None:
+            response = await super().get_response(path, scope)
+
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if fingerprinted else REVALIDATE_CACHE_CONTROL
+        if fingerprinted:
+            response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+    async def _precompressed_response(self, path: str, scope: Scope) -> Optional[Response]:
+        accepted = _accepted_encodings(Headers(scope=scope))
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+                continue
+            # FileResponse takes the type from the name, which skips the .gz/.br suffix
+            response = self.file_response(full_path, stat_result, scope)
+            response.headers["Content-Encoding"] = encoding
+            return response
+        return None
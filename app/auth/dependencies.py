@@ -4,16 +4,17 @@
 Authentication dependencies for FastAPI routes
 """
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from typing import Optional
 from ..database import get_db
-from .. import crud, models
+from .. import crud, log, models
 from .utils import verify_token, extract_token_data
 
 # OAuth2 scheme for token URL
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
 
 
 async def get_current_user(
@@ -54,7 +55,8 @@ async def get_current_user(
     user = crud.get_user_by_username(db, username=username)
     if user is None:
         raise credentials_exception
-        
+
+    log.set_request_user(user.id)
     return user
 
 
@@ -81,6 +83,30 @@ async def get_current_active_user(
     return current_user
 
 
+async def get_event_stream_user(
+    token: Optional[str] = Depends(oauth2_scheme_optional),
+    access_token: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+) -> models.User:
+    """
+    Dependency to authenticate a Server-Sent Events stream
+
+    Browsers' EventSource cannot set an Authorization header, so the JWT may
+    also be passed as the access_token query parameter.
+
+    Raises:
+        HTTPException: 401 if no valid token is given, 400 if user is inactive
+    """
+    if not (token or access_token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    current_user = await get_current_user(token or access_token, db)
+    return await get_current_active_user(current_user)
+
+
 async def require_admin_role(
     current_user: models.User = Depends(get_current_active_user)
 ) -> models.User:
@@ -11,7 +11,7 @@ from typing import Any
 
 from ..database import get_db
 from .. import crud, schemas, models
-from .utils import create_access_token, verify_password, ACCESS_TOKEN_EXPIRE_MINUTES
+from .utils import create_access_token, verify_password_async, ACCESS_TOKEN_EXPIRE_MINUTES
 from .dependencies import get_current_active_user
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
@@ -78,7 +78,7 @@ async def login_user(
     if not user:
         user = crud.get_user_by_email(db, email=form_data.username)
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -146,7 +146,7 @@ async def change_password(
         HTTPException: 400 if old password is incorrect
     """
     # Verify old password
-    if not verify_password(password_data.old_password, current_user.hashed_password):
+    if not await verify_password_async(password_data.old_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect old password"
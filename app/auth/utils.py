@@ -3,33 +3,87 @@
 Authentication utilities for JWT token handling and password operations
 """
 
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional, Any, Union
-from jose import jwt, JWTError
-from passlib.context import CryptContext
 import os
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+from .. import metrics
 
 # Security configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "fallback-secret-key-change-in-production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
-# Password context for hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# passlib and jose are imported on first use to keep worker startup fast
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """Password context for hashing"""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password using bcrypt"""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+
+# bcrypt is deliberately slow; async routes hash and verify on this executor
+# so a burst of logins cannot stall the event loop
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_password_jobs = 0  # Submitted but not yet finished
+_password_jobs_lock = threading.Lock()
+
+
+def password_executor_queue_depth() -> int:
+    """Password operations waiting for a free bcrypt worker"""
+    return max(0, _password_jobs - PASSWORD_HASH_WORKERS)
+
+
+metrics.register_gauge(
+    "password_hash_queue_depth", "Password operations waiting for a bcrypt worker", (),
+    lambda: [({}, password_executor_queue_depth())]
+)
+
+
+async def _run_password_job(operation: str, func, *args):
+    global _password_jobs
+
+    def timed():
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            metrics.PASSWORD_HASH_LATENCY.observe(time.perf_counter() - started, operation=operation)
+
+    with _password_jobs_lock:
+        _password_jobs += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_password_executor, timed)
+    finally:
+        with _password_jobs_lock:
+            _password_jobs -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the bcrypt executor"""
+    return await _run_password_job("verify", verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash on the bcrypt executor"""
+    return await _run_password_job("hash", get_password_hash, password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -43,6 +97,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     Returns:
         Encoded JWT token string
     """
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -69,6 +125,8 @@ def verify_token(token: str) -> Optional[dict]:
     Returns:
         Token payload if valid, None if invalid
     """
+    from jose import jwt, JWTError
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
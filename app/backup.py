@@ -0,0 +1,343 @@
+"""
+Database backup and restore for Music U Scheduler
+
+SQLite databases are copied with the online backup API a batch of pages at a
+time, so writers are only blocked between steps; PostgreSQL is dumped with
+pg_dump. Either way the dump is streamed through gzip into BACKUP_DIR and a
+JSON manifest with its SHA-256 checksum is written next to it. Restores
+verify the checksum (and, for SQLite, PRAGMA integrity_check) before the
+live database is touched. A restore rewinds the change log and cache
+invalidation ids, so afterwards every worker's caches are invalidated and
+delta sync cursors past the restored log expire.
+
+Everything here is blocking I/O; call it from a worker thread or task.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session
+
+from . import cache, changes, models
+from .database import DATABASE_URL
+
+# Backup configuration
+BACKUP_DIR = os.getenv("BACKUP_DIR", "./backups")
+BACKUP_RETENTION = int(os.getenv("BACKUP_RETENTION", "14"))  # Newest backups kept per type
+BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "1024"))
+CHUNK_SIZE = 1024 * 1024
+
+BACKUP_ID_PATTERN = re.compile(r"^backup_\d{8}_\d{6}_\d{6}$")
+
+
+class BackupError(Exception):
+    """Raised when a backup cannot be created, verified or restored"""
+
+
+def _sqlite_path(url) -> str:
+    if not url.database or url.database == ":memory:":
+        raise BackupError("In-memory SQLite databases cannot be backed up")
+    return os.path.abspath(url.database)
+
+
+def _pg_env(url) -> Dict[str, str]:
+    env = dict(os.environ)
+    if url.password:
+        env["PGPASSWORD"] = url.password
+    return env
+
+
+def _pg_args(url) -> List[str]:
+    args = ["--dbname", url.database or ""]
+    if url.host:
+        args += ["--host", url.host]
+    if url.port:
+        args += ["--port", str(url.port)]
+    if url.username:
+        args += ["--username", url.username]
+    return args
+
+
+def _manifest_path(backup_id: str, backup_dir: str) -> str:
+    if not BACKUP_ID_PATTERN.match(backup_id):
+        raise BackupError(f"Invalid backup id: {backup_id}")
+    return os.path.join(backup_dir, f"{backup_id}.json")
+
+
+def _stream_to_gzip(source, dest_path: str) -> Dict[str, int]:
+    """Copy a binary stream into a gzip file; returns raw/compressed sizes and checksum"""
+    digest = hashlib.sha256()
+    raw_bytes = 0
+
+    class _HashingWriter:
+        def __init__(self, fileobj):
+            self.fileobj = fileobj
+
+        def write(self, data):
+            digest.update(data)
+            return self.fileobj.write(data)
+
+        def flush(self):
+            self.fileobj.flush()
+
+    with open(dest_path, "wb") as out:
+        with gzip.GzipFile(fileobj=_HashingWriter(out), mode="wb", compresslevel=6) as gz:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                raw_bytes += len(chunk)
+                gz.write(chunk)
+        out.flush()
+        os.fsync(out.fileno())
+
+    return {"raw_size": raw_bytes, "size": os.path.getsize(dest_path), "checksum": digest.hexdigest()}
+
+
+def _file_checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _backup_sqlite(db_path: str, dest_path: str, work_dir: str) -> Dict[str, int]:
+    fd, snapshot = tempfile.mkstemp(suffix=".sqlite", dir=work_dir)
+    os.close(fd)
+    try:
+        source = sqlite3.connect(db_path)
+        target = sqlite3.connect(snapshot)
+        try:
+            # Copy in steps so other connections can write between them
+            source.backup(target, pages=BACKUP_PAGES_PER_STEP)
+        finally:
+            target.close()
+            source.close()
+        with open(snapshot, "rb") as f:
+            return _stream_to_gzip(f, dest_path)
+    finally:
+        os.remove(snapshot)
+
+
+def _backup_postgres(url, dest_path: str) -> Dict[str, int]:
+    command = ["pg_dump", "--format=plain", "--clean", "--if-exists", "--no-owner"] + _pg_args(url)
+    try:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   env=_pg_env(url))
+    except FileNotFoundError:
+        raise BackupError("pg_dump is not installed")
+    stats = _stream_to_gzip(process.stdout, dest_path)
+    stderr = process.stderr.read().decode(errors="replace")
+    if process.wait() != 0:
+        os.remove(dest_path)
+        raise BackupError(f"pg_dump failed: {stderr.strip()}")
+    return stats
+
+
+def create_backup(description: Optional[str] = None, backup_type: str = "manual",
+                  database_url: str = DATABASE_URL, backup_dir: str = BACKUP_DIR) -> Dict[str, Any]:
+    """Write a compressed backup plus manifest and apply retention; returns the manifest"""
+    os.makedirs(backup_dir, exist_ok=True)
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    now = datetime.utcnow()
+    backup_id = f"backup_{now.strftime('%Y%m%d_%H%M%S_%f')}"
+    extension = "sqlite.gz" if backend == "sqlite" else "sql.gz"
+    filename = f"{backup_id}.{extension}"
+    dest_path = os.path.join(backup_dir, filename)
+
+    started = time.perf_counter()
+    if backend == "sqlite":
+        stats = _backup_sqlite(_sqlite_path(url), dest_path, backup_dir)
+    elif backend == "postgresql":
+        stats = _backup_postgres(url, dest_path)
+    else:
+        raise BackupError(f"Backups are not supported for {backend} databases")
+    duration = time.perf_counter() - started
+
+    manifest = {
+        "id": backup_id,
+        "filename": filename,
+        "size": stats["size"],
+        "raw_size": stats["raw_size"],
+        "checksum": stats["checksum"],
+        "database": backend,
+        "created_at": now.isoformat() + "Z",
+        "type": backup_type,
+        "status": "completed",
+        "description": description,
+        "duration_seconds": round(duration, 3),
+        "throughput_mb_s": round(stats["raw_size"] / (1024 * 1024) / max(duration, 1e-6), 2),
+    }
+    with open(_manifest_path(backup_id, backup_dir), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    prune_backups(BACKUP_RETENTION, backup_dir, backup_type)
+    return manifest
+
+
+def list_backups(backup_dir: str = BACKUP_DIR) -> List[Dict[str, Any]]:
+    """Manifests of all backups, newest first"""
+    if not os.path.isdir(backup_dir):
+        return []
+    manifests = []
+    for name in os.listdir(backup_dir):
+        if name.endswith(".json") and BACKUP_ID_PATTERN.match(name[:-5]):
+            with open(os.path.join(backup_dir, name)) as f:
+                manifests.append(json.load(f))
+    return sorted(manifests, key=lambda m: m["id"], reverse=True)
+
+
+def get_backup(backup_id: str, backup_dir: str = BACKUP_DIR) -> Optional[Dict[str, Any]]:
+    path = _manifest_path(backup_id, backup_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def backup_file_path(manifest: Dict[str, Any], backup_dir: str = BACKUP_DIR) -> str:
+    return os.path.join(backup_dir, os.path.basename(manifest["filename"]))
+
+
+def delete_backup(backup_id: str, backup_dir: str = BACKUP_DIR) -> bool:
+    manifest = get_backup(backup_id, backup_dir)
+    if manifest is None:
+        return False
+    data_path = backup_file_path(manifest, backup_dir)
+    if os.path.exists(data_path):
+        os.remove(data_path)
+    os.remove(_manifest_path(backup_id, backup_dir))
+    return True
+
+
+def prune_backups(retention: int = BACKUP_RETENTION, backup_dir: str = BACKUP_DIR,
+                  backup_type: Optional[str] = None) -> List[str]:
+    """Delete all but the newest `retention` backups (of one type, if given)"""
+    manifests = [m for m in list_backups(backup_dir) if backup_type is None or m["type"] == backup_type]
+    removed = [m["id"] for m in manifests[retention:]]
+    for backup_id in removed:
+        delete_backup(backup_id, backup_dir)
+    return removed
+
+
+def verify_backup(manifest: Dict[str, Any], backup_dir: str = BACKUP_DIR) -> None:
+    """Raise BackupError unless the backup file matches its manifest checksum"""
+    data_path = backup_file_path(manifest, backup_dir)
+    if not os.path.exists(data_path):
+        raise BackupError(f"Backup file {manifest['filename']} is missing")
+    if _file_checksum(data_path) != manifest["checksum"]:
+        raise BackupError(f"Checksum mismatch for backup {manifest['id']}")
+
+
+def _restore_sqlite(data_path: str, db_path: str, engine: Optional[Engine]) -> None:
+    fd, restored = tempfile.mkstemp(suffix=".sqlite", dir=os.path.dirname(db_path))
+    os.close(fd)
+    try:
+        with gzip.open(data_path, "rb") as src, open(restored, "wb") as out:
+            shutil.copyfileobj(src, out, CHUNK_SIZE)
+
+        candidate = sqlite3.connect(restored)
+        try:
+            result = candidate.execute("PRAGMA integrity_check").fetchone()[0]
+            if result != "ok":
+                raise BackupError(f"Backup failed integrity check: {result}")
+
+            # Copying back through the backup API takes SQLite's own locks, so
+            # other connections and worker processes never see a half-written file
+            live = sqlite3.connect(db_path, timeout=30)
+            try:
+                candidate.backup(live)
+            finally:
+                live.close()
+        finally:
+            candidate.close()
+    finally:
+        os.remove(restored)
+
+    if engine is not None:
+        engine.dispose()
+
+
+def _restore_postgres(url, data_path: str, engine: Optional[Engine]) -> None:
+    if engine is not None:
+        engine.dispose()
+    command = ["psql", "--quiet", "--single-transaction", "--set", "ON_ERROR_STOP=1"] + _pg_args(url)
+    try:
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.PIPE, env=_pg_env(url))
+    except FileNotFoundError:
+        raise BackupError("psql is not installed")
+    with gzip.open(data_path, "rb") as src:
+        try:
+            shutil.copyfileobj(src, process.stdin, CHUNK_SIZE)
+        finally:
+            process.stdin.close()
+    stderr = process.stderr.read().decode(errors="replace")
+    if process.wait() != 0:
+        # --single-transaction means the database was left untouched
+        raise BackupError(f"psql restore failed: {stderr.strip()}")
+
+
+def _high_water_marks(engine: Engine) -> Dict[str, int]:
+    with Session(engine) as db:
+        return {
+            "change_log": db.scalar(select(func.coalesce(func.max(models.ChangeLogEntry.id), 0))),
+            "cache_invalidations": db.scalar(select(func.coalesce(func.max(models.CacheInvalidation.id), 0))),
+        }
+
+
+def _resume_after_restore(engine: Engine, high_water: Dict[str, int]) -> None:
+    with Session(engine) as db:
+        changes.mark_restore(db, high_water["change_log"])
+        cache.mark_restore(db, high_water["cache_invalidations"])
+        db.commit()
+    cache.invalidate_all_local()
+
+
+def restore_backup(backup_id: str, database_url: str = DATABASE_URL, engine: Optional[Engine] = None,
+                   backup_dir: str = BACKUP_DIR) -> Dict[str, Any]:
+    """
+    Verify a backup and load it into the live database; returns timing stats
+
+    Pass the application's engine: its pool is reset, and caches and sync
+    cursors are brought in line with the restored data.
+    """
+    manifest = get_backup(backup_id, backup_dir)
+    if manifest is None:
+        raise BackupError(f"Backup {backup_id} not found")
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if manifest["database"] != backend:
+        raise BackupError(f"Backup {backup_id} is a {manifest['database']} backup, not {backend}")
+
+    started = time.perf_counter()
+    verify_backup(manifest, backup_dir)
+    data_path = backup_file_path(manifest, backup_dir)
+    high_water = _high_water_marks(engine) if engine is not None else None
+    if backend == "sqlite":
+        _restore_sqlite(data_path, _sqlite_path(url), engine)
+    else:
+        _restore_postgres(url, data_path, engine)
+    if high_water is not None:
+        _resume_after_restore(engine, high_water)
+    duration = time.perf_counter() - started
+
+    return {
+        "id": backup_id,
+        "duration_seconds": round(duration, 3),
+        "throughput_mb_s": round(manifest["raw_size"] / (1024 * 1024) / max(duration, 1e-6), 2),
+    }
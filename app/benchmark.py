@@ -0,0 +1,150 @@
+"""
+Endpoint benchmarks for Music U Scheduler
+
+Drives the application in-process through Starlette's TestClient against a
+database filled by app.datagen, and reports latency percentiles and SQL
+statements per request (from the X-Query-Count header) for the key
+endpoints. Results are plain JSON so runs from different releases can be
+compared with compare(); see scripts/benchmark.py for the command line.
+"""
+
+import math
+import platform
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import sqlalchemy
+from fastapi.testclient import TestClient
+
+from .database import get_db
+from .datagen import DEFAULT_PASSWORD
+
+RESULT_FORMAT_VERSION = 1
+
+
+class Endpoint(NamedTuple):
+    name: str
+    method: str
+    path: str
+    user: Optional[str]  # Username to authenticate as, None for anonymous
+    params: Optional[Dict[str, Any]] = None
+    form: Optional[Dict[str, Any]] = None
+
+
+ENDPOINTS = [
+    Endpoint("login", "POST", "/auth/login", None,
+             form={"username": "instructor1", "password": DEFAULT_PASSWORD}),
+    Endpoint("instructor_dashboard", "GET", "/instructor/dashboard", "instructor1"),
+    Endpoint("admin_dashboard", "GET", "/admin/dashboard", "admin"),
+    Endpoint("admin_lessons", "GET", "/admin/lessons", "admin", params={"limit": 100}),
+    Endpoint("admin_reports_users", "GET", "/admin/reports/users", "admin", params={"limit": 100}),
+    Endpoint("admin_reports_lessons", "GET", "/admin/reports/lessons", "admin"),
+    Endpoint("lesson_search", "GET", "/admin/lessons/search", "admin", params={"q": "Violin", "limit": 50}),
+]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of the samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies: List[float], query_counts: List[int], errors: int) -> Dict[str, Any]:
+    ms = [latency * 1000 for latency in latencies]
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "mean_ms": round(sum(ms) / len(ms), 3) if ms else 0.0,
+        "max_ms": round(max(ms), 3) if ms else 0.0,
+        "queries_per_request": round(sum(query_counts) / len(query_counts), 2) if query_counts else 0.0,
+        "max_queries": max(query_counts) if query_counts else 0,
+    }
+
+
+def _login(client: TestClient, username: str, password: str) -> Dict[str, str]:
+    response = client.post("/auth/login", data={"username": username, "password": password})
+    if response.status_code != 200:
+        raise RuntimeError(f"Could not sign in as {username}: {response.status_code} {response.text}")
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def run_benchmark(app, session_factory: Optional[Callable] = None, requests: int = 100, warmup: int = 5,
+                  endpoints: List[Endpoint] = ENDPOINTS, password: str = DEFAULT_PASSWORD,
+                  dataset: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """Time `requests` calls to each endpoint after `warmup` untimed ones
+
+    With session_factory the app's get_db dependency is pointed at that
+    database for the duration of the run.
+    """
+    if session_factory is not None:
+        def _benchmark_db():
+            db = session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+        app.dependency_overrides[get_db] = _benchmark_db
+
+    results: Dict[str, Any] = {}
+    try:
+        client = TestClient(app)
+        headers = {user: _login(client, user, password)
+                   for user in sorted({e.user for e in endpoints if e.user is not None})}
+
+        for endpoint in endpoints:
+            def call():
+                return client.request(endpoint.method, endpoint.path, params=endpoint.params,
+                                      data=endpoint.form, headers=headers.get(endpoint.user))
+
+            for _ in range(warmup):
+                call()
+            latencies, query_counts, errors = [], [], 0
+            for _ in range(requests):
+                started = time.perf_counter()
+                response = call()
+                latencies.append(time.perf_counter() - started)
+                query_counts.append(int(response.headers.get("x-query-count", 0)))
+                if response.status_code >= 400:
+                    errors += 1
+            results[endpoint.name] = {"method": endpoint.method, "path": endpoint.path,
+                                      **summarize(latencies, query_counts, errors)}
+    finally:
+        if session_factory is not None:
+            app.dependency_overrides.pop(get_db, None)
+
+    return {
+        "format_version": RESULT_FORMAT_VERSION,
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "environment": {
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "platform": platform.platform(),
+        },
+        "dataset": dataset or {},
+        "settings": {"requests": requests, "warmup": warmup},
+        "endpoints": results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.2) -> List[str]:
+    """Regressions of `current` against `baseline`: slower p95 beyond tolerance, or more queries"""
+    regressions = []
+    for name, before in baseline.get("endpoints", {}).items():
+        after = current.get("endpoints", {}).get(name)
+        if after is None:
+            continue
+        if after["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {after['p95_ms']}ms")
+        if after["queries_per_request"] > before["queries_per_request"]:
+            regressions.append(
+                f"{name}: queries/request {before['queries_per_request']} -> {after['queries_per_request']}")
+        if after["errors"] > before["errors"]:
+            regressions.append(f"{name}: errors {before['errors']} -> {after['errors']}")
+    return regressions
@@ -0,0 +1,282 @@
+"""
+In-process caches kept coherent across uvicorn workers
+
+Each worker holds its own LocalCache instances. Code that changes cached data
+calls publish() on its session; when that session commits, the entry is
+dropped in this worker and broadcast to the others:
+
+- PostgreSQL: pg_notify() inside the writing transaction, so other workers
+  hear about it only if the transaction commits. InvalidationListener holds a
+  LISTEN connection.
+- SQLite: a row in cache_invalidations, written in the same transaction.
+  InvalidationListener polls the cheap PRAGMA data_version and reads new rows
+  only after another connection has committed.
+"""
+
+import json
+import logging
+import os
+import select
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import event, insert, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration
+CACHE_DEFAULT_TTL = float(os.getenv("CACHE_DEFAULT_TTL", "300"))
+CACHE_POLL_INTERVAL = float(os.getenv("CACHE_POLL_INTERVAL", "0.5"))
+CACHE_INVALIDATION_RETENTION = timedelta(hours=1)  # SQLite feed rows kept this long
+NOTIFY_CHANNEL = "cache_invalidation"
+
+_PENDING = "cache_invalidations"  # Session.info key for invalidations awaiting commit
+_MISSING = object()
+
+
+class LocalCache:
+    """Thread-safe TTL cache for one namespace in this worker"""
+
+    def __init__(self, namespace: str, ttl: float = CACHE_DEFAULT_TTL, maxsize: int = 1024):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(str(key))
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[str(key)]
+                return default
+            return value
+
+    def set(self, key: Any, value: Any) -> None:
+        with self._lock:
+            if len(self._entries) >= self.maxsize:
+                # Drop the entry closest to expiry
+                oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                del self._entries[oldest]
+            self._entries[str(key)] = (time.monotonic() + self.ttl, value)
+
+    def get_or_load(self, key: Any, loader: Callable[[], Any]) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key: Optional[Any] = None) -> None:
+        """Drop one key, or everything when key is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(key), None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_caches: Dict[str, LocalCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(namespace: str, ttl: float = CACHE_DEFAULT_TTL, maxsize: int = 1024) -> LocalCache:
+    """Return the worker's cache for a namespace, creating it on first use"""
+    with _caches_lock:
+        if namespace not in _caches:
+            _caches[namespace] = LocalCache(namespace, ttl, maxsize)
+        return _caches[namespace]
+
+
+_handlers: Dict[str, List[Callable[[Optional[str]], None]]] = {}
+
+
+def on_invalidate(namespace: str, handler: Callable[[Optional[str]], None]) -> None:
+    """Also call handler(key) whenever a namespace is invalidated in this worker
+
+    Turns publish() into a cross-worker message bus: the handler sees keys
+    published by any worker, and None when messages may have been missed.
+    It runs on the committing thread or the listener thread, so it must be
+    quick and thread-safe.
+    """
+    _handlers.setdefault(namespace, []).append(handler)
+
+
+def _notify(namespace: str, key: Optional[str]) -> None:
+    for handler in _handlers.get(namespace, ()):
+        try:
+            handler(key)
+        except Exception as e:
+            logger.warning("Invalidation handler for %s failed: %s", namespace, e)
+
+
+def invalidate_local(namespace: str, key: Optional[Any] = None) -> None:
+    cache = _caches.get(namespace)
+    if cache is not None:
+        cache.invalidate(key)
+    _notify(namespace, None if key is None else str(key))
+
+
+def invalidate_all_local() -> None:
+    for cache in list(_caches.values()):
+        cache.invalidate()
+    for namespace in list(_handlers):
+        _notify(namespace, None)
+
+
+def publish(db: Session, namespace: str, key: Optional[Any] = None) -> None:
+    """Invalidate a key (or whole namespace) in every worker once db commits"""
+    pending = db.info.setdefault(_PENDING, [])
+    entry = (namespace, None if key is None else str(key))
+    if entry not in pending:
+        pending.append(entry)
+
+
+def mark_restore(db: Session, high_water: int) -> None:
+    """
+    Invalidate every namespace in every worker once db commits, after a restore
+
+    high_water is the largest cache_invalidations id before the restore. On
+    SQLite the restored table's ids start below it, so they are moved past
+    it first; otherwise listeners would skip the rows published here.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        if db.execute(text("SELECT 1 FROM sqlite_sequence WHERE name = 'cache_invalidations'")).first() is None:
+            db.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('cache_invalidations', :seq)"),
+                       {"seq": high_water})
+        else:
+            db.execute(text("UPDATE sqlite_sequence SET seq = MAX(seq, :seq) WHERE name = 'cache_invalidations'"),
+                       {"seq": high_water})
+    for namespace in set(_caches) | set(_handlers):
+        publish(db, namespace)
+
+
+@event.listens_for(Session, "before_commit")
+def _broadcast_invalidations(session: Session) -> None:
+    pending = session.info.get(_PENDING)
+    if not pending:
+        return
+    if session.get_bind().dialect.name == "postgresql":
+        for namespace, key in pending:
+            session.execute(text("SELECT pg_notify(:channel, :payload)"),
+                            {"channel": NOTIFY_CHANNEL, "payload": json.dumps([namespace, key])})
+    else:
+        # Core insert: the ORM bulk path would split rows with and without a key into two statements
+        session.execute(insert(models.CacheInvalidation.__table__),
+                        [{"namespace": namespace, "key": key} for namespace, key in pending])
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_invalidations(session: Session) -> None:
+    for namespace, key in session.info.pop(_PENDING, None) or []:
+        invalidate_local(namespace, key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+class InvalidationListener:
+    """Background thread applying other workers' invalidations to this worker"""
+
+    def __init__(self, bind: Engine, poll_interval: float = CACHE_POLL_INTERVAL):
+        self.bind = bind
+        self.poll_interval = poll_interval
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-invalidation", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval * 4 + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                if self.bind.dialect.name == "postgresql":
+                    self._listen_postgres()
+                else:
+                    self._poll_sqlite()
+            except Exception as e:
+                logger.warning("Cache invalidation listener error: %s", e)
+                # Messages may have been missed while disconnected
+                invalidate_all_local()
+                self._stopping.wait(self.poll_interval * 4)
+
+    def _dedicated_connection(self):
+        raw = self.bind.raw_connection()
+        raw.detach()  # Never hand this connection back to the pool
+        return raw
+
+    def _listen_postgres(self) -> None:
+        raw = self._dedicated_connection()
+        try:
+            connection = raw.dbapi_connection
+            connection.autocommit = True
+            connection.cursor().execute(f"LISTEN {NOTIFY_CHANNEL}")
+            invalidate_all_local()
+            while not self._stopping.is_set():
+                if not select.select([connection], [], [], self.poll_interval)[0]:
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    namespace, key = json.loads(connection.notifies.pop(0).payload)
+                    invalidate_local(namespace, key)
+        finally:
+            raw.close()
+
+    def _poll_sqlite(self) -> None:
+        raw = self._dedicated_connection()
+        try:
+            connection = raw.dbapi_connection
+            last_id = connection.execute("SELECT COALESCE(MAX(id), 0) FROM cache_invalidations").fetchone()[0]
+            last_version = connection.execute("PRAGMA data_version").fetchone()[0]
+            last_prune = 0.0
+            invalidate_all_local()
+            while not self._stopping.wait(self.poll_interval):
+                # data_version only changes when another connection commits
+                version = connection.execute("PRAGMA data_version").fetchone()[0]
+                if version == last_version:
+                    continue
+                last_version = version
+                rows = connection.execute(
+                    "SELECT id, namespace, key FROM cache_invalidations WHERE id > ? ORDER BY id",
+                    (last_id,)
+                ).fetchall()
+                for row_id, namespace, key in rows:
+                    invalidate_local(namespace, key)
+                    last_id = row_id
+                if not rows and connection.execute(
+                    "SELECT COALESCE(MAX(id), 0) FROM cache_invalidations"
+                ).fetchone()[0] < last_id:
+                    # Ids started over (table rebuilt or database restored): start from a clean slate
+                    invalidate_all_local()
+                    last_id = 0
+
+                if time.monotonic() - last_prune > CACHE_INVALIDATION_RETENTION.total_seconds():
+                    cutoff = datetime.utcnow() - CACHE_INVALIDATION_RETENTION
+                    connection.execute("DELETE FROM cache_invalidations WHERE created_at < ?",
+                                       (cutoff.strftime("%Y-%m-%d %H:%M:%S"),))
+                    connection.commit()
+                    last_prune = time.monotonic()
+        finally:
+            raw.close()
@@ -0,0 +1,155 @@
+"""
+Sequenced change log for delta sync of lessons and users
+
+crud calls record() for every lesson and user write. When the session
+commits, one change_log row per changed resource is inserted in the same
+transaction, so the log can never disagree with the data. The row id is the
+sync cursor: GET /lessons/changes?since=<cursor> returns what changed after
+it, deletes included as tombstones.
+
+Ids must become visible in order, or a reader could move its cursor past a
+row that commits later. SQLite serializes writers already; on PostgreSQL
+the insert takes a transaction-level advisory lock, held only from commit
+start to commit end, so change_log ids are handed out in commit order.
+Rows older than CHANGE_LOG_RETENTION_DAYS are pruned daily; a client whose
+cursor predates that gets 410 and resyncs in full. So does a client whose
+cursor points past what a backup restore put back: mark_restore() leaves a
+row that expires every cursor the restored log never reached.
+"""
+
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import delete, event, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+# Change log configuration
+CHANGE_LOG_RETENTION_DAYS = int(os.getenv("CHANGE_LOG_RETENTION_DAYS", "30"))
+CHANGE_LOG_LOCK_ID = 72310044  # pg_advisory_xact_lock key serializing change_log inserts
+
+INSERT, UPDATE, DELETE = "insert", "update", "delete"
+RESTORE = "restore"  # Marker row; its resource_id is the last cursor the restore kept
+
+_PENDING = "change_log"  # Session.info key for changes awaiting commit
+
+
+class CursorExpired(Exception):
+    """The requested cursor is older than the retained change log"""
+
+
+def record(db: Session, resource_type: str, resource_id: int, operation: str) -> None:
+    """Log a write to be committed with db (created resources must be flushed to have an id)"""
+    pending: Dict[Tuple[str, int], str] = db.info.setdefault(_PENDING, {})
+    key = (resource_type, resource_id)
+    previous = pending.get(key)
+    if previous == INSERT and operation == DELETE:
+        del pending[key]  # Never visible outside this transaction
+    elif previous != INSERT:
+        pending[key] = operation
+
+
+@event.listens_for(Session, "before_commit")
+def _write_change_log(session: Session) -> None:
+    pending = session.info.pop(_PENDING, None)
+    if not pending:
+        return
+    if session.get_bind().dialect.name == "postgresql":
+        session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": CHANGE_LOG_LOCK_ID})
+    now = datetime.utcnow()
+    session.execute(insert(models.ChangeLogEntry), [
+        {"resource_type": resource_type, "resource_id": resource_id, "operation": operation, "changed_at": now}
+        for (resource_type, resource_id), operation in pending.items()
+    ])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+def current_cursor(db: Session) -> int:
+    """Cursor of the latest change; a full fetch taken after this starts delta sync from here"""
+    return db.query(func.coalesce(func.max(models.ChangeLogEntry.id), 0)).scalar()
+
+
+def mark_restore(db: Session, high_water: int) -> None:
+    """
+    Expire cursors lost to a restore that rewound the change log
+
+    high_water is the largest change_log id before the restore. Ids continue
+    after it, so a cursor from before the restore is never reused for a
+    different change.
+    """
+    restored = current_cursor(db)
+    if high_water <= restored:
+        return
+    db.execute(insert(models.ChangeLogEntry).values(
+        id=high_water + 1, resource_type="change_log", resource_id=restored,
+        operation=RESTORE, changed_at=datetime.utcnow()
+    ))
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT setval(pg_get_serial_sequence('change_log', 'id'), :id)"),
+                   {"id": high_water + 1})
+
+
+def read_changes(db: Session, since: int, limit: int) -> Tuple[List[Dict[str, Any]], int, bool]:
+    """
+    Changes after since, one entry per resource
+
+    Returns:
+        (changes, next cursor, whether more changes follow). Each change is
+        {"cursor", "resource_type", "resource_id", "operation"}; a resource
+        written several times in the window is reported once, at its latest
+        cursor.
+
+    Raises:
+        CursorExpired: rows after since have already been pruned, or since
+            is past the log (lost in a restore)
+    """
+    rows = db.query(models.ChangeLogEntry).filter(
+        models.ChangeLogEntry.id > since
+    ).order_by(models.ChangeLogEntry.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if since > 0 and (not rows or rows[0].id != since + 1):
+        oldest, newest = db.query(func.min(models.ChangeLogEntry.id), func.max(models.ChangeLogEntry.id)).one()
+        if oldest is not None and since < oldest - 1:
+            raise CursorExpired(f"Cursor {since} is older than the change log")
+        if since > (newest or 0):
+            raise CursorExpired(f"Cursor {since} is newer than the change log")
+    if rows and rows[0].operation == RESTORE and since > rows[0].resource_id:
+        raise CursorExpired(f"Cursor {since} was rolled back by a restore")
+
+    changes: Dict[Tuple[str, int], Dict[str, Any]] = {}
+    for row in rows:
+        if row.operation == RESTORE:
+            continue
+        key = (row.resource_type, row.resource_id)
+        first = changes.pop(key, None)
+        operation = row.operation
+        if first is not None and first["operation"] == INSERT and operation != DELETE:
+            operation = INSERT  # Still new to a client at since
+        changes[key] = {"cursor": row.id, "resource_type": row.resource_type,
+                        "resource_id": row.resource_id, "operation": operation}
+
+    next_cursor = rows[-1].id if rows else since
+    return list(changes.values()), next_cursor, has_more
+
+
+def prune(db: Session, older_than_days: int = CHANGE_LOG_RETENTION_DAYS) -> int:
+    """Delete expired rows, always keeping the newest so cursor expiry stays detectable"""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    newest = select(func.max(models.ChangeLogEntry.id)).scalar_subquery()
+    result = db.execute(delete(models.ChangeLogEntry).where(
+        models.ChangeLogEntry.changed_at < cutoff,
+        models.ChangeLogEntry.id < newest
+    ))
+    db.commit()
+    return result.rowcount
@@ -1,10 +1,46 @@
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, func, desc, asc
-from . import models, schemas
+from sqlalchemy import and_, or_, func, desc, asc, case, delete, insert, literal, select, union, union_all, update
+from sqlalchemy.types import DateTime
+from . import cache, changes, events, models, schemas
 from .auth.utils import get_password_hash
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Sequence
 import json
+import re
+
+
+def _guarded_update(db: Session, model, row_id: int, values: Dict[str, Any], conditions: Sequence = ()):
+    """
+    UPDATE one row only if it still matches conditions, in one round trip
+
+    The conditions (ownership, expected state) go in the WHERE clause, so
+    checking and writing cannot race. Returns the updated instance, or None
+    when no row matched; callers look the row up only on that error path.
+    Bulk UPDATEs bypass the mapper, so the version column is bumped here.
+    """
+    version_column = model.__mapper__.version_id_col
+    if version_column is not None:
+        values = dict(values, **{version_column.key: version_column + 1})
+    statement = update(model).where(model.id == row_id, *conditions).values(**values)
+    if db.get_bind().dialect.update_returning:
+        return db.execute(
+            statement.returning(model),
+            execution_options={"populate_existing": True, "synchronize_session": "fetch"}
+        ).scalars().first()
+    # No RETURNING (e.g. old SQLite or MySQL): read the row back by primary key
+    if db.execute(statement, execution_options={"synchronize_session": False}).rowcount == 0:
+        return None
+    return db.get(model, row_id, populate_existing=True)
+
+
+def _commit_keeping_loaded(db: Session) -> None:
+    """Commit without expiring loaded instances, whose values were just returned by this transaction"""
+    expire_on_commit = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        db.commit()
+    finally:
+        db.expire_on_commit = expire_on_commit
 
 
 # User CRUD Operations
@@ -12,6 +48,19 @@ def get_user(db: Session, user_id: int):
     return db.query(models.User).filter(models.User.id == user_id).first()
 
 
+def _in_requested_order(rows: List[Any], ids: List[int]) -> List[Any]:
+    by_id = {row.id: row for row in rows}
+    return [by_id[row_id] for row_id in dict.fromkeys(ids) if row_id in by_id]
+
+
+def get_users_by_ids(db: Session, user_ids: List[int]) -> List[models.User]:
+    """Users with the given ids, in that order, from one IN query (missing ids are skipped)"""
+    if not user_ids:
+        return []
+    users = db.query(models.User).filter(models.User.id.in_(set(user_ids))).all()
+    return _in_requested_order(users, user_ids)
+
+
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
@@ -64,6 +113,11 @@ def create_user(db: Session, user: schemas.UserCreate, created_by: Optional[int]
         specializations=user.specializations
     )
     db.add(db_user)
+    db.flush()  # The change log needs the user id
+    if db_user.specializations:
+        _link_specializations(db, db_user.id, db_user.specializations)
+    cache.publish(db, "dashboards")
+    changes.record(db, "user", db_user.id, changes.INSERT)
     db.commit()
     db.refresh(db_user)
     
@@ -74,31 +128,34 @@ def create_user(db: Session, user: schemas.UserCreate, created_by: Optional[int]
     return db_user
 
 
-def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate, updated_by: Optional[int] = None):
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
-    if db_user:
-        update_data = user_update.model_dump(exclude_unset=True)
-        if 'password' in update_data:
-            update_data['hashed_password'] = get_password_hash(update_data.pop('password'))
-        
-        # Handle role and is_teacher synchronization
-        if 'role' in update_data:
-            if update_data['role'] == models.UserRole.INSTRUCTOR:
-                update_data['is_teacher'] = True
-            elif update_data['role'] == models.UserRole.STUDENT:
-                update_data['is_teacher'] = False
-        
-        for field, value in update_data.items():
-            setattr(db_user, field, value)
-        
-        db_user.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(db_user)
-        
-        # Log the update
-        if updated_by:
-            log_audit_action(db, updated_by, "UPDATE", "user", db_user.id, f"Updated user: {db_user.username}")
-    
+def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate, updated_by: Optional[int] = None,
+                conditions: Sequence = ()):
+    """Update a user with one UPDATE ... RETURNING; None if no user matches user_id and conditions"""
+    update_data = user_update.model_dump(exclude_unset=True)
+    if 'password' in update_data:
+        update_data['hashed_password'] = get_password_hash(update_data.pop('password'))
+    
+    # Handle role and is_teacher synchronization
+    if 'role' in update_data:
+        if update_data['role'] == models.UserRole.INSTRUCTOR:
+            update_data['is_teacher'] = True
+        elif update_data['role'] == models.UserRole.STUDENT:
+            update_data['is_teacher'] = False
+    
+    update_data['updated_at'] = datetime.utcnow()
+    db_user = _guarded_update(db, models.User, user_id, update_data, conditions)
+    if db_user is None:
+        return None
+    if 'specializations' in update_data:
+        _link_specializations(db, user_id, update_data['specializations'])
+    
+    cache.publish(db, "users", user_id)
+    cache.publish(db, "dashboards")
+    changes.record(db, "user", user_id, changes.UPDATE)
+    # Log the update in the same transaction
+    if updated_by:
+        db.add(_audit_entry(updated_by, "UPDATE", "user", user_id, f"Updated user: {db_user.username}"))
+    _commit_keeping_loaded(db)
     return db_user
 
 
@@ -106,7 +163,13 @@ def delete_user(db: Session, user_id: int, deleted_by: Optional[int] = None):
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
     if db_user:
         username = db_user.username
+        db.execute(delete(models.InstructorSpecialization).where(
+            models.InstructorSpecialization.instructor_id == user_id
+        ))
         db.delete(db_user)
+        cache.publish(db, "users", user_id)
+        cache.publish(db, "dashboards")
+        changes.record(db, "user", user_id, changes.DELETE)
         db.commit()
         
         # Log the deletion
@@ -125,6 +188,128 @@ def update_user_last_login(db: Session, user_id: int):
     return db_user
 
 
+# Instructor Roles
+INSTRUCTOR_ROLES_NAMESPACE = "instructor_roles"
+
+
+def get_instructor_roles(db: Session) -> List[Dict[str, Any]]:
+    """The role catalog, from this worker's cache; it is tiny and read on every role lookup"""
+    roles = cache.get_cache(INSTRUCTOR_ROLES_NAMESPACE).get_or_load("all", lambda: _load_instructor_roles(db))
+    return [dict(role) for role in roles]
+
+
+def _load_instructor_roles(db: Session) -> tuple:
+    return tuple(
+        {"id": role.id, "name": role.name, "instrument": role.instrument, "description": role.description or ""}
+        for role in db.query(models.InstructorRole).order_by(models.InstructorRole.name)
+    )
+
+
+def get_instructor_role(db: Session, role_id: str) -> Optional[Dict[str, Any]]:
+    return next((role for role in get_instructor_roles(db) if role["id"] == role_id), None)
+
+
+def create_instructor_role(db: Session, role: schemas.InstructorRoleCreate) -> Optional[Dict[str, Any]]:
+    """Add a role to the catalog; None if its id is taken"""
+    role_id = role.id or re.sub(r"[^a-z0-9]+", "-", role.instrument.lower()).strip("-")
+    if db.get(models.InstructorRole, role_id) is not None:
+        return None
+    db.add(models.InstructorRole(id=role_id, **role.model_dump(exclude={"id"})))
+    cache.publish(db, INSTRUCTOR_ROLES_NAMESPACE)
+    db.commit()
+    return get_instructor_role(db, role_id)
+
+
+def update_instructor_role(db: Session, role_id: str,
+                           role_update: schemas.InstructorRoleUpdate) -> Optional[Dict[str, Any]]:
+    db_role = db.get(models.InstructorRole, role_id)
+    if db_role is None:
+        return None
+    for field, value in role_update.model_dump(exclude_unset=True).items():
+        setattr(db_role, field, value)
+    cache.publish(db, INSTRUCTOR_ROLES_NAMESPACE)
+    db.commit()
+    return get_instructor_role(db, role_id)
+
+
+def delete_instructor_role(db: Session, role_id: str) -> bool:
+    """Remove a role and every assignment of it; specializations text is left as typed"""
+    db_role = db.get(models.InstructorRole, role_id)
+    if db_role is None:
+        return False
+    db.execute(delete(models.InstructorSpecialization).where(models.InstructorSpecialization.role_id == role_id))
+    db.delete(db_role)
+    cache.publish(db, INSTRUCTOR_ROLES_NAMESPACE)
+    db.commit()
+    return True
+
+
+def _specialization_tokens(specializations: Optional[str]) -> List[str]:
+    return [token.strip() for token in (specializations or "").split(",") if token.strip()]
+
+
+def _role_ids_named(db: Session, specializations: Optional[str]) -> List[str]:
+    """Catalog roles named in a specializations string, matched whole by id or instrument, ignoring case"""
+    by_name = {}
+    for role in get_instructor_roles(db):
+        by_name[role["instrument"].lower()] = role["id"]
+        by_name[role["id"].lower()] = role["id"]
+    role_ids = []
+    for token in _specialization_tokens(specializations):
+        role_id = by_name.get(token.lower())
+        if role_id and role_id not in role_ids:
+            role_ids.append(role_id)
+    return role_ids
+
+
+def _link_specializations(db: Session, instructor_id: int, specializations: Optional[str]) -> None:
+    """Replace a user's indexed roles with those named in their specializations text"""
+    db.execute(delete(models.InstructorSpecialization).where(
+        models.InstructorSpecialization.instructor_id == instructor_id
+    ))
+    role_ids = _role_ids_named(db, specializations)
+    if role_ids:
+        db.execute(insert(models.InstructorSpecialization.__table__),
+                   [{"instructor_id": instructor_id, "role_id": role_id} for role_id in role_ids])
+
+
+def get_instructor_role_ids(db: Session, instructor_id: int) -> List[str]:
+    return db.execute(
+        select(models.InstructorSpecialization.role_id)
+        .where(models.InstructorSpecialization.instructor_id == instructor_id)
+        .order_by(models.InstructorSpecialization.role_id)
+    ).scalars().all()
+
+
+def assign_instructor_role(db: Session, instructor: models.User, role_id: str) -> bool:
+    """Give an instructor a catalog role; False if they already hold it"""
+    if db.get(models.InstructorSpecialization, (instructor.id, role_id)) is not None:
+        return False
+    if role_id not in _role_ids_named(db, instructor.specializations):
+        instructor.specializations = ",".join(_specialization_tokens(instructor.specializations) + [role_id])
+    db.add(models.InstructorSpecialization(instructor_id=instructor.id, role_id=role_id))
+    cache.publish(db, "users", instructor.id)
+    changes.record(db, "user", instructor.id, changes.UPDATE)
+    db.commit()
+    return True
+
+
+def remove_instructor_role(db: Session, instructor: models.User, role_id: str) -> bool:
+    """Take a role from an instructor, with the words naming it in their specializations; False if not held"""
+    link = db.get(models.InstructorSpecialization, (instructor.id, role_id))
+    if link is None:
+        return False
+    role = get_instructor_role(db, role_id)
+    names = {role_id.lower(), role["instrument"].lower()} if role else {role_id.lower()}
+    kept = [token for token in _specialization_tokens(instructor.specializations) if token.lower() not in names]
+    instructor.specializations = ",".join(kept) or None
+    db.delete(link)
+    cache.publish(db, "users", instructor.id)
+    changes.record(db, "user", instructor.id, changes.UPDATE)
+    db.commit()
+    return True
+
+
 # Lesson CRUD Operations
 def get_lesson(db: Session, lesson_id: int):
     return db.query(models.Lesson).options(
@@ -134,6 +319,17 @@ def get_lesson(db: Session, lesson_id: int):
     ).filter(models.Lesson.id == lesson_id).first()
 
 
+def get_lessons_by_ids(db: Session, lesson_ids: List[int]) -> List[models.Lesson]:
+    """Lessons with the given ids, in that order, with teacher and student from one query (missing ids are skipped)"""
+    if not lesson_ids:
+        return []
+    lessons = db.query(models.Lesson).options(
+        joinedload(models.Lesson.teacher),
+        joinedload(models.Lesson.student)
+    ).filter(models.Lesson.id.in_(set(lesson_ids))).all()
+    return _in_requested_order(lessons, lesson_ids)
+
+
 def get_lessons(db: Session, skip: int = 0, limit: int = 100, status: Optional[str] = None, 
                 date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
     query = db.query(models.Lesson).options(
@@ -165,16 +361,73 @@ def get_lessons_count(db: Session, status: Optional[str] = None,
     return query.scalar()
 
 
-def get_lessons_by_teacher(db: Session, teacher_id: int, skip: int = 0, limit: int = 100, 
-                          status: Optional[str] = None):
-    query = db.query(models.Lesson).options(
-        joinedload(models.Lesson.student)
-    ).filter(models.Lesson.teacher_id == teacher_id)
-    
+def _teacher_lessons_query(query, teacher_id: int, status: Optional[str] = None,
+                           date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+    """Filters that ix_lessons_teacher_scheduled (teacher_id, scheduled_at) can answer"""
+    query = query.filter(models.Lesson.teacher_id == teacher_id)
     if status:
         query = query.filter(models.Lesson.status == status)
-    
-    return query.order_by(models.Lesson.scheduled_at).offset(skip).limit(limit).all()
+    if date_from:
+        query = query.filter(models.Lesson.scheduled_at >= date_from)
+    if date_to:
+        query = query.filter(models.Lesson.scheduled_at < date_to)
+    return query
+
+
+def get_lessons_by_teacher(db: Session, teacher_id: int, skip: int = 0, limit: int = 100, 
+                          status: Optional[str] = None, date_from: Optional[datetime] = None,
+                          date_to: Optional[datetime] = None, newest_first: bool = False):
+    query = _teacher_lessons_query(
+        db.query(models.Lesson).options(joinedload(models.Lesson.student)),
+        teacher_id, status, date_from, date_to
+    )
+    order = desc(models.Lesson.scheduled_at) if newest_first else models.Lesson.scheduled_at
+    return query.order_by(order, models.Lesson.id).offset(skip).limit(limit).all()
+
+
+def get_lessons_by_teacher_count(db: Session, teacher_id: int, status: Optional[str] = None,
+                                 date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+    return _teacher_lessons_query(
+        db.query(func.count(models.Lesson.id)), teacher_id, status, date_from, date_to
+    ).scalar()
+
+
+def get_teacher_lesson_counts(db: Session, teacher_id: int, now: Optional[datetime] = None) -> Dict[str, int]:
+    """Total, completed, cancelled and upcoming lessons of one teacher in a single query"""
+    now = now or datetime.utcnow()
+
+    def count_where(*conditions):
+        return func.coalesce(func.sum(case((and_(*conditions), 1), else_=0)), 0)
+
+    row = db.query(
+        func.count(models.Lesson.id).label("total_lessons"),
+        count_where(models.Lesson.status == models.LessonStatus.COMPLETED).label("completed_lessons"),
+        count_where(models.Lesson.status == models.LessonStatus.CANCELLED).label("cancelled_lessons"),
+        count_where(models.Lesson.status == models.LessonStatus.SCHEDULED,
+                    models.Lesson.scheduled_at >= now).label("upcoming_lessons")
+    ).filter(models.Lesson.teacher_id == teacher_id).one()
+    return row._asdict()
+
+
+def get_teacher_students(db: Session, teacher_id: int, skip: int = 0, limit: int = 100):
+    """A page of a teacher's students, most recently taught first, with their lesson counts"""
+    per_student = db.query(
+        models.Lesson.student_id,
+        func.count(models.Lesson.id).label("lesson_count"),
+        func.max(models.Lesson.scheduled_at).label("last_lesson_at")
+    ).filter(models.Lesson.teacher_id == teacher_id).group_by(models.Lesson.student_id).subquery()
+
+    rows = db.query(models.User, per_student.c.lesson_count, per_student.c.last_lesson_at).join(
+        per_student, per_student.c.student_id == models.User.id
+    ).order_by(desc(per_student.c.last_lesson_at), models.User.id).offset(skip).limit(limit).all()
+    return [{"student": student, "lesson_count": lesson_count, "last_lesson_at": last_lesson_at}
+            for student, lesson_count, last_lesson_at in rows]
+
+
+def get_teacher_students_count(db: Session, teacher_id: int):
+    return db.query(func.count(func.distinct(models.Lesson.student_id))).filter(
+        models.Lesson.teacher_id == teacher_id
+    ).scalar()
 
 
 def get_lessons_by_student(db: Session, student_id: int, skip: int = 0, limit: int = 100,
@@ -196,6 +449,11 @@ def create_lesson(db: Session, lesson: schemas.LessonCreate, created_by: Optiona
     
     db_lesson = models.Lesson(**lesson_data)
     db.add(db_lesson)
+    db.flush()  # The event and change log need the lesson id
+    cache.publish(db, "lessons")
+    cache.publish(db, "dashboards")
+    changes.record(db, "lesson", db_lesson.id, changes.INSERT)
+    events.publish_lesson_event(db, db_lesson, "created")
     db.commit()
     db.refresh(db_lesson)
     
@@ -208,22 +466,28 @@ def create_lesson(db: Session, lesson: schemas.LessonCreate, created_by: Optiona
 
 
 def update_lesson(db: Session, lesson_id: int, lesson_update: schemas.LessonUpdate, 
-                 updated_by: Optional[int] = None):
-    db_lesson = db.query(models.Lesson).filter(models.Lesson.id == lesson_id).first()
-    if db_lesson:
-        update_data = lesson_update.model_dump(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_lesson, field, value)
-        
-        db_lesson.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(db_lesson)
-        
-        # Log the update
-        if updated_by:
-            log_audit_action(db, updated_by, "UPDATE", "lesson", db_lesson.id, 
-                           f"Updated lesson: {db_lesson.title}")
-    
+                 updated_by: Optional[int] = None, conditions: Sequence = ()):
+    """
+    Update a lesson with one UPDATE ... RETURNING
+
+    conditions are extra WHERE predicates, e.g. Lesson.teacher_id == user.id
+    or Lesson.status == SCHEDULED. Returns None, and writes nothing, if the
+    lesson does not exist or does not match them.
+    """
+    update_data = lesson_update.model_dump(exclude_unset=True)
+    update_data['updated_at'] = datetime.utcnow()
+    db_lesson = _guarded_update(db, models.Lesson, lesson_id, update_data, conditions)
+    if db_lesson is None:
+        return None
+    
+    cache.publish(db, "lessons", lesson_id)
+    cache.publish(db, "dashboards")
+    changes.record(db, "lesson", lesson_id, changes.UPDATE)
+    events.publish_lesson_event(db, db_lesson, "updated")
+    # Log the update in the same transaction
+    if updated_by:
+        db.add(_audit_entry(updated_by, "UPDATE", "lesson", lesson_id, f"Updated lesson: {db_lesson.title}"))
+    _commit_keeping_loaded(db)
     return db_lesson
 
 
@@ -231,7 +495,11 @@ def delete_lesson(db: Session, lesson_id: int, deleted_by: Optional[int] = None)
     db_lesson = db.query(models.Lesson).filter(models.Lesson.id == lesson_id).first()
     if db_lesson:
         title = db_lesson.title
+        events.publish_lesson_event(db, db_lesson, "deleted")
         db.delete(db_lesson)
+        cache.publish(db, "lessons", lesson_id)
+        cache.publish(db, "dashboards")
+        changes.record(db, "lesson", lesson_id, changes.DELETE)
         db.commit()
         
         # Log the deletion
@@ -299,6 +567,189 @@ def get_lessons_today(db: Session, user_id: Optional[int] = None):
     return query.order_by(models.Lesson.scheduled_at).all()
 
 
+
+def get_lessons_for_transition(db: Session, lesson_ids: List[int]) -> List[models.Lesson]:
+    """Lessons a bulk status change will touch, in one query without relationships"""
+    if not lesson_ids:
+        return []
+    return db.query(models.Lesson).filter(models.Lesson.id.in_(set(lesson_ids))).all()
+
+
+def bulk_update_lesson_status(db: Session, lessons: List[models.Lesson], status: models.LessonStatus,
+                              updated_by: int, audit_action: str, audit_details: str,
+                              values: Optional[Dict[str, Any]] = None,
+                              from_status: models.LessonStatus = models.LessonStatus.SCHEDULED,
+                              ip_address: Optional[str] = None, user_agent: Optional[str] = None) -> int:
+    """
+    Move already validated lessons to a new status with one UPDATE and one commit
+
+    Only lessons still in from_status are changed; if any was changed by
+    someone else since it was loaded, nothing is written and 0 is returned.
+    One audit entry per lesson is inserted in the same transaction.
+
+    Returns:
+        Number of lessons updated
+    """
+    ids = [lesson.id for lesson in lessons]
+    if not ids:
+        return 0
+    result = db.execute(
+        update(models.Lesson)
+        .where(models.Lesson.id.in_(ids), models.Lesson.status == from_status)
+        .values(status=status, updated_at=datetime.utcnow(), version_id=models.Lesson.version_id + 1,
+                **(values or {}))
+        .execution_options(synchronize_session="evaluate")  # Loaded lessons see the new status
+    )
+    if result.rowcount != len(ids):
+        db.rollback()
+        return 0
+
+    db.execute(insert(models.AuditLog), [
+        {"user_id": updated_by, "action": audit_action, "resource_type": "lesson", "resource_id": lesson.id,
+         "details": f"{audit_details}: {lesson.title}", "ip_address": ip_address, "user_agent": user_agent}
+        for lesson in lessons
+    ])
+    for lesson in lessons:
+        cache.publish(db, "lessons", lesson.id)
+        changes.record(db, "lesson", lesson.id, changes.UPDATE)
+        events.publish_lesson_event(db, lesson, "updated")
+    cache.publish(db, "dashboards")
+    db.commit()
+    return len(ids)
+
+
+# Lesson Archival
+def archive_old_lessons(db: Session, older_than_days: int = 90, batch_size: int = 1000) -> int:
+    """
+    Move completed lessons older than the cutoff into lessons_archive
+
+    Each chunk is copied and deleted in its own short transaction so the
+    lessons table is never locked for the whole run.
+
+    Returns:
+        Number of lessons archived
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    lessons = models.Lesson.__table__
+    archive = models.LessonArchive.__table__
+    columns = [column.name for column in lessons.columns if column.name != "id"]
+    archived = 0
+
+    while True:
+        ids = [lesson_id for (lesson_id,) in db.query(models.Lesson.id).filter(
+            models.Lesson.scheduled_at < cutoff,
+            models.Lesson.status == models.LessonStatus.COMPLETED
+        ).order_by(models.Lesson.id).limit(batch_size)]
+        if not ids:
+            break
+
+        archived_at = literal(datetime.utcnow(), type_=DateTime(timezone=True))
+        db.execute(insert(archive).from_select(
+            ["lesson_id"] + columns + ["archived_at"],
+            select(lessons.c.id, *[lessons.c[name] for name in columns], archived_at).where(lessons.c.id.in_(ids))
+        ))
+        db.execute(delete(lessons).where(lessons.c.id.in_(ids)))
+        for lesson_id in ids:
+            changes.record(db, "lesson", lesson_id, changes.DELETE)  # Synced clients drop archived lessons
+        cache.publish(db, "lessons")
+        cache.publish(db, "dashboards")
+        db.commit()
+        archived += len(ids)
+
+    return archived
+
+
+def _report_lessons(include_archived: bool = False):
+    """Lesson rows used by reports, optionally including the archive"""
+    columns = ("teacher_id", "student_id", "status", "cost", "instrument", "scheduled_at",
+               "duration_minutes")
+    source = select(*[models.Lesson.__table__.c[name] for name in columns])
+    if include_archived:
+        source = union_all(
+            source, select(*[models.LessonArchive.__table__.c[name] for name in columns])
+        )
+    return source.subquery("report_lessons")
+
+
+def get_lesson_report(db: Session, date_from: datetime, date_to: datetime,
+                      include_archived: bool = False) -> Dict[str, Any]:
+    """Aggregate lesson activity for a date range in SQL"""
+    lessons = _report_lessons(include_archived)
+    in_range = and_(lessons.c.scheduled_at >= date_from, lessons.c.scheduled_at <= date_to)
+    completed = lessons.c.status == models.LessonStatus.COMPLETED
+    completed_count = func.coalesce(func.sum(case((completed, 1), else_=0)), 0)
+    revenue = func.coalesce(func.sum(case((completed, lessons.c.cost), else_=0)), 0)
+
+    total_lessons, completed_lessons, cancelled_lessons, total_revenue = db.query(
+        func.count(),
+        completed_count,
+        func.coalesce(func.sum(case((lessons.c.status == models.LessonStatus.CANCELLED, 1), else_=0)), 0),
+        revenue
+    ).select_from(lessons).filter(in_range).one()
+
+    instruments = dict(
+        db.query(lessons.c.instrument, func.count()).filter(
+            in_range, lessons.c.instrument.isnot(None)
+        ).group_by(lessons.c.instrument).all()
+    )
+
+    instructor_stats = {}
+    teacher_rows = db.query(
+        models.User.full_name, func.count(), completed_count, revenue
+    ).select_from(lessons).join(
+        models.User, models.User.id == lessons.c.teacher_id
+    ).filter(in_range).group_by(models.User.id, models.User.full_name).all()
+    for teacher_name, total, done, earned in teacher_rows:
+        stats = instructor_stats.setdefault(
+            teacher_name, {"total_lessons": 0, "completed_lessons": 0, "revenue": 0}
+        )
+        stats["total_lessons"] += total
+        stats["completed_lessons"] += done
+        stats["revenue"] += earned
+
+    return {
+        "date_range": f"{date_from.strftime('%Y-%m-%d')} to {date_to.strftime('%Y-%m-%d')}",
+        "total_lessons": total_lessons,
+        "completed_lessons": completed_lessons,
+        "cancelled_lessons": cancelled_lessons,
+        "revenue": float(total_revenue),
+        "popular_instruments": instruments,
+        "instructor_stats": instructor_stats
+    }
+
+def get_user_lesson_stats(db: Session, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Lesson counts for several users in one query
+
+    A lesson counts for a user who teaches or attends it (once, even if both).
+    Users without lessons are absent from the result.
+    """
+    if not user_ids:
+        return {}
+    lessons = models.Lesson
+    participation = union(
+        select(lessons.id, lessons.teacher_id.label("user_id"), lessons.status, lessons.scheduled_at)
+        .where(lessons.teacher_id.in_(user_ids)),
+        select(lessons.id, lessons.student_id.label("user_id"), lessons.status, lessons.scheduled_at)
+        .where(lessons.student_id.in_(user_ids))
+    ).subquery()
+
+    def count_where(*conditions):
+        return func.coalesce(func.sum(case((and_(*conditions), 1), else_=0)), 0)
+
+    rows = db.query(
+        participation.c.user_id,
+        func.count().label("total_lessons"),
+        count_where(participation.c.status == models.LessonStatus.COMPLETED).label("completed_lessons"),
+        count_where(participation.c.status == models.LessonStatus.CANCELLED).label("cancelled_lessons"),
+        count_where(participation.c.status == models.LessonStatus.SCHEDULED,
+                    participation.c.scheduled_at > datetime.utcnow()).label("upcoming_lessons"),
+        func.max(participation.c.scheduled_at).label("last_lesson_date")
+    ).group_by(participation.c.user_id).all()
+
+    return {row.user_id: row._asdict() for row in rows}
+
+
 # System Settings CRUD
 def get_system_setting(db: Session, key: str):
     return db.query(models.SystemSettings).filter(models.SystemSettings.key == key).first()
@@ -311,6 +762,7 @@ def get_system_settings(db: Session, skip: int = 0, limit: int = 100):
 def create_system_setting(db: Session, setting: schemas.SystemSettingsCreate, created_by: Optional[int] = None):
     db_setting = models.SystemSettings(**setting.model_dump())
     db.add(db_setting)
+    cache.publish(db, "settings")
     db.commit()
     db.refresh(db_setting)
     
@@ -330,6 +782,7 @@ def update_system_setting(db: Session, key: str, setting_update: schemas.SystemS
             setattr(db_setting, field, value)
         
         db_setting.updated_at = datetime.utcnow()
+        cache.publish(db, "settings")
         db.commit()
         db.refresh(db_setting)
         
@@ -341,10 +794,10 @@ def update_system_setting(db: Session, key: str, setting_update: schemas.SystemS
 
 
 # Audit Log Operations
-def log_audit_action(db: Session, user_id: int, action: str, resource_type: str, 
-                    resource_id: Optional[int] = None, details: Optional[str] = None,
-                    ip_address: Optional[str] = None, user_agent: Optional[str] = None):
-    audit_log = models.AuditLog(
+def _audit_entry(user_id: int, action: str, resource_type: str, resource_id: Optional[int] = None,
+                 details: Optional[str] = None, ip_address: Optional[str] = None,
+                 user_agent: Optional[str] = None) -> models.AuditLog:
+    return models.AuditLog(
         user_id=user_id,
         action=action,
         resource_type=resource_type,
@@ -353,8 +806,15 @@ def log_audit_action(db: Session, user_id: int, action: str, resource_type: str,
         ip_address=ip_address,
         user_agent=user_agent
     )
+
+
+def log_audit_action(db: Session, user_id: int, action: str, resource_type: str, 
+                    resource_id: Optional[int] = None, details: Optional[str] = None,
+                    ip_address: Optional[str] = None, user_agent: Optional[str] = None):
+    audit_log = _audit_entry(user_id, action, resource_type, resource_id, details, ip_address, user_agent)
     db.add(audit_log)
-    db.commit()
+    # An audit row changes nothing already loaded; keep it so the caller's response needs no reload
+    _commit_keeping_loaded(db)
     return audit_log
 
 
@@ -465,6 +925,20 @@ def get_instructor_dashboard_stats(db: Session, instructor_id: int) -> Dict[str,
         "lessons_today": lessons_today,
         "lessons_this_week": lessons_this_week,
         "lessons_this_month": lessons_this_month,
-        "upcoming_lessons": upcoming_lessons,
-        "recent_lessons": recent_lessons
+        "upcoming_lessons": [_lesson_summary(lesson) for lesson in upcoming_lessons],
+        "recent_lessons": [_lesson_summary(lesson) for lesson in recent_lessons]
+    }
+
+
+def _lesson_summary(lesson: models.Lesson) -> Dict[str, Any]:
+    """LessonSummary fields for a lesson with its teacher and student loaded"""
+    return {
+        "id": lesson.id,
+        "title": lesson.title,
+        "scheduled_at": lesson.scheduled_at,
+        "duration_minutes": lesson.duration_minutes,
+        "status": lesson.status,
+        "teacher_name": lesson.teacher.full_name,
+        "student_name": lesson.student.full_name,
+        "instrument": lesson.instrument,
     }
@@ -1,11 +1,12 @@
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+import logging
 import os
-from dotenv import load_dotenv
+from typing import Optional
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
 # Database URL from environment variable
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
@@ -16,6 +17,19 @@ if DATABASE_URL.startswith("sqlite"):
 else:
     engine = create_engine(DATABASE_URL)
 
+# SQLite settings for several worker processes sharing one file: WAL lets
+# readers continue while one worker writes, busy_timeout waits for the lock
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "wal")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+if engine.dialect.name == "sqlite" and engine.url.database not in (None, "", ":memory:"):
+    @event.listens_for(engine, "connect")
+    def _configure_sqlite(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -30,3 +44,115 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# What each migration adds, oldest first: (revision, table, column or index
+# name, "AUTOINCREMENT" for a SQLite table option, or None for the table
+# itself). Used to place databases that were built
+# with create_all and never stamped; every new migration needs an entry.
+SCHEMA_MARKERS = [
+    ("4d60dd6451b8", "users", None),
+    ("bdacb2588e22", "audit_logs", None),
+    ("5a376452c704", "email_outbox", None),
+    ("1d40801335fb", "lessons_archive", None),
+    ("2b546482ac92", "jobs", None),
+    ("5d85c43c57e3", "cache_invalidations", None),
+    ("977686cacedb", "lessons", "ix_lessons_teacher_scheduled"),
+    ("c3e91f0d7a24", "change_log", None),
+    ("e7a2b5c81f39", "users", "version_id"),
+    ("f4c8d2a61b07", "instructor_roles", None),
+    ("8b1f3c6d9e42", "lessons_archive", "lesson_id"),
+    ("a3d5e8f1c7b9", "cache_invalidations", "AUTOINCREMENT"),
+    ("c6e2b9d4a1f3", "email_outbox", "claimed_by"),
+]
+SCHEMA_LOCK_ID = 72310045  # pg_advisory_xact_lock key serializing startup migrations
+
+
+def _alembic_config(connection=None):
+    from alembic.config import Config
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    alembic_cfg = Config(os.path.join(project_root, "alembic.ini"))
+    alembic_cfg.set_main_option("script_location", os.path.join(project_root, "alembic"))
+    if connection is not None:
+        alembic_cfg.attributes["connection"] = connection
+    return alembic_cfg
+
+
+def detect_revision(connection) -> Optional[str]:
+    """Newest revision whose changes, and all earlier ones, are present; None if not even the first"""
+    from sqlalchemy import inspect
+
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    revision = None
+    for marker_revision, table, name in SCHEMA_MARKERS:
+        if table not in tables:
+            break
+        if name == "AUTOINCREMENT":
+            # Only SQLite reuses ids without it
+            sql = connection.exec_driver_sql("SELECT sql FROM sqlite_master WHERE name = ?", (table,)).scalar() \
+                if connection.dialect.name == "sqlite" else "AUTOINCREMENT"
+            if "AUTOINCREMENT" not in (sql or "").upper():
+                break
+        elif name is not None:
+            names = {column["name"] for column in inspector.get_columns(table)}
+            names |= {index["name"] for index in inspector.get_indexes(table)}
+            if name not in names:
+                break
+        revision = marker_revision
+    return revision
+
+
+def check_schema(bind=None) -> str:
+    """
+    Bring the database schema up to the newest migration at startup
+
+    Runs once at startup instead of create_all on every import, holding a
+    lock so that only one worker migrates. A brand new database is built
+    with create_all and stamped at head. A database that was never stamped
+    (built by create_all in older releases) is placed by SCHEMA_MARKERS,
+    stamped at the revision it matches, and upgraded like any other; a
+    create_all there would add new tables but never new columns or the data
+    migrations.
+
+    Returns "current", "created" or "upgraded".
+    """
+    from alembic import command
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+    from sqlalchemy import inspect, text
+
+    from . import models  # noqa: F401 - registers every table on Base.metadata
+
+    bind = bind or engine
+    script = ScriptDirectory.from_config(_alembic_config())
+    heads = set(script.get_heads())
+
+    with bind.begin() as connection:
+        if connection.dialect.name == "sqlite":
+            connection.exec_driver_sql("BEGIN IMMEDIATE")  # Take the write lock before looking
+        elif connection.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": SCHEMA_LOCK_ID})
+
+        migration_context = MigrationContext.configure(connection)
+        current = set(migration_context.get_current_heads())
+        if current == heads:
+            return "current"
+
+        if not current:
+            if not set(inspect(connection).get_table_names()) - {"alembic_version"}:
+                Base.metadata.create_all(bind=connection)
+                migration_context.stamp(script, "heads")
+                return "created"
+            revision = detect_revision(connection)
+            if revision is None:
+                raise RuntimeError("Database has tables but not this application's schema; "
+                                   "point DATABASE_URL at a new or Music U database")
+            logger.warning("Database was never stamped by Alembic; its schema matches revision %s", revision)
+            migration_context.stamp(script, revision)
+
+        logger.warning("Upgrading database schema from %s to %s",
+                       ", ".join(sorted(current)) or "unstamped", ", ".join(sorted(heads)))
+        command.upgrade(_alembic_config(connection), "heads")
+        return "upgraded"
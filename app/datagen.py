@@ -0,0 +1,324 @@
+"""
+Synthetic data for development, benchmarks and load tests
+
+generate() builds realistic schools: instructors with specializations,
+students each taking one or two weekly lesson series with an instructor who
+teaches their instrument, cancellations and reschedules, and the audit
+history those leave behind. Rows are streamed in large batches with COPY on
+PostgreSQL and executemany elsewhere, inside a single transaction, and every
+account shares one password hash computed up front, so a million-lesson
+database builds in well under a minute instead of the hours bcrypt and
+per-object ORM flushes would need.
+"""
+
+import csv
+import enum
+import io
+import json
+import math
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import Table, func, insert, select
+from sqlalchemy.engine import Connection, Engine
+
+from . import models
+from .database import Base
+
+DEFAULT_PASSWORD = "benchmark123"
+BATCH_SIZE = 20000
+
+# Shape of a generated school
+STUDENTS_PER_INSTRUCTOR = 30
+INSTRUCTORS_PER_SCHOOL = 25
+SECOND_SERIES_RATE = 0.25  # Students taking two instruments
+DROPOUT_RATE = 0.2  # Series that stop before the end of the range
+
+INSTRUMENTS = ["piano", "guitar", "violin", "drums", "voice", "saxophone", "trumpet", "flute"]
+INSTRUMENT_WEIGHTS = [30, 25, 10, 10, 12, 5, 4, 4]
+FIRST_NAMES = ["Alice", "Bob", "Carmen", "David", "Emma", "Farid", "Grace", "Hiro", "Ines", "Jamal",
+               "Kate", "Liam", "Maya", "Noah", "Olivia", "Pavel", "Quinn", "Rosa", "Sam", "Tara"]
+LAST_NAMES = ["Brown", "Chen", "Davis", "Garcia", "Johnson", "Kim", "Lopez", "Miller", "Nguyen", "Patel",
+              "Rodriguez", "Smith", "Taylor", "Williams", "Wilson"]
+SCHOOL_NAMES = ["Downtown", "Northside", "Riverside", "Westfield", "Lakeshore", "Hillcrest", "Eastgate", "Southpark"]
+LEVELS = ["Beginner", "Intermediate", "Advanced"]
+
+USER_COLUMNS = ["email", "username", "full_name", "hashed_password", "is_active", "is_teacher", "role",
+                "phone", "hourly_rate", "specializations", "created_at", "last_login"]
+LESSON_COLUMNS = ["title", "description", "teacher_id", "student_id", "created_by", "scheduled_at",
+                  "duration_minutes", "instrument", "lesson_type", "status", "cost", "location",
+                  "room_number", "created_at", "updated_at"]
+SPECIALIZATION_COLUMNS = ["instructor_id", "role_id"]
+AUDIT_COLUMNS = ["user_id", "action", "resource_type", "resource_id", "details", "created_at"]
+
+
+def _batched(rows: Iterable[Any], size: int = BATCH_SIZE) -> Iterator[List[Any]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _copy_value(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.name  # SQLAlchemy Enum columns store member names
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return "" if value is None else value  # Unquoted empty fields are NULL in COPY's CSV format
+
+
+def _copy_rows(conn: Connection, table: Table, columns: Sequence[str], rows: List[Dict[str, Any]]) -> None:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_copy_value(row[column]) for column in columns])
+    buffer.seek(0)
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+
+def bulk_insert(conn: Connection, table: Table, columns: Sequence[str], rows: Iterable[Dict[str, Any]]) -> int:
+    """Stream rows into a table in batches: COPY on PostgreSQL, executemany elsewhere"""
+    use_copy = conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2"
+    count = 0
+    for batch in _batched(rows):
+        if use_copy:
+            _copy_rows(conn, table, columns, batch)
+        else:
+            conn.execute(insert(table), batch)
+        count += len(batch)
+    return count
+
+
+class _Plan:
+    """Who teaches whom, and when: everything needed to stream the rows"""
+
+    def __init__(self, schools: int, instructors: int, students: int, weeks: int, rng: random.Random):
+        self.schools = [f"Music U {SCHOOL_NAMES[i % len(SCHOOL_NAMES)]}"
+                        + (f" {i // len(SCHOOL_NAMES) + 1}" if i >= len(SCHOOL_NAMES) else "")
+                        for i in range(schools)]
+        self.instructor_school = [i % schools for i in range(instructors)]
+        self.instructor_specs = []
+        for i in range(instructors):
+            # Each school covers every instrument before any is doubled up
+            primary = INSTRUMENTS[(i // schools) % len(INSTRUMENTS)]
+            extra = rng.sample(INSTRUMENTS, rng.choice((0, 0, 1, 2)))
+            self.instructor_specs.append([primary] + [s for s in extra if s != primary])
+        self.student_school = [rng.randrange(schools) for _ in range(students)]
+
+        teachers_for: Dict[tuple, List[int]] = {}
+        for index, specs in enumerate(self.instructor_specs):
+            for instrument in specs:
+                teachers_for.setdefault((self.instructor_school[index], instrument), []).append(index)
+
+        # Students only sign up for instruments their school teaches
+        offered = []
+        for school in range(schools):
+            pairs = [(i, w) for i, w in zip(INSTRUMENTS, INSTRUMENT_WEIGHTS) if (school, i) in teachers_for]
+            offered.append(([i for i, _ in pairs], [w for _, w in pairs]))
+
+        # (student, instructor, instrument, weekday, minute of day, duration, first week, end week, room)
+        self.series = []
+        for student in range(students):
+            school = self.student_school[student]
+            count = 2 if rng.random() < SECOND_SERIES_RATE else 1
+            for instrument in sorted(set(rng.choices(*offered[school], k=count))):
+                candidates = teachers_for[(school, instrument)]
+                weekday = rng.randrange(6)
+                if weekday == 5:
+                    minute = rng.randrange(9 * 4, 16 * 4) * 15  # Saturday daytime
+                else:
+                    minute = rng.randrange(14 * 4, 20 * 4) * 15  # After school
+                first = rng.randrange(max(1, weeks // 2))
+                end = rng.randrange(first + 1, weeks + 1) if rng.random() < DROPOUT_RATE else weeks
+                self.series.append((student, rng.choice(candidates), instrument, weekday, minute,
+                                    rng.choice((30, 45, 60, 60)), first, end, rng.randint(1, 12)))
+
+
+def expected_lessons_per_student(weeks: int) -> float:
+    """Rough lesson rows per student over `weeks`, used to size a dataset"""
+    average_weeks = weeks * (1 - 0.25 - DROPOUT_RATE * 0.375)
+    return (1 + SECOND_SERIES_RATE) * average_weeks * 0.9
+
+
+def generate(engine: Engine, lessons: Optional[int] = 100000, students: Optional[int] = None,
+             instructors: Optional[int] = None, schools: Optional[int] = None, weeks_back: int = 52,
+             weeks_ahead: int = 12, cancel_rate: float = 0.08, reschedule_rate: float = 0.02,
+             password: str = DEFAULT_PASSWORD, hashed_password: Optional[str] = None,
+             seed_value: int = 42, create_schema: bool = True) -> Dict[str, int]:
+    """Fill an empty database with one or more schools; returns row counts
+
+    Sizes left unset are derived from `lessons`. When `lessons` is given
+    exactly that many are written, dropping the furthest-future weeks if the
+    series would produce more. Usernames are "admin" then "admin2".. (one
+    office account per school), "instructor1".. and "student1"..; all
+    accounts share `password`.
+    """
+    weeks = weeks_back + weeks_ahead
+    if students is None:
+        if lessons is None:
+            raise ValueError("Give lessons or students")
+        # Overshoot slightly so the target is reached before the range runs out
+        students = max(1, math.ceil(lessons / expected_lessons_per_student(weeks) * 1.1))
+    if instructors is None:
+        instructors = math.ceil(students / STUDENTS_PER_INSTRUCTOR)
+    if schools is None:
+        schools = math.ceil(instructors / INSTRUCTORS_PER_SCHOOL)
+    if min(students, instructors, schools) < 1 or schools > instructors:
+        raise ValueError("Need at least one student and one instructor per school")
+    if hashed_password is None:
+        from .auth.utils import get_password_hash
+        hashed_password = get_password_hash(password)
+    if create_schema:
+        Base.metadata.create_all(bind=engine)
+
+    rng = random.Random(seed_value)
+    plan = _Plan(schools, instructors, students, weeks, rng)
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    today = now.replace(hour=0, minute=0)
+    first_monday = today - timedelta(days=today.weekday(), weeks=weeks_back)
+
+    with engine.begin() as conn:
+        if conn.execute(select(func.count(models.User.id))).scalar():
+            raise ValueError("Database already contains users")
+
+        counts = {"schools": schools, "instructors": instructors, "students": students}
+        counts["users"] = bulk_insert(conn, models.User.__table__, USER_COLUMNS,
+                                      _user_rows(plan, hashed_password, first_monday, now, rng))
+        ids = conn.execute(select(models.User.id).order_by(models.User.id)).scalars().all()
+        admin_ids = ids[:schools]
+        instructor_ids = ids[schools:schools + instructors]
+        # INSTRUMENTS are the ids of the default instructor role catalog
+        counts["instructor_specializations"] = bulk_insert(
+            conn, models.InstructorSpecialization.__table__, SPECIALIZATION_COLUMNS,
+            ({"instructor_id": instructor_id, "role_id": instrument}
+             for instructor_id, specs in zip(instructor_ids, plan.instructor_specs) for instrument in specs)
+        )
+        student_ids = ids[schools + instructors:]
+
+        lesson_floor = conn.execute(select(func.coalesce(func.max(models.Lesson.id), 0))).scalar()
+        audit: List[Dict[str, Any]] = []
+        counts["lessons"] = bulk_insert(conn, models.Lesson.__table__, LESSON_COLUMNS, _lesson_rows(
+            plan, admin_ids, instructor_ids, student_ids, first_monday, weeks, now, lessons,
+            cancel_rate, reschedule_rate, audit, rng))
+
+        # Read the ids back: sequences can skip values, so only their order (insert order) is relied on
+        lesson_ids = conn.execute(
+            select(models.Lesson.id).where(models.Lesson.id > lesson_floor).order_by(models.Lesson.id)
+        ).scalars().all()
+        for row in audit:
+            row["resource_id"] = lesson_ids[row.pop("lesson")]
+        counts["audit_logs"] = bulk_insert(conn, models.AuditLog.__table__, AUDIT_COLUMNS, audit)
+
+    return counts
+
+
+def _user_rows(plan: _Plan, hashed_password: str, first_monday: datetime, now: datetime,
+               rng: random.Random) -> Iterator[Dict[str, Any]]:
+    def row(username: str, role: models.UserRole, **extra) -> Dict[str, Any]:
+        values = {
+            "email": f"{username}@musicu-demo.com", "username": username,
+            "full_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "hashed_password": hashed_password, "is_active": True, "is_teacher": False, "role": role,
+            "phone": f"(555) {rng.randint(200, 999)}-{rng.randint(1000, 9999)}",
+            "hourly_rate": None, "specializations": None,
+            "created_at": first_monday - timedelta(days=rng.randint(0, 365)),
+            "last_login": now - timedelta(minutes=rng.randint(0, 60 * 24 * 30)),
+        }
+        values.update(extra)
+        return values
+
+    for n, school in enumerate(plan.schools, start=1):
+        yield row("admin" if n == 1 else f"admin{n}", models.UserRole.ADMIN, full_name=f"{school} Office")
+    for n, specs in enumerate(plan.instructor_specs, start=1):
+        yield row(f"instructor{n}", models.UserRole.INSTRUCTOR, is_teacher=True,
+                  hourly_rate=float(rng.choice((35, 40, 45, 50, 60, 75))), specializations=",".join(specs))
+    for n in range(1, len(plan.student_school) + 1):
+        # A few lapsed accounts; student1 can always sign in
+        yield row(f"student{n}", models.UserRole.STUDENT, is_active=n == 1 or rng.random() > 0.05)
+
+
+def _lesson_rows(plan: _Plan, admin_ids: List[int], instructor_ids: List[int], student_ids: List[int],
+                 first_monday: datetime, weeks: int, now: datetime, limit: Optional[int],
+                 cancel_rate: float, reschedule_rate: float,
+                 audit: List[Dict[str, Any]], rng: random.Random) -> Iterator[Dict[str, Any]]:
+    """Lessons week by week, so a row limit trims the far future; fills `audit` on the way
+
+    Audit rows name their lesson by its position in the stream ("lesson");
+    generate() swaps that for the id the database assigned.
+    """
+    count = 0
+    started = set()
+    for week in range(weeks):
+        week_start = first_monday + timedelta(weeks=week)
+        for index, (student, instructor, instrument, weekday, minute, duration, first, end, room) \
+                in enumerate(plan.series):
+            if not first <= week < end:
+                continue
+            if limit is not None and count >= limit:
+                return
+            lesson = count
+            count += 1
+            scheduled_at = week_start + timedelta(days=weekday, minutes=minute)
+            school = plan.student_school[student]
+            teacher_id = instructor_ids[instructor]
+            student_id = student_ids[student]
+            admin_id = admin_ids[school]
+            # The whole series was booked by the office shortly before it started
+            created_at = first_monday + timedelta(weeks=first, days=-(index % 14) - 1)
+
+            if index not in started:
+                started.add(index)
+                audit.append({"user_id": admin_id, "action": "CREATE", "resource_type": "lesson",
+                              "lesson": lesson, "created_at": created_at,
+                              "details": json.dumps({"series": "weekly", "student_id": student_id,
+                                                     "teacher_id": teacher_id})})
+
+            roll = rng.random()
+            if roll < cancel_rate:
+                status = models.LessonStatus.CANCELLED
+                updated_at = min(now, scheduled_at - timedelta(hours=rng.randint(2, 72)))
+                audit.append({"user_id": rng.choice((teacher_id, admin_id)), "action": "CANCEL",
+                              "resource_type": "lesson", "lesson": lesson,
+                              "details": '{"reason": "Student unavailable"}', "created_at": updated_at})
+            elif roll < cancel_rate + reschedule_rate:
+                status = models.LessonStatus.RESCHEDULED
+                updated_at = min(now, scheduled_at - timedelta(days=rng.randint(1, 7)))
+                audit.append({"user_id": admin_id, "action": "UPDATE", "resource_type": "lesson",
+                              "lesson": lesson, "details": '{"status": "rescheduled"}',
+                              "created_at": updated_at})
+            elif scheduled_at < now:
+                status = models.LessonStatus.COMPLETED
+                updated_at = scheduled_at + timedelta(minutes=duration)
+            else:
+                status = models.LessonStatus.SCHEDULED
+                updated_at = None
+
+            name = instrument.capitalize()
+            yield {
+                "title": f"{LEVELS[min(2, (week - first) // 26)]} {name}",
+                "description": f"Weekly {instrument} lesson",
+                "teacher_id": teacher_id,
+                "student_id": student_id,
+                "created_by": admin_id,
+                "scheduled_at": scheduled_at,
+                "duration_minutes": duration,
+                "instrument": name,
+                "lesson_type": "individual",
+                "status": status,
+                "cost": float(duration),
+                "location": plan.schools[school],
+                "room_number": str(room),
+                "created_at": created_at,
+                "updated_at": updated_at,
+            }
@@ -0,0 +1,156 @@
+"""
+Live lesson-change events for Server-Sent Events subscribers
+
+crud calls publish_lesson_event() on every lesson write. The event rides on
+the cache invalidation bus (cache.publish), so it is only sent if the write
+commits and it reaches every worker: PostgreSQL NOTIFY or the SQLite
+cache_invalidations feed. Each worker's LessonEventBroker then hands it to
+the streams it serves that may see it: the lesson's teacher, its student
+and every admin.
+
+Subscribers are cheap: one bounded asyncio.Queue and a coroutine waiting on
+it, with no database connection held. A subscriber that cannot keep up
+(queue full) loses its backlog and gets a single "resync" event telling it
+to refetch, so a slow client never grows this worker's memory. Streams send
+a comment heartbeat when idle so proxies keep the connection open and dead
+clients are noticed.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from . import cache, metrics, models
+
+logger = logging.getLogger(__name__)
+
+# Live update configuration
+EVENTS_NAMESPACE = "lesson_events"
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+EVENTS_MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "10000"))  # Per worker
+EVENTS_RETRY_MS = 5000  # Client reconnect delay
+_SEEN_EVENT_IDS = 4096  # Workers also hear their own broadcasts; remember this many to drop repeats
+
+RESYNC = {"type": "resync"}
+
+
+def lesson_event(lesson: models.Lesson, change: str) -> Dict[str, Any]:
+    return {
+        "id": uuid.uuid4().hex,
+        "type": f"lesson.{change}",
+        "lesson_id": lesson.id,
+        "teacher_id": lesson.teacher_id,
+        "student_id": lesson.student_id,
+        "status": getattr(lesson.status, "value", lesson.status),
+        "scheduled_at": lesson.scheduled_at.isoformat() if lesson.scheduled_at else None,
+        "at": datetime.utcnow().isoformat() + "Z",
+    }
+
+
+def publish_lesson_event(db: Session, lesson: models.Lesson, change: str) -> None:
+    """Queue a created/updated/deleted event for subscribers once db commits (lesson needs its id)"""
+    cache.publish(db, EVENTS_NAMESPACE, json.dumps(lesson_event(lesson, change)))
+
+
+def format_event(event: Dict[str, Any]) -> str:
+    """One SSE message; the event type becomes the SSE event name"""
+    lines = [f"event: {event['type']}"]
+    if event.get("id"):
+        lines.append(f"id: {event['id']}")
+    lines.append(f"data: {json.dumps(event)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class Subscriber:
+    def __init__(self, user_id: int, is_admin: bool, queue_size: int = EVENTS_QUEUE_SIZE):
+        self.user_id = user_id
+        self.is_admin = is_admin
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def wants(self, event: Dict[str, Any]) -> bool:
+        if self.is_admin or event["type"] == RESYNC["type"]:
+            return True
+        return self.user_id in (event.get("teacher_id"), event.get("student_id"))
+
+    def offer(self, event: Dict[str, Any]) -> bool:
+        """Queue an event; on overflow replace the backlog with one resync"""
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            return False
+
+
+class LessonEventBroker:
+    """Fans lesson events out to this worker's subscribers"""
+
+    def __init__(self, max_subscribers: int = EVENTS_MAX_SUBSCRIBERS):
+        self.max_subscribers = max_subscribers
+        self.subscribers: Set[Subscriber] = set()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+
+    def subscribe(self, user_id: int, is_admin: bool = False) -> Optional[Subscriber]:
+        """A new subscriber, or None when this worker is full"""
+        if len(self.subscribers) >= self.max_subscribers:
+            return None
+        self.loop = asyncio.get_running_loop()
+        subscriber = Subscriber(user_id, is_admin)
+        self.subscribers.add(subscriber)
+        metrics.SSE_SUBSCRIBERS.set(len(self.subscribers))
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self.subscribers.discard(subscriber)
+        metrics.SSE_SUBSCRIBERS.set(len(self.subscribers))
+
+    def handle_message(self, key: Optional[str]) -> None:
+        """cache.on_invalidate handler; may run on any thread"""
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return
+        event = RESYNC if key is None else json.loads(key)
+        loop.call_soon_threadsafe(self.dispatch, event)
+
+    def dispatch(self, event: Dict[str, Any]) -> None:
+        """Offer an event to interested subscribers (event loop thread only)"""
+        event_id = event.get("id")
+        if event_id is not None:
+            if event_id in self._seen:
+                return
+            self._seen[event_id] = None
+            if len(self._seen) > _SEEN_EVENT_IDS:
+                self._seen.popitem(last=False)
+        for subscriber in list(self.subscribers):
+            if subscriber.wants(event):
+                delivered = subscriber.offer(event)
+                metrics.SSE_EVENTS.inc(outcome="queued" if delivered else "dropped")
+
+    async def stream(self, subscriber: Subscriber, heartbeat: float = EVENTS_HEARTBEAT_SECONDS) -> AsyncIterator[str]:
+        """SSE body for one subscriber; ends (and unsubscribes) when the client disconnects"""
+        try:
+            yield f"retry: {EVENTS_RETRY_MS}\nevent: ready\ndata: {{}}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                yield format_event(event)
+        finally:
+            self.unsubscribe(subscriber)
+
+
+broker = LessonEventBroker()
+cache.on_invalidate(EVENTS_NAMESPACE, broker.handle_message)
@@ -0,0 +1,71 @@
+"""
+Fragment cache for server-rendered admin and instructor pages
+
+Expensive blocks of a page (stats cards, recent lesson tables) are rendered
+from their own partial template and the resulting HTML is kept in the
+"dashboards" cache namespace. crud publishes that namespace on every lesson
+and user write, so a cached fragment is dropped in every worker as soon as
+the data behind it changes; FRAGMENT_CACHE_TTL only bounds how stale
+time-dependent figures (e.g. "today") can get. A page load that hits the
+cache renders the outer template without touching the database.
+
+The same fragments are served on their own by the /admin/widgets and
+/instructor/widgets partial endpoints, which pages poll with hx-get. Each
+widget response carries an ETag of its HTML, so an unchanged widget is
+revalidated with a bodyless 304.
+"""
+
+import hashlib
+import os
+from typing import Any, Callable, Dict
+
+from fastapi import Request, Response
+from fastapi.responses import HTMLResponse
+from fastapi.templating import Jinja2Templates
+from markupsafe import Markup
+
+from . import cache, models
+
+# Fragment cache configuration
+FRAGMENT_CACHE_TTL = float(os.getenv("FRAGMENT_CACHE_TTL", "120"))
+FRAGMENT_NAMESPACE = "dashboards"
+
+
+def fragment_key(name: str, user: models.User, per_user: bool = True) -> str:
+    """Fragments are keyed by role, and by user unless every user of the role sees the same HTML"""
+    role = getattr(user.role, "value", user.role)
+    return f"{role}:{user.id if per_user else '*'}:{name}"
+
+
+def render_fragment(templates: Jinja2Templates, template_name: str, user: models.User,
+                    load_context: Callable[[], Dict[str, Any]], per_user: bool = True) -> Markup:
+    """Cached HTML of a partial template; load_context (the queries) only runs on a miss"""
+    key = fragment_key(template_name, user, per_user)
+
+    def render() -> str:
+        return templates.get_template(template_name).render(**load_context())
+
+    html = cache.get_cache(FRAGMENT_NAMESPACE, ttl=FRAGMENT_CACHE_TTL).get_or_load(key, render)
+    return Markup(html)
+
+
+def fragment_etag(html: str) -> str:
+    return '"' + hashlib.sha1(html.encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True when If-None-Match names etag (weak comparison, as RFC 9110 requires for GET)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in (candidate.removeprefix("W/") for candidate in candidates)
+
+
+def fragment_response(request: Request, html: str) -> Response:
+    """A widget's HTML with its validator, or 304 when the client already has it"""
+    # private: the HTML depends on who is asking; no-cache: revalidate on every poll
+    headers = {"ETag": fragment_etag(html), "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(html, headers=headers)
@@ -0,0 +1,165 @@
+"""
+Liveness and readiness probes for Music U Scheduler
+
+/health/live only says the process is serving requests. /health/ready (and
+/health, for existing load balancer configs) checks what a request needs:
+
+- database: a timed SELECT 1 on a dedicated connection, so the probe still
+  answers when the pool is exhausted
+- pool: connections checked out of the application's pool
+- job_queue: due jobs waiting for the database job runner
+- periodic_tasks: when each periodic task last finished successfully, and
+  the error of any whose latest run raised
+
+Each check reports healthy, degraded or unhealthy; the worst one is the
+overall status, and unhealthy answers 503 so the load balancer stops
+routing here. Results are cached for HEALTH_CACHE_SECONDS, so frequent
+health checks never add more than one round of probe queries per interval.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from . import models
+
+# Probe configuration
+HEALTH_CACHE_SECONDS = float(os.getenv("HEALTH_CACHE_SECONDS", "2"))
+HEALTH_DB_TIMEOUT_SECONDS = int(os.getenv("HEALTH_DB_TIMEOUT_SECONDS", "2"))
+HEALTH_DB_SLOW_MS = float(os.getenv("HEALTH_DB_SLOW_MS", "250"))
+HEALTH_POOL_DEGRADED_RATIO = float(os.getenv("HEALTH_POOL_DEGRADED_RATIO", "0.8"))
+HEALTH_QUEUE_DEGRADED_DEPTH = int(os.getenv("HEALTH_QUEUE_DEGRADED_DEPTH", "500"))
+HEALTH_PERIODIC_GRACE = 2.0  # A periodic task is stale after this many missed intervals
+
+HEALTHY = "healthy"
+DEGRADED = "degraded"
+UNHEALTHY = "unhealthy"
+_SEVERITY = {HEALTHY: 0, DEGRADED: 1, UNHEALTHY: 2}
+
+PROCESS_STARTED_AT = datetime.utcnow()
+
+
+def overall_status(checks: Dict[str, Dict[str, Any]]) -> str:
+    return max((check["status"] for check in checks.values()), key=_SEVERITY.__getitem__, default=HEALTHY)
+
+
+def probe_engine(engine: Engine) -> Engine:
+    """Unpooled engine on the same database, with a short connect timeout"""
+    if engine.dialect.name == "sqlite":
+        connect_args = {"timeout": HEALTH_DB_TIMEOUT_SECONDS, "check_same_thread": False}
+    else:
+        connect_args = {"connect_timeout": HEALTH_DB_TIMEOUT_SECONDS}
+    return create_engine(engine.url, poolclass=NullPool, connect_args=connect_args)
+
+
+def check_database(probe: Engine) -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        with probe.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as e:
+        return {"status": UNHEALTHY, "error": f"{type(e).__name__}: {e}"[:300]}
+    latency_ms = round((time.perf_counter() - started) * 1000, 2)
+    return {"status": DEGRADED if latency_ms > HEALTH_DB_SLOW_MS else HEALTHY, "latency_ms": latency_ms}
+
+
+def check_pool(engine: Engine) -> Dict[str, Any]:
+    pool = engine.pool
+    if not callable(getattr(pool, "size", None)):
+        return {"status": HEALTHY, "pool": type(pool).__name__}
+    checked_out = pool.checkedout()
+    max_overflow = getattr(pool, "_max_overflow", 0)
+    capacity = pool.size() + max(max_overflow, 0)
+    saturation = checked_out / capacity if capacity else 0.0
+    if max_overflow >= 0 and checked_out >= capacity:
+        status = UNHEALTHY  # New requests would wait for a connection
+    elif saturation >= HEALTH_POOL_DEGRADED_RATIO:
+        status = DEGRADED
+    else:
+        status = HEALTHY
+    return {"status": status, "checked_out": checked_out, "capacity": capacity,
+            "saturation": round(saturation, 3)}
+
+
+def check_job_queue(db: Session, now: datetime) -> Dict[str, Any]:
+    depth, oldest = db.query(func.count(models.Job.id), func.min(models.Job.run_at)).filter(
+        models.Job.status == models.JobStatus.QUEUED, models.Job.run_at <= now
+    ).one()
+    result = {"status": DEGRADED if depth > HEALTH_QUEUE_DEGRADED_DEPTH else HEALTHY, "due": depth}
+    if oldest is not None:
+        result["oldest_due_seconds"] = round((now - oldest.replace(tzinfo=None)).total_seconds(), 1)
+    return result
+
+
+def check_periodic_tasks(db: Session, schedule: Dict[str, float], now: datetime) -> Dict[str, Any]:
+    """Stale when a task has not succeeded for HEALTH_PERIODIC_GRACE intervals; failing when its latest run raised"""
+    last_success = dict(db.query(models.Job.name, func.max(models.Job.finished_at)).filter(
+        models.Job.name.in_(list(schedule)), models.Job.status == models.JobStatus.DONE
+    ).group_by(models.Job.name).all())
+    latest = select(func.max(models.Job.id)).where(models.Job.name.in_(list(schedule))).group_by(models.Job.name)
+    last_error = dict(db.query(models.Job.name, models.Job.last_error).filter(
+        models.Job.id.in_(latest), models.Job.status != models.JobStatus.DONE, models.Job.last_error.isnot(None)
+    ).all())
+
+    tasks, stale = {}, []
+    for name, interval in schedule.items():
+        finished_at = last_success.get(name)
+        # A task that has never run is only overdue once this process has been up long enough
+        reference = finished_at.replace(tzinfo=None) if finished_at else PROCESS_STARTED_AT
+        if now - reference > timedelta(seconds=interval * HEALTH_PERIODIC_GRACE):
+            stale.append(name)
+        tasks[name] = finished_at.isoformat() if finished_at else None
+    return {"status": DEGRADED if stale or last_error else HEALTHY, "last_success": tasks, "stale": stale,
+            "failing": last_error}
+
+
+class ReadinessProbe:
+    """Runs the readiness checks at most once per `ttl` seconds"""
+
+    def __init__(self, engine: Engine, schedule: Optional[Callable[[], Optional[Dict[str, float]]]] = None,
+                 ttl: float = HEALTH_CACHE_SECONDS):
+        self.engine = engine
+        self.schedule = schedule  # Periodic tasks to watch, or None when jobs run elsewhere
+        self.ttl = ttl
+        self._probe_engine: Optional[Engine] = None
+        self._result: Optional[Dict[str, Any]] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    async def get(self) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.get_sync)
+
+    def get_sync(self) -> Dict[str, Any]:
+        with self._lock:  # Concurrent health checks share one probe run
+            if self._result is None or time.monotonic() >= self._expires_at:
+                self._result = self.run()
+                self._expires_at = time.monotonic() + self.ttl
+                return {**self._result, "cached": False}
+            return {**self._result, "cached": True}
+
+    def run(self) -> Dict[str, Any]:
+        if self._probe_engine is None:
+            self._probe_engine = probe_engine(self.engine)
+        now = datetime.utcnow()
+        checks = {"database": check_database(self._probe_engine), "pool": check_pool(self.engine)}
+
+        schedule = self.schedule() if self.schedule else None
+        if schedule is not None and checks["database"]["status"] != UNHEALTHY:
+            db = Session(bind=self._probe_engine)  # Not the app pool, which may be exhausted
+            try:
+                checks["job_queue"] = check_job_queue(db, now)
+                checks["periodic_tasks"] = check_periodic_tasks(db, schedule, now)
+            except Exception as e:
+                checks["job_queue"] = {"status": DEGRADED, "error": f"{type(e).__name__}: {e}"[:300]}
+            finally:
+                db.close()
+
+        return {"status": overall_status(checks), "checked_at": now.isoformat() + "Z", "checks": checks}
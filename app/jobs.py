@@ -0,0 +1,336 @@
+"""
+Database-backed job queue for Music U Scheduler
+
+Lets a single uvicorn process run the tasks in app.tasks without Celery or
+Redis. Jobs live in the jobs table and are claimed with
+SELECT ... FOR UPDATE SKIP LOCKED on PostgreSQL; on SQLite, where the
+database lock already serialises writers, a conditional UPDATE tagged with
+a per-claim token gives the same guarantee. One runner at a time holds the
+scheduler lease and enqueues the periodic tasks.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import metrics, models
+
+logger = logging.getLogger(__name__)
+
+# Runner configuration
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "2"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "600"))  # Running jobs are reclaimed after this
+JOB_HEARTBEAT_SECONDS = JOB_LEASE_SECONDS / 3  # Runners renew their running jobs' leases this often
+JOB_RETRY_BASE_SECONDS = int(os.getenv("JOB_RETRY_BASE_SECONDS", "30"))
+JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", "7"))
+JOB_QUEUE_METRICS_TTL = float(os.getenv("JOB_QUEUE_METRICS_TTL", "15"))  # Scrapes reuse the counts this long
+SCHEDULER_LEASE = "scheduler"
+SCHEDULER_LEASE_SECONDS = 30
+
+
+# Queue operations
+def enqueue(db: Session, name: str, *args: Any, run_at: Optional[datetime] = None,
+            max_attempts: int = 3) -> models.Job:
+    """Queue a task by name for the job runner"""
+    job = models.Job(
+        name=name,
+        args=json.dumps(list(args)),
+        run_at=run_at or datetime.utcnow(),
+        max_attempts=max_attempts
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+
+def claim_jobs(db: Session, worker_id: str, limit: int) -> List[Dict[str, Any]]:
+    """
+    Atomically take up to `limit` due jobs for this worker
+
+    Jobs left RUNNING past JOB_LEASE_SECONDS (crashed worker) are claimable
+    again; a live runner keeps renewing its jobs with renew_jobs().
+    """
+    now = datetime.utcnow()
+    due = or_(
+        and_(models.Job.status == models.JobStatus.QUEUED, models.Job.run_at <= now),
+        and_(models.Job.status == models.JobStatus.RUNNING,
+             models.Job.locked_at < now - timedelta(seconds=JOB_LEASE_SECONDS))
+    )
+    columns = (models.Job.id, models.Job.name, models.Job.args,
+               models.Job.attempts, models.Job.max_attempts)
+    claim = {
+        "status": models.JobStatus.RUNNING,
+        "locked_at": now,
+        "attempts": models.Job.attempts + 1
+    }
+
+    if db.get_bind().dialect.name == "postgresql":
+        candidates = select(models.Job.id).where(due).order_by(
+            models.Job.run_at, models.Job.id
+        ).limit(limit).with_for_update(skip_locked=True)
+        rows = db.execute(
+            update(models.Job).where(models.Job.id.in_(candidates.scalar_subquery()))
+            .values(locked_by=worker_id, **claim).returning(*columns)
+        ).all()
+        db.commit()
+    else:
+        token = f"{worker_id}:{uuid.uuid4().hex}"
+        candidates = [job_id for (job_id,) in db.query(models.Job.id).filter(due).order_by(
+            models.Job.run_at, models.Job.id
+        ).limit(limit)]
+        if not candidates:
+            return []
+        # Re-checking `due` inside the UPDATE means a concurrent claimer loses the row
+        db.execute(
+            update(models.Job).where(models.Job.id.in_(candidates), due)
+            .values(locked_by=token, **claim).execution_options(synchronize_session=False)
+        )
+        db.commit()
+        rows = db.query(*columns).filter(models.Job.locked_by == token).all()
+
+    return [{**row._asdict(), "args": json.loads(row.args)} for row in rows]
+
+
+def renew_jobs(db: Session, claimed: List[Dict[str, Any]]) -> int:
+    """
+    Extend the lease of claimed jobs that are still running; returns jobs renewed
+
+    A job reclaimed by another runner has been claimed again, so its attempts
+    no longer match and it is left alone.
+    """
+    if not claimed:
+        return 0
+    renewed = db.query(models.Job).filter(
+        models.Job.status == models.JobStatus.RUNNING,
+        or_(*[and_(models.Job.id == job["id"], models.Job.attempts == job["attempts"]) for job in claimed])
+    ).update({"locked_at": datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+    return renewed
+
+
+def complete_job(db: Session, job_id: int, result: Any = None) -> None:
+    db.query(models.Job).filter(models.Job.id == job_id).update({
+        "status": models.JobStatus.DONE,
+        "result": None if result is None else str(result)[:1000],
+        "finished_at": datetime.utcnow(),
+        "locked_by": None
+    }, synchronize_session=False)
+    db.commit()
+
+
+def fail_job(db: Session, job: Dict[str, Any], error: Exception) -> None:
+    """Reschedule with exponential backoff, or give up after max_attempts"""
+    now = datetime.utcnow()
+    give_up = job["attempts"] >= job["max_attempts"]
+    values = {
+        "last_error": f"{type(error).__name__}: {error}"[:1000],
+        "locked_by": None
+    }
+    if give_up:
+        values.update(status=models.JobStatus.FAILED, finished_at=now)
+    else:
+        delay = JOB_RETRY_BASE_SECONDS * 2 ** (job["attempts"] - 1)
+        values.update(status=models.JobStatus.QUEUED, run_at=now + timedelta(seconds=delay))
+    db.query(models.Job).filter(models.Job.id == job["id"]).update(values, synchronize_session=False)
+    db.commit()
+
+
+def get_queue_stats(db: Session) -> Dict[str, int]:
+    """Count jobs by status"""
+    counts = dict(
+        db.query(models.Job.status, func.count(models.Job.id)).group_by(models.Job.status).all()
+    )
+    return {status.value: counts.get(status, 0) for status in models.JobStatus}
+
+
+# Scheduler leadership
+def acquire_lease(db: Session, name: str, holder: str, ttl_seconds: int) -> bool:
+    """Take or renew a named lease; False while another holder's lease is live"""
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl_seconds)
+    renewed = db.query(models.JobLease).filter(
+        models.JobLease.name == name,
+        or_(models.JobLease.holder == holder, models.JobLease.expires_at < now)
+    ).update({"holder": holder, "expires_at": expires_at}, synchronize_session=False)
+    if renewed:
+        db.commit()
+        return True
+
+    # DO NOTHING rather than catching IntegrityError: followers try this on every
+    # poll, and each failed insert would be logged as an error by PostgreSQL
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    inserted = db.execute(
+        dialect.insert(models.JobLease).values(name=name, holder=holder, expires_at=expires_at)
+        .on_conflict_do_nothing(index_elements=[models.JobLease.name])
+    )
+    db.commit()
+    return inserted.rowcount == 1
+
+
+def release_lease(db: Session, name: str, holder: str) -> None:
+    db.query(models.JobLease).filter(
+        models.JobLease.name == name, models.JobLease.holder == holder
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+def schedule_periodic(db: Session, schedule: Dict[str, float]) -> List[str]:
+    """Queue each periodic task whose interval has elapsed since its last run"""
+    now = datetime.utcnow()
+    last_runs = dict(
+        db.query(models.Job.name, func.max(models.Job.run_at)).filter(
+            models.Job.name.in_(list(schedule))
+        ).group_by(models.Job.name).all()
+    )
+    due = [
+        name for name, interval in schedule.items()
+        if last_runs.get(name) is None or last_runs[name] <= now - timedelta(seconds=interval)
+    ]
+    if due:
+        db.add_all([models.Job(name=name, args="[]", run_at=now) for name in due])
+        db.commit()
+    return due
+
+
+def prune_finished_jobs(db: Session, older_than_days: int = JOB_RETENTION_DAYS) -> int:
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    deleted = db.query(models.Job).filter(
+        models.Job.status.in_([models.JobStatus.DONE, models.JobStatus.FAILED]),
+        models.Job.finished_at < cutoff
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+class JobRunner:
+    """
+    Asyncio loop that claims and executes queued jobs
+
+    Jobs run in worker threads so the event loop stays responsive. Several
+    runners (e.g. one per uvicorn worker) can share one jobs table.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], registry: Dict[str, Callable],
+                 schedule: Optional[Dict[str, float]] = None,
+                 concurrency: int = JOB_CONCURRENCY, poll_interval: float = JOB_POLL_INTERVAL):
+        self.session_factory = session_factory
+        self.registry = registry
+        self.schedule = schedule or {}
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stopping = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._last_prune: Optional[datetime] = None
+        metrics.register_gauge("job_queue_jobs", "Jobs in the jobs table by status", ("status",),
+                               self._queue_samples, ttl=JOB_QUEUE_METRICS_TTL)
+
+    async def start(self) -> None:
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run(), name="job-runner")
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._task:
+            await self._task
+            self._task = None
+        await asyncio.to_thread(self._release)
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                ran = await self.run_once()
+            except Exception:
+                logger.exception("Job runner error")
+                ran = 0
+            if not ran:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def run_once(self) -> int:
+        """Schedule (if leader), then claim and run one batch; returns jobs run"""
+        claimed = await asyncio.to_thread(self._claim)
+        if not claimed:
+            return 0
+        heartbeat = asyncio.create_task(self._heartbeat(claimed))
+        try:
+            await asyncio.gather(*[asyncio.to_thread(self._execute, job) for job in claimed])
+        finally:
+            heartbeat.cancel()
+        return len(claimed)
+
+    async def _heartbeat(self, claimed: List[Dict[str, Any]]) -> None:
+        """Keep renewing the batch's leases so long tasks (backups) are not reclaimed mid-run"""
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            try:
+                await asyncio.to_thread(self._renew, claimed)
+            except Exception:
+                logger.exception("Could not renew job leases")
+
+    def _claim(self) -> List[Dict[str, Any]]:
+        db = self.session_factory()
+        try:
+            if self.schedule and acquire_lease(db, SCHEDULER_LEASE, self.worker_id, SCHEDULER_LEASE_SECONDS):
+                schedule_periodic(db, self.schedule)
+                now = datetime.utcnow()
+                if self._last_prune is None or now - self._last_prune > timedelta(hours=1):
+                    prune_finished_jobs(db)
+                    self._last_prune = now
+            return claim_jobs(db, self.worker_id, self.concurrency)
+        finally:
+            db.close()
+
+    def _execute(self, job: Dict[str, Any]) -> None:
+        db = self.session_factory()
+        try:
+            task = self.registry.get(job["name"])
+            if task is None:
+                fail_job(db, {**job, "attempts": job["max_attempts"]},
+                         LookupError(f"Unknown task {job['name']}"))
+                metrics.JOBS_PROCESSED.inc(task=job["name"], outcome="unknown_task")
+                return
+            try:
+                result = task(*job["args"])
+            except Exception as e:
+                logger.warning("Job %s (%s) failed on attempt %s: %s", job["id"], job["name"], job["attempts"], e)
+                fail_job(db, job, e)
+                metrics.JOBS_PROCESSED.inc(task=job["name"], outcome="error")
+            else:
+                complete_job(db, job["id"], result)
+                metrics.JOBS_PROCESSED.inc(task=job["name"], outcome="done")
+        finally:
+            db.close()
+
+    def _renew(self, claimed: List[Dict[str, Any]]) -> None:
+        db = self.session_factory()
+        try:
+            renew_jobs(db, claimed)
+        finally:
+            db.close()
+
+    def _queue_samples(self):
+        db = self.session_factory()
+        try:
+            return [({"status": status}, count) for status, count in get_queue_stats(db).items()]
+        finally:
+            db.close()
+
+    def _release(self) -> None:
+        db = self.session_factory()
+        try:
+            release_lease(db, SCHEDULER_LEASE, self.worker_id)
+        finally:
+            db.close()
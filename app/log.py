@@ -0,0 +1,226 @@
+"""
+Structured, non-blocking logging for Music U Scheduler
+
+Loggers only put records on an in-memory queue (QueueHandler); a
+QueueListener thread formats them as one JSON object per line and writes
+them to stderr and size-rotated files, so a slow disk never stalls the
+event loop. Three streams are written under LOG_DIR:
+
+- app.log: application and task logs
+- access.log: one line per HTTP request (AccessLogMiddleware) with method,
+  route template, status, duration, user id and SQL query count
+- updates.log: the admin self-update audit trail
+
+With several uvicorn workers set LOG_DIR per worker or include {pid} in it
+(e.g. logs/worker-{pid}, as start-production.sh does) so workers never
+rotate the same file; tail_updates_log() reads every worker's directory.
+"""
+
+import atexit
+import copy
+import glob
+import json
+import logging
+import os
+import queue
+import sys
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, List, Optional
+
+from . import metrics
+
+# Logging configuration
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json or text
+LOG_DIR = os.getenv("LOG_DIR", "logs")  # Empty: stderr only
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+
+ACCESS_LOGGER = "app.access"
+UPDATES_LOGGER = "app.updates"
+UPDATES_LOG_FILE = "updates.log"
+
+# Attributes every LogRecord has; anything else was passed with extra=
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+access_logger = logging.getLogger(ACCESS_LOGGER)
+
+_request_info: ContextVar[Optional[Dict[str, Any]]] = ContextVar("request_info", default=None)
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including any extra= fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """Render the message now (args may change later) but leave JSON formatting to the listener"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _LoggerFilter(logging.Filter):
+    def __init__(self, names: List[str], include: bool):
+        super().__init__()
+        self.names = names
+        self.include = include
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        matches = any(record.name == name or record.name.startswith(name + ".") for name in self.names)
+        return matches == self.include
+
+
+def _file_handler(log_dir: str, filename: str, formatter: logging.Formatter) -> RotatingFileHandler:
+    handler = RotatingFileHandler(os.path.join(log_dir, filename), maxBytes=LOG_MAX_BYTES,
+                                  backupCount=LOG_BACKUP_COUNT, encoding="utf-8", delay=True)
+    handler.setFormatter(formatter)
+    return handler
+
+
+def setup_logging(log_dir: Optional[str] = LOG_DIR, level: str = LOG_LEVEL, log_format: str = LOG_FORMAT,
+                  stream=None) -> QueueListener:
+    """Route all logging through a queue to a background writer thread; safe to call again"""
+    global _listener
+    stop_logging()
+
+    if log_format == "json":
+        formatter: logging.Formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    console = logging.StreamHandler(stream or sys.stderr)
+    console.setFormatter(formatter)
+    handlers: List[logging.Handler] = [console]
+    if log_dir:
+        log_dir = log_dir.format(pid=os.getpid())
+        os.makedirs(log_dir, exist_ok=True)
+        app_file = _file_handler(log_dir, "app.log", formatter)
+        app_file.addFilter(_LoggerFilter([ACCESS_LOGGER, UPDATES_LOGGER], include=False))
+        access_file = _file_handler(log_dir, "access.log", formatter)
+        access_file.addFilter(_LoggerFilter([ACCESS_LOGGER], include=True))
+        # Plain text so /admin/updates/logs can show it as-is
+        updates_file = _file_handler(log_dir, UPDATES_LOG_FILE, logging.Formatter("[%(asctime)s] %(message)s"))
+        updates_file.addFilter(_LoggerFilter([UPDATES_LOGGER], include=True))
+        handlers += [app_file, access_file, updates_file]
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.addHandler(_NonBlockingQueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, _NonBlockingQueueHandler):
+            root.removeHandler(handler)
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+def tail_updates_log(lines: int = 50, log_dir: Optional[str] = LOG_DIR) -> List[str]:
+    """Last lines of updates.log, merged across every worker's directory (blocking; run in a thread)
+
+    With a per-worker LOG_DIR such as logs/worker-{pid}, each worker only
+    logs the updates it handled, so the trail is read from all of them and
+    ordered by timestamp.
+    """
+    if not log_dir:
+        return []
+    pattern = "*".join(glob.escape(part) for part in log_dir.split("{pid}"))
+    merged: List[str] = []
+    for path in glob.glob(os.path.join(pattern, UPDATES_LOG_FILE)):
+        with open(path, encoding="utf-8") as f:
+            merged.extend(line.rstrip("\n") for line in f.readlines()[-lines:])
+    merged.sort()  # Lines start with "[asctime]", which sorts chronologically
+    return merged[-lines:]
+
+
+def set_request_user(user_id: Optional[int]) -> None:
+    """Record the authenticated user for the current request's access log line"""
+    info = _request_info.get()
+    if info is not None:
+        info["user_id"] = user_id
+
+
+class AccessLogMiddleware:
+    """ASGI middleware writing one structured access log record per HTTP request"""
+
+    def __init__(self, app, router_app=None):
+        self.app = app
+        self.router_app = router_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        info: Dict[str, Any] = {"status": 500, "user_id": None, "query_count": None}
+        token = _request_info.set(info)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                info["status"] = message["status"]
+                for name, value in message.get("headers", []):
+                    if name == b"x-query-count":
+                        info["query_count"] = int(value)
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_info.reset(token)
+            duration_ms = round((time.perf_counter() - started) * 1000, 2)
+            client = scope.get("client")
+            access_logger.info(
+                "%s %s %s %.2fms", scope["method"], scope["path"], info["status"], duration_ms,
+                extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": metrics.route_template(self.router_app, scope),
+                    "status": info["status"],
+                    "duration_ms": duration_ms,
+                    "user_id": info["user_id"],
+                    "query_count": info["query_count"],
+                    "client_ip": client[0] if client else None,
+                },
+            )
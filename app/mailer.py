@@ -0,0 +1,420 @@
+"""
+Outbound email delivery for Music U Scheduler
+
+Messages are written to the email_outbox table and drained in batches by
+deliver_outbox(), which sends each batch concurrently over a small pool of
+reusable SMTP connections and reschedules transient failures with
+exponential backoff.
+"""
+
+import os
+import queue
+import random
+import smtplib
+import ssl
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import formataddr, make_msgid
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.orm import Session
+
+from . import cache, models, schemas
+
+# Delivery configuration
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "200"))
+EMAIL_POOL_SIZE = int(os.getenv("EMAIL_POOL_SIZE", "4"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+EMAIL_RETRY_BASE_SECONDS = int(os.getenv("EMAIL_RETRY_BASE_SECONDS", "60"))
+EMAIL_RETRY_MAX_SECONDS = int(os.getenv("EMAIL_RETRY_MAX_SECONDS", "3600"))
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "30"))
+
+# How long a claimed message stays reserved before another drain may retry it
+SENDING_LEASE = timedelta(minutes=5)
+
+SETTING_PREFIX = "email."
+
+
+# Settings
+def get_email_settings(db: Session) -> Dict[str, Any]:
+    """Load SMTP settings from system_settings, falling back to defaults"""
+    return dict(cache.get_cache("settings").get_or_load("email", lambda: _load_email_settings(db)))
+
+
+def _load_email_settings(db: Session) -> Dict[str, Any]:
+    rows = db.query(models.SystemSettings).filter(
+        models.SystemSettings.key.startswith(SETTING_PREFIX)
+    ).all()
+    stored = {row.key[len(SETTING_PREFIX):]: row.value for row in rows}
+    defaults = schemas.EmailSettings()
+    values = {}
+    for field, default in defaults.model_dump().items():
+        if field not in stored:
+            values[field] = default
+        elif isinstance(default, bool):
+            values[field] = stored[field].lower() in ("1", "true", "yes", "on")
+        elif isinstance(default, int):
+            values[field] = int(stored[field])
+        else:
+            values[field] = stored[field]
+    return values
+
+
+def save_email_settings(db: Session, settings_update: schemas.EmailSettingsUpdate,
+                        updated_by: Optional[int] = None) -> Dict[str, Any]:
+    """Persist changed SMTP settings; an empty password keeps the stored one"""
+    update_data = settings_update.model_dump(exclude_unset=True, exclude_none=True)
+    if not update_data.get("smtp_password"):
+        update_data.pop("smtp_password", None)
+
+    keys = [SETTING_PREFIX + field for field in update_data]
+    existing = {
+        row.key: row for row in db.query(models.SystemSettings).filter(
+            models.SystemSettings.key.in_(keys)
+        ).all()
+    }
+    for field, value in update_data.items():
+        key = SETTING_PREFIX + field
+        value = str(value).lower() if isinstance(value, bool) else str(value)
+        if key in existing:
+            existing[key].value = value
+            existing[key].updated_at = datetime.utcnow()
+        else:
+            db.add(models.SystemSettings(key=key, value=value, description=f"Email setting: {field}"))
+
+    if updated_by and update_data:
+        db.add(models.AuditLog(
+            user_id=updated_by, action="UPDATE", resource_type="system_setting",
+            details=f"Updated email settings: {', '.join(sorted(update_data))}"
+        ))
+    cache.publish(db, "settings")
+    db.commit()
+    return get_email_settings(db)
+
+
+def public_email_settings(settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Settings safe to return over the API (password withheld)"""
+    return {**settings, "smtp_password": ""}
+
+
+# Outbox
+def enqueue_email(db: Session, to_address: str, subject: str, body: str,
+                  dedupe_key: Optional[str] = None) -> models.EmailOutbox:
+    """Queue a single message; a repeated dedupe_key returns the existing entry"""
+    if dedupe_key:
+        existing = db.query(models.EmailOutbox).filter(
+            models.EmailOutbox.dedupe_key == dedupe_key
+        ).first()
+        if existing:
+            return existing
+
+    message = models.EmailOutbox(
+        to_address=to_address, subject=subject, body=body, dedupe_key=dedupe_key
+    )
+    db.add(message)
+    db.commit()
+    db.refresh(message)
+    return message
+
+
+def enqueue_emails(db: Session, messages: List[Dict[str, Any]]) -> int:
+    """Queue many messages in one transaction, skipping known dedupe keys"""
+    keys = [m["dedupe_key"] for m in messages if m.get("dedupe_key")]
+    seen = set()
+    if keys:
+        seen = {
+            key for (key,) in db.query(models.EmailOutbox.dedupe_key).filter(
+                models.EmailOutbox.dedupe_key.in_(keys)
+            )
+        }
+
+    queued = []
+    for message in messages:
+        key = message.get("dedupe_key")
+        if key and key in seen:
+            continue
+        if key:
+            seen.add(key)
+        queued.append(models.EmailOutbox(
+            to_address=message["to_address"],
+            subject=message["subject"],
+            body=message["body"],
+            dedupe_key=key
+        ))
+
+    if queued:
+        db.add_all(queued)
+        db.commit()
+    return len(queued)
+
+
+def get_outbox_stats(db: Session) -> Dict[str, int]:
+    """Count outbox messages by status"""
+    counts = dict(
+        db.query(models.EmailOutbox.status, func.count(models.EmailOutbox.id))
+        .group_by(models.EmailOutbox.status).all()
+    )
+    return {status.value: counts.get(status, 0) for status in models.EmailStatus}
+
+
+# Message builders
+def build_lesson_reminder(lesson: models.Lesson) -> Dict[str, Any]:
+    """Reminder addressed to the lesson's student"""
+    when = lesson.scheduled_at.strftime("%A %B %d at %H:%M")
+    body = (
+        f"Hi {lesson.student.full_name},\n\n"
+        f"This is a reminder that your lesson \"{lesson.title}\" with "
+        f"{lesson.teacher.full_name} is scheduled for {when}"
+        f" ({lesson.duration_minutes} minutes).\n"
+    )
+    if lesson.location or lesson.room_number:
+        body += f"Location: {' '.join(filter(None, [lesson.location, lesson.room_number]))}\n"
+    body += "\nSee you there!\nMusic U"
+    return {
+        "to_address": lesson.student.email,
+        "subject": f"Lesson reminder: {lesson.title}",
+        "body": body,
+        "dedupe_key": f"lesson-reminder:{lesson.id}:{lesson.scheduled_at.isoformat()}"
+    }
+
+
+def build_welcome_email(user: models.User) -> Dict[str, Any]:
+    """Welcome message for a newly created account"""
+    return {
+        "to_address": user.email,
+        "subject": "Welcome to Music U",
+        "body": (
+            f"Hi {user.full_name},\n\n"
+            f"Your Music U account has been created. You can sign in with the "
+            f"username \"{user.username}\".\n\nMusic U"
+        ),
+        "dedupe_key": f"welcome:{user.id}"
+    }
+
+
+# SMTP delivery
+def _quietly_close(conn: smtplib.SMTP) -> None:
+    try:
+        conn.quit()
+    except Exception:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class SMTPConnectionPool:
+    """Bounded, thread-safe pool of authenticated SMTP connections"""
+
+    def __init__(self, settings: Dict[str, Any], size: int = EMAIL_POOL_SIZE,
+                 timeout: float = SMTP_TIMEOUT_SECONDS):
+        self.settings = settings
+        self.size = size
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[smtplib.SMTP]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+
+    def _connect(self) -> smtplib.SMTP:
+        host = self.settings["smtp_host"]
+        port = int(self.settings["smtp_port"])
+        if self.settings["smtp_use_ssl"]:
+            conn = smtplib.SMTP_SSL(host, port, timeout=self.timeout,
+                                    context=ssl.create_default_context())
+        else:
+            conn = smtplib.SMTP(host, port, timeout=self.timeout)
+            if self.settings["smtp_use_tls"]:
+                conn.starttls(context=ssl.create_default_context())
+        if self.settings["smtp_username"]:
+            conn.login(self.settings["smtp_username"], self.settings["smtp_password"])
+        return conn
+
+    def _checkout(self) -> smtplib.SMTP:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def _checkin(self, conn: smtplib.SMTP) -> None:
+        if self._closed:
+            _quietly_close(conn)
+        else:
+            self._idle.put(conn)
+
+    def send(self, message: EmailMessage) -> None:
+        """Send one message on a pooled connection"""
+        with self._slots:
+            conn = self._checkout()
+            try:
+                try:
+                    conn.send_message(message)
+                except smtplib.SMTPServerDisconnected:
+                    # The server dropped an idle connection; retry once on a fresh one
+                    _quietly_close(conn)
+                    conn = self._connect()
+                    conn.send_message(message)
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException):
+                # Rejected message, but the session itself is still usable
+                self._checkin(conn)
+                raise
+            except Exception:
+                _quietly_close(conn)
+                raise
+            self._checkin(conn)
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                _quietly_close(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+
+def _is_permanent(error: Exception) -> bool:
+    """5xx responses will not succeed on retry"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+    return False
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    delay = min(EMAIL_RETRY_MAX_SECONDS, EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def _build_message(settings: Dict[str, Any], item: Dict[str, Any]) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = formataddr((settings["from_name"], settings["from_email"]))
+    message["To"] = item["to_address"]
+    message["Subject"] = item["subject"]
+    message["Message-ID"] = make_msgid(domain=settings["from_email"].rpartition("@")[2] or None)
+    message.set_content(item["body"])
+    return message
+
+
+def _claim_batch(db: Session, batch_size: int) -> List[Dict[str, Any]]:
+    """Reserve the next due messages by leasing them as SENDING; concurrent runs never share one"""
+    now = datetime.utcnow()
+    due = and_(
+        models.EmailOutbox.status.in_([models.EmailStatus.PENDING, models.EmailStatus.SENDING]),
+        models.EmailOutbox.next_attempt_at <= now
+    )
+    columns = (models.EmailOutbox.id, models.EmailOutbox.to_address, models.EmailOutbox.subject,
+               models.EmailOutbox.body, models.EmailOutbox.attempts)
+    token = uuid.uuid4().hex
+    claim = {"status": models.EmailStatus.SENDING, "next_attempt_at": now + SENDING_LEASE, "claimed_by": token}
+
+    if db.get_bind().dialect.name == "postgresql":
+        candidates = select(models.EmailOutbox.id).where(due).order_by(
+            models.EmailOutbox.next_attempt_at, models.EmailOutbox.id
+        ).limit(batch_size).with_for_update(skip_locked=True)
+        rows = db.execute(
+            update(models.EmailOutbox).where(models.EmailOutbox.id.in_(candidates.scalar_subquery()))
+            .values(**claim).returning(*columns)
+        ).all()
+        db.commit()
+    else:
+        candidates = [message_id for (message_id,) in db.query(models.EmailOutbox.id).filter(due).order_by(
+            models.EmailOutbox.next_attempt_at, models.EmailOutbox.id
+        ).limit(batch_size)]
+        if not candidates:
+            return []
+        # Re-checking `due` inside the UPDATE means a concurrent run loses the row
+        db.execute(
+            update(models.EmailOutbox).where(models.EmailOutbox.id.in_(candidates), due)
+            .values(**claim).execution_options(synchronize_session=False)
+        )
+        db.commit()
+        rows = db.query(*columns).filter(models.EmailOutbox.claimed_by == token).order_by(models.EmailOutbox.id).all()
+
+    return [row._asdict() for row in rows]
+
+
+def _record_results(db: Session, batch: List[Dict[str, Any]],
+                    errors: List[Optional[Exception]], totals: Dict[str, int]) -> None:
+    now = datetime.utcnow()
+    sent_ids = []
+    failures = []
+    for item, error in zip(batch, errors):
+        if error is None:
+            sent_ids.append(item["id"])
+            continue
+        attempts = item["attempts"] + 1
+        give_up = _is_permanent(error) or attempts >= EMAIL_MAX_ATTEMPTS
+        failures.append({
+            "id": item["id"],
+            "attempts": attempts,
+            "last_error": f"{type(error).__name__}: {error}"[:1000],
+            "status": models.EmailStatus.FAILED if give_up else models.EmailStatus.PENDING,
+            "next_attempt_at": now if give_up else now + _retry_delay(attempts)
+        })
+        totals["failed" if give_up else "retried"] += 1
+
+    if sent_ids:
+        db.query(models.EmailOutbox).filter(models.EmailOutbox.id.in_(sent_ids)).update({
+            "status": models.EmailStatus.SENT,
+            "sent_at": now,
+            "last_error": None
+        }, synchronize_session=False)
+        totals["sent"] += len(sent_ids)
+    if failures:
+        db.bulk_update_mappings(models.EmailOutbox, failures)
+    db.commit()
+
+
+def deliver_outbox(db: Session, batch_size: int = EMAIL_BATCH_SIZE,
+                   pool: Optional[SMTPConnectionPool] = None,
+                   max_batches: Optional[int] = None) -> Dict[str, int]:
+    """
+    Drain due outbox messages in batches
+
+    Args:
+        db: Database session
+        batch_size: Messages claimed and sent per batch
+        pool: SMTP pool to reuse; one is built from stored settings if omitted
+        max_batches: Stop after this many batches (None drains everything due)
+
+    Returns:
+        Counts of sent, retried and permanently failed messages
+    """
+    settings = pool.settings if pool else get_email_settings(db)
+    owns_pool = pool is None
+    if owns_pool:
+        pool = SMTPConnectionPool(settings)
+
+    def send(message: EmailMessage) -> Optional[Exception]:
+        try:
+            pool.send(message)
+        except Exception as e:
+            return e
+        return None
+
+    totals = {"sent": 0, "retried": 0, "failed": 0}
+    batches = 0
+    try:
+        with ThreadPoolExecutor(max_workers=pool.size, thread_name_prefix="smtp") as executor:
+            while max_batches is None or batches < max_batches:
+                batch = _claim_batch(db, batch_size)
+                if not batch:
+                    break
+                batches += 1
+                messages = [_build_message(settings, item) for item in batch]
+                errors = list(executor.map(send, messages))
+                _record_results(db, batch, errors, totals)
+    finally:
+        if owns_pool:
+            pool.close()
+    return totals
+
+
+def check_smtp_connection(settings: Dict[str, Any]) -> None:
+    """Open, authenticate and close one SMTP session; raises on failure"""
+    pool = SMTPConnectionPool(settings, size=1)
+    _quietly_close(pool._connect())
@@ -1,17 +1,15 @@
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, PlainTextResponse
 from datetime import datetime
+import os
 
-from . import models
-from .database import engine
-from .api.routers import users, lessons, admin, instructor, web_admin, web_instructor
+from . import assets, health, log, metrics, query_budget
+from .database import check_schema, engine
+from .api.routers import users, events, lessons, admin, instructor, web_admin, web_instructor
 from .auth import auth_router
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
-
 # Initialize FastAPI app
 app = FastAPI(
     title="Music U Lesson Scheduler",
@@ -28,18 +26,87 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency/status by route template, and SQL statement timings
+app.add_middleware(metrics.MetricsMiddleware, router_app=app)
+metrics.instrument_engine(engine)
+
+# Per-request query counts (X-Query-Count) with budget and N+1 warnings
+app.add_middleware(query_budget.QueryBudgetMiddleware)
+query_budget.install()
+
+# One structured access log line per request; added last so it wraps the others
+app.add_middleware(log.AccessLogMiddleware, router_app=app)
+
 # Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", assets.StaticAssets(directory=assets.STATIC_DIR), name="static")
 
 # Include routers
 app.include_router(auth_router)
 app.include_router(users.router)
+app.include_router(events.router)
 app.include_router(lessons.router)
 app.include_router(admin.router)
 app.include_router(instructor.router)
 app.include_router(web_admin.router)
 app.include_router(web_instructor.router)
 
+@app.on_event("startup")
+def configure_logging():
+    """JSON logs written by a background thread (see app.log)"""
+    log.setup_logging()
+
+
+@app.on_event("shutdown")
+def flush_logs():
+    log.stop_logging()
+
+
+@app.on_event("startup")
+def check_database_schema():
+    """Verify the schema matches the newest migration (creates it on a new database)"""
+    check_schema()
+
+
+# Keeps this worker's caches in step with writes made by other workers
+CACHE_INVALIDATION_ENABLED = os.getenv("CACHE_INVALIDATION_ENABLED", "true").lower() == "true"
+
+
+@app.on_event("startup")
+def start_cache_listener():
+    from . import cache
+
+    if CACHE_INVALIDATION_ENABLED:
+        app.state.cache_listener = cache.InvalidationListener(engine)
+        app.state.cache_listener.start()
+
+
+@app.on_event("shutdown")
+def stop_cache_listener():
+    listener = getattr(app.state, "cache_listener", None)
+    if listener is not None:
+        listener.stop()
+
+
+# In-process job runner for the database job backend (see app.tasks.JOB_BACKEND)
+JOB_RUNNER_ENABLED = os.getenv("JOB_RUNNER_ENABLED", "true").lower() == "true"
+
+
+@app.on_event("startup")
+async def start_job_runner():
+    """Run queued tasks and periodic jobs inside this process"""
+    from . import tasks
+
+    if tasks.JOB_BACKEND == "database" and JOB_RUNNER_ENABLED:
+        app.state.job_runner = tasks.create_job_runner()
+        await app.state.job_runner.start()
+
+
+@app.on_event("shutdown")
+async def stop_job_runner():
+    runner = getattr(app.state, "job_runner", None)
+    if runner is not None:
+        await runner.stop()
+
 
 @app.get("/")
 async def root():
@@ -62,6 +129,10 @@ async def root():
             "audit_logs": "/admin/audit-logs",
             "reports": "/admin/reports"
         },
+        "web": {
+            "admin": "/web/admin/dashboard",
+            "instructor": "/web/instructor/dashboard"
+        },
         "instructor": {
             "dashboard": "/instructor/dashboard",
             "profile": "/instructor/profile",
@@ -73,7 +144,45 @@ async def root():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics(request: Request):
+    """Prometheus scrape endpoint
+
+    A plain def so FastAPI runs it in the threadpool: gauges such as the job
+    queue depth query the database while rendering.
+    """
+    if not metrics.scrape_allowed(request.client.host if request.client else None,
+                                  request.headers.get("authorization")):
+        raise HTTPException(status_code=403, detail="Metrics are not available to this client")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def _watched_periodic_tasks():
+    """Periodic tasks run by this deployment's database job runners, if any"""
+    from . import tasks
+
+    if tasks.JOB_BACKEND == "database" and JOB_RUNNER_ENABLED:
+        return tasks.PERIODIC_TASKS
+    return None
+
+
+readiness = health.ReadinessProbe(engine, schedule=_watched_periodic_tasks)
+
+
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "alive", "timestamp": datetime.utcnow()}
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: database, pool, job queue and periodic tasks (503 when unhealthy)"""
+    result = await readiness.get()
+    return JSONResponse(result, status_code=503 if result["status"] == health.UNHEALTHY else 200)
+
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "timestamp": datetime.utcnow()}
+    """Health check endpoint (same as /health/ready)"""
+    return await readiness_check()
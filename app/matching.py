@@ -0,0 +1,133 @@
+"""
+Instructor matching for new students
+
+match_instructors() ranks instructor/slot candidates for an intake: who
+teaches the instrument (through the instructor_specializations role index),
+the earliest free start in each of the student's preferred windows, and how
+many lessons the instructor already has that week. However many instructors
+and windows there are, it runs two set-based queries: one for the
+candidates, and one for their lessons across the weeks the windows touch,
+read through the (teacher_id, scheduled_at) index. Free slots and weekly
+loads are then worked out in memory from those rows.
+
+Candidates are ranked by the student's window order, then by weekly load so
+new students go to the least busy instructor, then by start time.
+"""
+
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import crud, models
+
+SLOT_STEP_MINUTES = 15  # Offered start times are aligned to this
+MAX_MATCH_WINDOWS = 20
+MAX_MATCH_SPAN = timedelta(weeks=8)  # From the earliest window start to the latest window end
+MAX_MATCH_RESULTS = 50
+
+
+class UnknownInstrument(LookupError):
+    """No catalog role teaches the requested instrument"""
+
+
+def _utc_naive(value: datetime) -> datetime:
+    # Lessons are stored as naive UTC
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _week_start(value: datetime) -> datetime:
+    return (value - timedelta(days=value.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _align(value: datetime) -> datetime:
+    """Round up to the next SLOT_STEP_MINUTES boundary"""
+    floored = value.replace(minute=value.minute - value.minute % SLOT_STEP_MINUTES, second=0, microsecond=0)
+    return floored if floored == value else floored + timedelta(minutes=SLOT_STEP_MINUTES)
+
+
+def _first_free_start(busy: List[Tuple[datetime, datetime]], start: datetime, end: datetime,
+                      duration: timedelta):
+    """Earliest aligned start in [start, end) clear of busy intervals (sorted by start); None if full"""
+    slot = _align(start)
+    for busy_start, busy_end in busy:
+        if slot + duration <= busy_start:
+            break
+        if busy_end > slot:
+            slot = _align(busy_end)
+    return slot if slot + duration <= end else None
+
+
+def match_instructors(db: Session, instrument: str, windows: Sequence[Tuple[datetime, datetime]],
+                      duration_minutes: int = 60, limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Rank instructor/slot candidates for a new student
+
+    windows are (start, end) pairs, most preferred first. Each instructor is
+    offered at most one slot per window: the earliest that fits. Raises
+    ValueError for unusable windows and UnknownInstrument when no role in
+    the catalog teaches the instrument.
+    """
+    windows = [(_utc_naive(start), _utc_naive(end)) for start, end in windows]
+    if not windows or len(windows) > MAX_MATCH_WINDOWS:
+        raise ValueError(f"Give between 1 and {MAX_MATCH_WINDOWS} time windows")
+    if any(end <= start for start, end in windows):
+        raise ValueError("Each time window must end after it starts")
+    if max(end for _, end in windows) - min(start for start, _ in windows) > MAX_MATCH_SPAN:
+        raise ValueError(f"Time windows must fall within {MAX_MATCH_SPAN.days} days")
+    if not 1 <= duration_minutes <= 24 * 60:
+        raise ValueError("Duration must be between 1 minute and a day")
+    if not 1 <= limit <= MAX_MATCH_RESULTS:
+        raise ValueError(f"Limit must be between 1 and {MAX_MATCH_RESULTS}")
+
+    wanted = instrument.strip().lower()
+    role_ids = [role["id"] for role in crud.get_instructor_roles(db)
+                if wanted in (role["id"].lower(), role["instrument"].lower())]
+    if not role_ids:
+        raise UnknownInstrument(instrument)
+
+    instructors = {}
+    for instructor, role_id in db.query(models.User, models.InstructorSpecialization.role_id).join(
+        models.InstructorSpecialization, models.InstructorSpecialization.instructor_id == models.User.id
+    ).filter(
+        models.InstructorSpecialization.role_id.in_(role_ids),
+        models.User.role == models.UserRole.INSTRUCTOR,
+        models.User.is_active == True
+    ):
+        instructors.setdefault(instructor.id, (instructor, role_id))
+    if not instructors:
+        return []
+
+    # Whole weeks, so the load counts are complete; a day earlier for lessons running past midnight
+    first_week = _week_start(min(start for start, _ in windows))
+    last_week = _week_start(max(end for _, end in windows)) + timedelta(weeks=1)
+    busy = defaultdict(list)
+    load = Counter()
+    for teacher_id, scheduled_at, minutes in db.query(
+        models.Lesson.teacher_id, models.Lesson.scheduled_at, models.Lesson.duration_minutes
+    ).filter(
+        models.Lesson.teacher_id.in_(list(instructors)),
+        models.Lesson.scheduled_at >= first_week - timedelta(days=1),
+        models.Lesson.scheduled_at < last_week,
+        models.Lesson.status != models.LessonStatus.CANCELLED
+    ).order_by(models.Lesson.teacher_id, models.Lesson.scheduled_at):
+        scheduled_at = _utc_naive(scheduled_at)
+        busy[teacher_id].append((scheduled_at, scheduled_at + timedelta(minutes=minutes or 60)))
+        if scheduled_at >= first_week:
+            load[teacher_id, _week_start(scheduled_at)] += 1
+
+    duration = timedelta(minutes=duration_minutes)
+    candidates = []
+    for preference, (start, end) in enumerate(windows):
+        for instructor, role_id in instructors.values():
+            slot = _first_free_start(busy[instructor.id], start, end, duration)
+            if slot is not None:
+                candidates.append({
+                    "instructor": instructor, "role_id": role_id, "start": slot, "end": slot + duration,
+                    "weekly_load": load[instructor.id, _week_start(slot)], "window": preference
+                })
+    candidates.sort(key=lambda c: (c["window"], c["weekly_load"], c["start"], c["instructor"].full_name))
+    return candidates[:limit]
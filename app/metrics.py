@@ -0,0 +1,322 @@
+"""
+Prometheus metrics for Music U Scheduler
+
+A small in-process registry rendered in the Prometheus text exposition
+format at /metrics, so no client library is needed. HTTP metrics are
+labelled with the route template (e.g. /lessons/{lesson_id}) rather than the
+raw path to keep label cardinality bounded. Each uvicorn worker keeps its
+own registry; scrape every worker (or run one) for complete numbers.
+
+/metrics answers clients in METRICS_ALLOWED_HOSTS (loopback by default)
+and, when METRICS_TOKEN is set, anyone presenting it as a bearer token.
+"""
+
+import bisect
+import hmac
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match, Mount
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Scrape access
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_ALLOWED_HOSTS = {host.strip() for host in os.getenv("METRICS_ALLOWED_HOSTS", "127.0.0.1,::1").split(",")
+                         if host.strip()}
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """Gauge set directly, or computed at scrape time by a callback"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], Iterable[Tuple[Dict[str, str], float]]]] = None,
+                 ttl: float = 0.0):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self.callback = callback
+        self.ttl = ttl  # Seconds to reuse the callback's samples across scrapes
+        self._samples: List[Tuple[Tuple[str, ...], float]] = []
+        self._samples_expire_at = 0.0
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def collect(self) -> List[str]:
+        if self.callback is not None:
+            samples = self._callback_samples()
+        else:
+            with self._lock:
+                samples = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in samples
+        ]
+
+
+    def _callback_samples(self) -> List[Tuple[Tuple[str, ...], float]]:
+        with self._lock:
+            if self.ttl and time.monotonic() < self._samples_expire_at:
+                return self._samples
+        try:
+            samples = [(self._key(labels), value) for labels, value in self.callback()]
+        except Exception:
+            samples = []
+        with self._lock:
+            self._samples, self._samples_expire_at = samples, time.monotonic() + self.ttl
+        return samples
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # bucket counts..., sum, count
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels) -> float:
+        series = self._series.get(self._key(labels))
+        return series[-1] if series else 0.0
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = self.header()
+        for key, series in items:
+            cumulative = 0.0
+            for bound, bucket_count in zip(self.buckets, series):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, inf)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(series[-1])}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+
+def _register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+# HTTP
+HTTP_REQUESTS = _register(Counter(
+    "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status")))
+HTTP_LATENCY = _register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")))
+HTTP_IN_PROGRESS = _register(Gauge(
+    "http_requests_in_progress", "HTTP requests currently being served", ("method", "route")))
+
+# Database
+DB_QUERIES = _register(Counter(
+    "db_queries_total", "SQL statements executed", ("operation",)))
+DB_QUERY_LATENCY = _register(Histogram(
+    "db_query_duration_seconds", "SQL statement execution time", ("operation",), buckets=DB_BUCKETS))
+
+# Password hashing
+PASSWORD_HASH_LATENCY = _register(Histogram(
+    "password_hash_duration_seconds", "bcrypt hash/verify time in the password executor", ("operation",)))
+
+# Background jobs
+JOBS_ENQUEUED = _register(Counter(
+    "jobs_enqueued_total", "Tasks queued with .delay()", ("task", "backend")))
+JOBS_PROCESSED = _register(Counter(
+    "jobs_processed_total", "Jobs run by the database job runner", ("task", "outcome")))
+
+# Live updates
+SSE_SUBSCRIBERS = _register(Gauge(
+    "sse_subscribers", "Open lesson event streams in this worker"))
+SSE_EVENTS = _register(Counter(
+    "sse_events_total", "Lesson events offered to subscribers", ("outcome",)))
+
+
+def register_gauge(name: str, documentation: str, labelnames: Sequence[str],
+                   callback: Callable[[], Iterable[Tuple[Dict[str, str], float]]], ttl: float = 0.0) -> Gauge:
+    """Add a gauge whose samples are computed at scrape time, at most once per `ttl` seconds"""
+    for metric in REGISTRY:
+        if metric.name == name:
+            REGISTRY.remove(metric)
+            break
+    return _register(Gauge(name, documentation, labelnames, callback=callback, ttl=ttl))
+
+
+def scrape_allowed(client_host: Optional[str], authorization: Optional[str]) -> bool:
+    """Whether a /metrics request comes from an allowed host or carries METRICS_TOKEN"""
+    if client_host in METRICS_ALLOWED_HOSTS:
+        return True
+    return bool(METRICS_TOKEN) and hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}")
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Count and time every statement, and expose connection pool gauges"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _record_query(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_query_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+        DB_QUERIES.inc(operation=operation)
+        DB_QUERY_LATENCY.observe(time.perf_counter() - started, operation=operation)
+
+    @event.listens_for(engine, "handle_error")
+    def _discard_query_timer(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("metrics_query_start"):
+            connection.info["metrics_query_start"].pop()
+
+    def pool_samples():
+        pool = engine.pool
+        for state in ("size", "checkedin", "checkedout", "overflow"):
+            method = getattr(pool, state, None)
+            if callable(method):
+                yield {"state": state}, method()
+
+    register_gauge("db_pool_connections", "Connection pool state", ("state",), pool_samples)
+
+
+def route_template(router_app, scope) -> str:
+    """Route path template a request matches, e.g. /lessons/{lesson_id}"""
+    partial = None
+    for route in getattr(router_app, "routes", []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            partial = route
+            break
+        if match == Match.PARTIAL and partial is None:
+            partial = route  # Path matched but not the method (405)
+    if partial is None:
+        return "unmatched"
+    if isinstance(partial, Mount):
+        return partial.path + "/{path}"
+    return partial.path
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency, status and in-flight requests"""
+
+    def __init__(self, app, router_app=None):
+        self.app = app
+        self.router_app = router_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(self.router_app, scope)
+        status_holder = {"status": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+            await send(message)
+
+        HTTP_IN_PROGRESS.inc(method=method, route=route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_PROGRESS.dec(method=method, route=route)
+            HTTP_LATENCY.observe(time.perf_counter() - started, method=method, route=route)
+            HTTP_REQUESTS.inc(method=method, route=route, status=status_holder["status"])
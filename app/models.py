@@ -1,9 +1,10 @@
 
 
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, Text, Enum, Float
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, Text, Enum, Float, Index, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
+from datetime import datetime
 import enum
 
 
@@ -20,6 +21,20 @@ class LessonStatus(str, enum.Enum):
     RESCHEDULED = "rescheduled"
 
 
+class EmailStatus(str, enum.Enum):
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class JobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -36,10 +51,13 @@ class User(Base):
     emergency_contact = Column(String, nullable=True)
     notes = Column(Text, nullable=True)
     hourly_rate = Column(Float, nullable=True)  # For instructors
-    specializations = Column(Text, nullable=True)  # JSON string of instruments/skills
+    specializations = Column(Text, nullable=True)  # Comma-separated as typed; see InstructorSpecialization
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     last_login = Column(DateTime(timezone=True), nullable=True)
+    version_id = Column(Integer, nullable=False, server_default="1")  # Optimistic concurrency; sent as ETag
+
+    __mapper_args__ = {"version_id_col": version_id}
 
     # Relationships
     taught_lessons = relationship("Lesson", foreign_keys="[Lesson.teacher_id]", back_populates="teacher")
@@ -49,6 +67,10 @@ class User(Base):
 
 class Lesson(Base):
     __tablename__ = "lessons"
+    __table_args__ = (
+        Index("ix_lessons_status_scheduled", "status", "scheduled_at"),
+        Index("ix_lessons_teacher_scheduled", "teacher_id", "scheduled_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
@@ -72,6 +94,9 @@ class Lesson(Base):
     progress_notes = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    version_id = Column(Integer, nullable=False, server_default="1")  # Optimistic concurrency; sent as ETag
+
+    __mapper_args__ = {"version_id_col": version_id}
 
     # Relationships
     teacher = relationship("User", foreign_keys=[teacher_id], back_populates="taught_lessons")
@@ -79,6 +104,41 @@ class Lesson(Base):
     creator = relationship("User", foreign_keys=[created_by], back_populates="created_lessons")
 
 
+
+class LessonArchive(Base):
+    """Completed lessons moved out of the hot lessons table by the archival job"""
+    __tablename__ = "lessons_archive"
+    __table_args__ = (
+        Index("ix_lessons_archive_teacher_scheduled", "teacher_id", "scheduled_at"),
+        Index("ix_lessons_archive_student_scheduled", "student_id", "scheduled_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    lesson_id = Column(Integer, nullable=False, index=True)  # The id the lesson had in lessons; ids can be reused
+    title = Column(String, nullable=False)
+    description = Column(Text, nullable=True)
+    teacher_id = Column(Integer, nullable=False)
+    student_id = Column(Integer, nullable=False)
+    created_by = Column(Integer, nullable=True)
+    scheduled_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    duration_minutes = Column(Integer, default=60)
+    instrument = Column(String, nullable=True)
+    lesson_type = Column(String, default="individual")
+    status = Column(Enum(LessonStatus), default=LessonStatus.COMPLETED)
+    notes = Column(Text, nullable=True)
+    instructor_notes = Column(Text, nullable=True)
+    admin_notes = Column(Text, nullable=True)
+    cost = Column(Float, nullable=True)
+    location = Column(String, nullable=True)
+    room_number = Column(String, nullable=True)
+    materials_needed = Column(Text, nullable=True)
+    homework_assigned = Column(Text, nullable=True)
+    progress_notes = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+    version_id = Column(Integer, nullable=True)
+    archived_at = Column(DateTime(timezone=True), nullable=False)
+
 class SystemSettings(Base):
     __tablename__ = "system_settings"
 
@@ -106,3 +166,128 @@ class AuditLog(Base):
     # Relationships
     user = relationship("User")
 
+
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_address = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(Enum(EmailStatus), default=EmailStatus.PENDING, nullable=False)
+    dedupe_key = Column(String, unique=True, nullable=True)  # e.g. lesson-reminder:42
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+    claimed_by = Column(String, nullable=True)  # Token of the delivery run that last leased it
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class Job(Base):
+    """Background task queued for the in-process database job runner"""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+        Index("ix_jobs_name_run_at", "name", "run_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)  # Task function name in app.tasks
+    args = Column(Text, nullable=False, default="[]")  # JSON list of positional args
+    status = Column(Enum(JobStatus), default=JobStatus.QUEUED, nullable=False)
+    run_at = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+    locked_by = Column(String, nullable=True)
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    result = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class JobLease(Base):
+    """Named lease used to elect a single scheduler among job runners"""
+    __tablename__ = "job_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class CacheInvalidation(Base):
+    """Invalidation feed read by other workers when PostgreSQL NOTIFY is unavailable (SQLite)"""
+    __tablename__ = "cache_invalidations"
+    __table_args__ = {"sqlite_autoincrement": True}  # Listeners resume from the last id seen, even after pruning
+
+    id = Column(Integer, primary_key=True)
+    namespace = Column(String, nullable=False)
+    key = Column(String, nullable=True)  # NULL clears the whole namespace
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, index=True)
+
+
+class ChangeLogEntry(Base):
+    """Sequenced log of lesson and user writes; its id is the delta sync cursor"""
+    __tablename__ = "change_log"
+    __table_args__ = {"sqlite_autoincrement": True}  # Never reuse ids, even after pruning
+
+    id = Column(Integer, primary_key=True)
+    resource_type = Column(String, nullable=False)  # lesson, user
+    resource_id = Column(Integer, nullable=False)
+    operation = Column(String, nullable=False)  # insert, update, delete
+    changed_at = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False, index=True)
+
+
+class InstructorRole(Base):
+    """Catalog of instrument roles an instructor can hold; id is a slug such as "piano" """
+    __tablename__ = "instructor_roles"
+
+    id = Column(String, primary_key=True)
+    name = Column(String, nullable=False)
+    instrument = Column(String, nullable=False)
+    description = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class InstructorSpecialization(Base):
+    """Which catalog roles each instructor holds"""
+    __tablename__ = "instructor_specializations"
+    __table_args__ = (
+        # The primary key serves per-instructor lookups; this one finds every instructor for a role
+        Index("ix_instructor_specializations_role_instructor", "role_id", "instructor_id"),
+    )
+
+    instructor_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    role_id = Column(String, ForeignKey("instructor_roles.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+
+
+DEFAULT_INSTRUCTOR_ROLES = [
+    {"id": "piano", "name": "Piano Instructor", "instrument": "Piano",
+     "description": "Teaches piano lessons for all skill levels"},
+    {"id": "guitar", "name": "Guitar Instructor", "instrument": "Guitar",
+     "description": "Teaches acoustic and electric guitar"},
+    {"id": "violin", "name": "Violin Instructor", "instrument": "Violin",
+     "description": "Teaches violin for beginners to advanced"},
+    {"id": "drums", "name": "Drum Instructor", "instrument": "Drums",
+     "description": "Teaches drum kit and percussion"},
+    {"id": "voice", "name": "Voice Coach", "instrument": "Voice",
+     "description": "Vocal training and singing lessons"},
+    {"id": "saxophone", "name": "Saxophone Instructor", "instrument": "Saxophone",
+     "description": "Teaches alto, tenor, and soprano saxophone"},
+    {"id": "trumpet", "name": "Trumpet Instructor", "instrument": "Trumpet",
+     "description": "Brass instrument instruction"},
+    {"id": "flute", "name": "Flute Instructor", "instrument": "Flute",
+     "description": "Woodwind instrument lessons"},
+]
+
+
+@event.listens_for(InstructorRole.__table__, "after_create")
+def _seed_instructor_roles(target, connection, **kw):
+    # Databases built with create_all start with the same catalog the migration seeds
+    connection.execute(target.insert(), DEFAULT_INSTRUCTOR_ROLES)
@@ -0,0 +1,165 @@
+"""
+Per-request SQL query budgets and N+1 detection
+
+Every statement executed while a request is being served is counted against
+that request. A request that runs the same statement shape many times (the
+usual N+1 symptom) or more statements than its endpoint's declared budget is
+logged; in strict mode (QUERY_BUDGET_STRICT, enabled by the test suite) it
+raises QueryBudgetExceeded instead so the offending test fails.
+
+Declare a budget with the query_budget decorator:
+
+    @router.get("/reports/users")
+    @query_budget(5)
+    async def get_user_reports(...):
+"""
+
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUDGET_DEFAULT = int(os.getenv("QUERY_BUDGET_DEFAULT", "50"))  # For endpoints without a declared budget
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))  # Same shape this often looks like N+1
+STRICT = os.getenv("QUERY_BUDGET_STRICT", "false").lower() == "true"
+
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))*\s*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in strict mode when a request breaks its query budget"""
+
+
+def statement_shape(statement: str) -> str:
+    """Normalise a statement so executions differing only in parameters compare equal"""
+    shape = _WHITESPACE.sub(" ", statement.strip())
+    shape = _PLACEHOLDER_LIST.sub("(?)", shape)
+    return _NUMBER.sub("N", shape)
+
+
+class QueryStats:
+    """Statements executed within one request (or tracked block)"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int = None) -> List[Tuple[str, int]]:
+        """Statement shapes executed at least `threshold` times"""
+        threshold = threshold or QUERY_REPEAT_THRESHOLD
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+@contextmanager
+def track() -> Iterator[QueryStats]:
+    """Count the statements executed inside the block"""
+    install()
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def query_budget(max_queries: int, allow_repeats: bool = False) -> Callable:
+    """Declare the most statements an endpoint may run per request"""
+    def decorator(func: Callable) -> Callable:
+        func.__query_budget__ = max_queries
+        func.__query_allow_repeats__ = allow_repeats
+        return func
+    return decorator
+
+
+_installed = False
+
+
+def install() -> None:
+    """Attribute every statement, on any engine, to the current request"""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault("query_budget_start", []).append(time.perf_counter())
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def _count_statement(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        if stats is not None:
+            started = conn.info.get("query_budget_start")
+            duration = time.perf_counter() - started.pop() if started else 0.0
+            stats.record(statement, duration)
+
+
+def check(stats: QueryStats, endpoint: Optional[Callable], label: str) -> List[str]:
+    """Budget and N+1 problems for a finished request; raises in strict mode"""
+    budget = getattr(endpoint, "__query_budget__", QUERY_BUDGET_DEFAULT)
+    problems = []
+    if stats.count > budget:
+        problems.append(f"{label} ran {stats.count} queries, budget is {budget}")
+    if not getattr(endpoint, "__query_allow_repeats__", False):
+        for shape, count in stats.repeated():
+            problems.append(f"{label} repeated a statement {count} times (possible N+1): {shape[:200]}")
+
+    for problem in problems:
+        logger.warning(problem)
+    if problems and STRICT:
+        raise QueryBudgetExceeded("; ".join(problems))
+    return problems
+
+
+class QueryBudgetMiddleware:
+    """ASGI middleware counting queries per request and reporting X-Query-Count"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # Routing has run by now, so scope names the endpoint
+                check(stats, scope.get("endpoint"), f"{scope['method']} {scope['path']}")
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(stats.count).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
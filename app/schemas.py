@@ -72,6 +72,7 @@ class User(UserBase):
     last_login: Optional[datetime] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
+    version_id: int = 1  # Also sent as the ETag; echo it in If-Match when updating
 
     class Config:
         from_attributes = True
@@ -90,7 +91,39 @@ class UserSummary(BaseModel):
         from_attributes = True
 
 
-# Authentication Schemas
+# Instructor Role Schemas
+class InstructorRoleBase(BaseModel):
+    name: str
+    instrument: str
+    description: Optional[str] = ""
+
+
+class InstructorRoleCreate(InstructorRoleBase):
+    id: Optional[str] = None  # Slug such as "cello"; derived from the instrument when omitted
+
+
+class InstructorRoleUpdate(BaseModel):
+    name: Optional[str] = None
+    instrument: Optional[str] = None
+    description: Optional[str] = None
+
+
+class InstructorRole(InstructorRoleBase):
+    id: str
+
+    class Config:
+        from_attributes = True
+
+
+class InstructorWithRoles(BaseModel):
+    id: int
+    username: str
+    email: EmailStr
+    full_name: str
+    role: UserRole
+    assigned_roles: List[InstructorRole]
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -164,6 +197,7 @@ class Lesson(LessonBase):
     created_by: Optional[int] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
+    version_id: int = 1  # Also sent as the ETag; echo it in If-Match when updating
     teacher: UserSummary
     student: UserSummary
 
@@ -185,6 +219,28 @@ class LessonSummary(BaseModel):
         from_attributes = True
 
 
+class ChangeOperation(str, Enum):
+    INSERT = "insert"
+    UPDATE = "update"
+    DELETE = "delete"
+
+
+class LessonChange(BaseModel):
+    """One changed lesson or user (lessons embed user summaries); delete is a tombstone without data"""
+    cursor: int
+    resource_type: str  # lesson, user
+    resource_id: int
+    operation: ChangeOperation
+    lesson: Optional[Lesson] = None
+    user: Optional[UserSummary] = None
+
+
+class LessonChangeFeed(BaseModel):
+    changes: List[LessonChange]
+    cursor: int  # Pass as since on the next call
+    has_more: bool
+
+
 # Admin Schemas
 class SystemSettingsBase(BaseModel):
     key: str
@@ -260,6 +316,45 @@ class BulkLessonCreate(BaseModel):
     lessons: List[LessonCreate]
 
 
+class BulkLessonComplete(BaseModel):
+    lesson_ids: List[int]
+    notes: Optional[str] = None
+    homework_assigned: Optional[str] = None
+    progress_notes: Optional[str] = None
+
+
+class BulkLessonCancel(BaseModel):
+    lesson_ids: List[int]
+    reason: str
+
+
+class BulkLessonTransitionResult(BaseModel):
+    message: str
+    lesson_ids: List[int]
+
+
+# Instructor Matching
+class TimeWindow(BaseModel):
+    start: datetime
+    end: datetime
+
+
+class InstructorMatchRequest(BaseModel):
+    instrument: str
+    windows: List[TimeWindow]  # Most preferred first
+    duration_minutes: int = 60
+    limit: int = 10
+
+
+class InstructorMatch(BaseModel):
+    instructor: UserSummary
+    role_id: str
+    start: datetime
+    end: datetime
+    weekly_load: int  # Lessons the instructor already has in the week of start
+    window: int  # Index of the requested window this slot falls in
+
+
 # Reports
 class UserReport(BaseModel):
     user: UserSummary
@@ -279,3 +374,59 @@ class LessonReport(BaseModel):
     popular_instruments: Dict[str, int]
     instructor_stats: Dict[str, Dict[str, Any]]
 
+
+
+# Email Schemas
+class EmailSettings(BaseModel):
+    smtp_host: str = "localhost"
+    smtp_port: int = 587
+    smtp_username: str = ""
+    smtp_password: str = ""
+    smtp_use_tls: bool = True
+    smtp_use_ssl: bool = False
+    from_email: str = "noreply@musicu.com"
+    from_name: str = "Music U Scheduler"
+
+
+class EmailSettingsUpdate(BaseModel):
+    smtp_host: Optional[str] = None
+    smtp_port: Optional[int] = None
+    smtp_username: Optional[str] = None
+    smtp_password: Optional[str] = None
+    smtp_use_tls: Optional[bool] = None
+    smtp_use_ssl: Optional[bool] = None
+    from_email: Optional[str] = None
+    from_name: Optional[str] = None
+
+
+class EmailOutboxStats(BaseModel):
+    pending: int
+    sending: int
+    sent: int
+    failed: int
+
+
+# Backup Schemas
+class BackupCreate(BaseModel):
+    description: Optional[str] = None
+
+
+class SystemBackup(BaseModel):
+    id: str
+    filename: str
+    size: int
+    raw_size: int
+    checksum: str
+    database: str
+    created_at: str
+    type: str
+    status: str
+    description: Optional[str] = None
+    duration_seconds: float
+    throughput_mb_s: float
+
+
+class BackupRestoreResult(BaseModel):
+    id: str
+    duration_seconds: float
+    throughput_mb_s: float
@@ -1,129 +1,198 @@
 
-from celery import Celery
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from . import crud, models
-from .database import SessionLocal
+from sqlalchemy.orm import Session, joinedload
+from typing import Callable, Dict, Iterator
+from . import backup, changes, crud, jobs, mailer, metrics, models
+from .database import SessionLocal, engine
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
-
-# Initialize Celery
+try:
+    from celery import Celery
+    from celery.signals import worker_process_init, worker_process_shutdown
+except ImportError:  # Celery is optional when the database job runner is used
+    Celery = None
+
+# Periodic tasks and their interval in seconds
+PERIODIC_TASKS = {
+    "send_lesson_reminders": 3600.0,  # Run every hour
+    "deliver_email_outbox": 60.0,  # Run every minute
+    "cleanup_old_lessons": 86400.0,  # Run daily
+    "prune_change_log": 86400.0,  # Run daily
+    "backup_database": 86400.0,  # Run daily
+}
+
+# Lesson archival
+LESSON_ARCHIVE_AFTER_DAYS = int(os.getenv("LESSON_ARCHIVE_AFTER_DAYS", "90"))
+LESSON_ARCHIVE_BATCH_SIZE = int(os.getenv("LESSON_ARCHIVE_BATCH_SIZE", "1000"))
+
+# "celery" sends .delay() calls to Redis; "database" queues them in the jobs table
+# for the in-process runner started by app.main
 redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-celery_app = Celery("music_scheduler", broker=redis_url, backend=redis_url)
-
-# Celery configuration
-celery_app.conf.update(
-    task_serializer="json",
-    accept_content=["json"],
-    result_serializer="json",
-    timezone="UTC",
-    enable_utc=True,
-    beat_schedule={
-        "send-lesson-reminders": {
-            "task": "app.tasks.send_lesson_reminders",
-            "schedule": 3600.0,  # Run every hour
-        },
-        "cleanup-old-lessons": {
-            "task": "app.tasks.cleanup_old_lessons",
-            "schedule": 86400.0,  # Run daily
+JOB_BACKEND = os.getenv(
+    "JOB_BACKEND", "celery" if Celery and os.getenv("REDIS_URL") else "database"
+).lower()
+
+# Task registry used by the database job runner
+TASKS: Dict[str, Callable] = {}
+
+celery_app = None
+if Celery is not None:
+    # Initialize Celery
+    celery_app = Celery("music_scheduler", broker=redis_url, backend=redis_url)
+
+    # Celery configuration
+    celery_app.conf.update(
+        task_serializer="json",
+        accept_content=["json"],
+        result_serializer="json",
+        timezone="UTC",
+        enable_utc=True,
+        beat_schedule={
+            name.replace("_", "-"): {"task": f"app.tasks.{name}", "schedule": interval}
+            for name, interval in PERIODIC_TASKS.items()
         },
-    },
-)
+    )
+
+    @worker_process_init.connect
+    def init_worker_process(**kwargs):
+        """Give each prefork child its own connection pool
+
+        Connections opened by the parent before forking must never be used by
+        a child, so the inherited pool is replaced without closing the parent's
+        sockets.
+        """
+        engine.dispose(close=False)
+
+    @worker_process_shutdown.connect
+    def shutdown_worker_process(**kwargs):
+        """Close this worker's pooled connections on exit"""
+        engine.dispose()
+
+
+def task(func: Callable) -> Callable:
+    """Register a task with both backends
+
+    Calling the task runs it inline; ``.delay(*args)`` hands it to whichever
+    backend JOB_BACKEND selects at call time. Tasks let exceptions propagate
+    so the backend records the failure and retries the job.
+    """
+    TASKS[func.__name__] = func
+    celery_task = celery_app.task(func) if celery_app is not None else None
 
+    def delay(*args):
+        if JOB_BACKEND == "celery" and celery_task is not None:
+            metrics.JOBS_ENQUEUED.inc(task=func.__name__, backend="celery")
+            return celery_task.delay(*args)
+        metrics.JOBS_ENQUEUED.inc(task=func.__name__, backend="database")
+        with task_session() as db:
+            return jobs.enqueue(db, func.__name__, *args)
 
-def get_db():
-    """Get database session for tasks"""
+    func.delay = delay
+    func.celery_task = celery_task
+    return func
+
+
+def create_job_runner() -> jobs.JobRunner:
+    """Job runner for the database backend, scheduling PERIODIC_TASKS"""
+    return jobs.JobRunner(SessionLocal, TASKS, schedule=PERIODIC_TASKS)
+
+
+@contextmanager
+def task_session() -> Iterator[Session]:
+    """Database session scoped to a single task run"""
     db = SessionLocal()
     try:
-        return db
+        yield db
+    except Exception:
+        db.rollback()
+        raise
     finally:
         db.close()
 
 
-@celery_app.task
+@task
 def send_lesson_reminder(lesson_id: int):
     """Send reminder for a specific lesson"""
-    db = get_db()
-    try:
+    with task_session() as db:
         lesson = crud.get_lesson(db, lesson_id)
         if lesson and lesson.status == "scheduled":
-            # TODO: Implement email/SMS notification logic
-            print(f"Reminder: Lesson '{lesson.title}' scheduled for {lesson.scheduled_at}")
-            return f"Reminder sent for lesson {lesson_id}"
-    except Exception as e:
-        print(f"Error sending reminder for lesson {lesson_id}: {e}")
-        return f"Error: {e}"
-    finally:
-        db.close()
+            mailer.enqueue_email(db, **mailer.build_lesson_reminder(lesson))
+            deliver_email_outbox.delay()
+            return f"Reminder queued for lesson {lesson_id}"
 
 
-@celery_app.task
+@task
 def send_lesson_reminders():
     """Send reminders for upcoming lessons (within next 24 hours)"""
-    db = get_db()
-    try:
+    with task_session() as db:
         now = datetime.utcnow()
         tomorrow = now + timedelta(days=1)
-        
+
         # Get lessons scheduled for tomorrow
-        upcoming_lessons = db.query(models.Lesson).filter(
+        upcoming_lessons = db.query(models.Lesson).options(
+            joinedload(models.Lesson.teacher),
+            joinedload(models.Lesson.student)
+        ).filter(
             models.Lesson.scheduled_at.between(now, tomorrow),
             models.Lesson.status == "scheduled"
         ).all()
-        
-        reminder_count = 0
-        for lesson in upcoming_lessons:
-            send_lesson_reminder.delay(lesson.id)
-            reminder_count += 1
-        
-        return f"Queued {reminder_count} lesson reminders"
-    except Exception as e:
-        print(f"Error in send_lesson_reminders: {e}")
-        return f"Error: {e}"
-    finally:
-        db.close()
 
+        # Queue every reminder in one transaction; lessons already reminded are skipped
+        reminder_count = mailer.enqueue_emails(
+            db, [mailer.build_lesson_reminder(lesson) for lesson in upcoming_lessons]
+        )
 
-@celery_app.task
+    if reminder_count:
+        deliver_email_outbox.delay()
+
+    return f"Queued {reminder_count} lesson reminders"
+
+
+@task
 def cleanup_old_lessons():
-    """Mark old completed lessons for archival"""
-    db = get_db()
-    try:
-        # Mark lessons older than 90 days as archived
-        cutoff_date = datetime.utcnow() - timedelta(days=90)
-        
-        updated_count = db.query(models.Lesson).filter(
-            models.Lesson.scheduled_at < cutoff_date,
-            models.Lesson.status == "completed"
-        ).update({"status": "archived"})
-        
-        db.commit()
-        return f"Archived {updated_count} old lessons"
-    except Exception as e:
-        print(f"Error in cleanup_old_lessons: {e}")
-        db.rollback()
-        return f"Error: {e}"
-    finally:
-        db.close()
+    """Move old completed lessons into the lessons_archive table"""
+    with task_session() as db:
+        archived_count = crud.archive_old_lessons(
+            db, older_than_days=LESSON_ARCHIVE_AFTER_DAYS, batch_size=LESSON_ARCHIVE_BATCH_SIZE
+        )
+    return f"Archived {archived_count} old lessons"
+
 
+@task
+def prune_change_log():
+    """Drop delta sync change log rows past their retention"""
+    with task_session() as db:
+        pruned = changes.prune(db)
+    return f"Pruned {pruned} change log entries"
 
-@celery_app.task
+
+@task
 def send_welcome_email(user_id: int):
     """Send welcome email to new user"""
-    db = get_db()
-    try:
+    with task_session() as db:
         user = crud.get_user(db, user_id)
         if user:
-            # TODO: Implement email sending logic
-            print(f"Welcome email sent to {user.email}")
-            return f"Welcome email sent to user {user_id}"
-    except Exception as e:
-        print(f"Error sending welcome email to user {user_id}: {e}")
-        return f"Error: {e}"
-    finally:
-        db.close()
+            mailer.enqueue_email(db, **mailer.build_welcome_email(user))
+            deliver_email_outbox.delay()
+            return f"Welcome email queued for user {user_id}"
+
+
+@task
+def deliver_email_outbox():
+    """Send due messages from the email outbox"""
+    with task_session() as db:
+        totals = mailer.deliver_outbox(db)
+    return (f"Sent {totals['sent']} emails, {totals['retried']} to retry, "
+            f"{totals['failed']} failed")
+
+
+@task
+def backup_database():
+    """Take the daily automatic backup; older automatic backups are pruned"""
+    manifest = backup.create_backup("Daily backup", backup_type="automatic")
+    return (f"Backup {manifest['id']} written: {manifest['size']} bytes "
+            f"at {manifest['throughput_mb_s']} MB/s")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,59 @@
+"""
+Optimistic concurrency for lessons and users
+
+Lesson and User carry a version_id column (SQLAlchemy version_id_col) that
+every update increments. Single-resource responses send it as a strong
+ETag. A client that echoes it in If-Match on PUT only overwrites the version
+it last saw: the version goes into the guarded UPDATE's WHERE clause, so no
+row is locked, and a stale If-Match gets 412 Precondition Failed. PUTs
+without If-Match keep last-write-wins.
+"""
+
+from typing import Any, List, Optional
+
+from fastapi import HTTPException, Request, Response, status
+
+
+def version_etag(version_id: int) -> str:
+    return f'"{version_id}"'
+
+
+def if_match_versions(request: Request) -> Optional[List[int]]:
+    """Versions named by If-Match; None when the header is absent or "*" (any version)"""
+    header = request.headers.get("if-match")
+    if not header:
+        return None
+    versions = []
+    for tag in (tag.strip() for tag in header.split(",")):
+        if tag == "*":
+            return None
+        if tag.startswith("W/"):
+            continue  # If-Match uses strong comparison; weak tags never match
+        try:
+            versions.append(int(tag.strip('"')))
+        except ValueError:
+            continue  # Not one of ours, so it cannot match
+    return versions
+
+
+def version_conditions(model: Any, versions: Optional[List[int]]) -> list:
+    """WHERE clause for a guarded update honouring If-Match"""
+    return [] if versions is None else [model.version_id.in_(versions)]
+
+
+def precondition_failed(instance: Any) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="Modified since it was fetched; reload it and retry",
+        headers={"ETag": version_etag(instance.version_id)}
+    )
+
+
+def check_version(instance: Any, versions: Optional[List[int]]) -> None:
+    """Raise 412 if instance is not at a version If-Match asked for"""
+    if versions is not None and instance.version_id not in versions:
+        raise precondition_failed(instance)
+
+
+def set_etag(response: Response, instance: Any) -> None:
+    response.headers["ETag"] = version_etag(instance.version_id)
@@ -5,6 +5,10 @@ case "$1" in
         echo "Starting Music U Scheduler services..."
         ./start-all.sh
         ;;
+    start-production)
+        echo "Starting Music U Scheduler backend (production profile)..."
+        ./start-production.sh
+        ;;
     stop)
         echo "Stopping Music U Scheduler services..."
         pkill -f "uvicorn.*main:app" || true
@@ -32,7 +36,7 @@ case "$1" in
         fi
         ;;
     *)
-        echo "Usage: $0 {start|stop|restart|status}"
+        echo "Usage: $0 {start|start-production|stop|restart|status}"
         exit 1
         ;;
 esac
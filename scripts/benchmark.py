@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark the key API endpoints against a synthetic dataset
+
+Seeds a database (a temporary SQLite file unless --database is given) with
+app.datagen, then writes p50/p95/p99 latency and queries-per-request for
+each endpoint as JSON. Pass --compare with an earlier result to exit
+non-zero on regressions.
+
+    python scripts/benchmark.py --lessons 500000 --output bench.json
+    python scripts/benchmark.py --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app import benchmark, datagen, models
+from app.main import app
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lessons", type=int, default=500000)
+    parser.add_argument("--students", type=int, help="Default: enough for --lessons")
+    parser.add_argument("--requests", type=int, default=100, help="Timed requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed requests per endpoint")
+    parser.add_argument("--database", help="Database URL; reused as-is if it already has data")
+    parser.add_argument("--output", help="Write results here instead of stdout")
+    parser.add_argument("--compare", help="Earlier result file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 slowdown (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    temp_dir = None
+    database_url = args.database
+    if database_url is None:
+        temp_dir = tempfile.TemporaryDirectory()
+        database_url = f"sqlite:///{os.path.join(temp_dir.name, 'benchmark.db')}"
+
+    connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
+    engine = create_engine(database_url, connect_args=connect_args)
+    try:
+        models.Base.metadata.create_all(bind=engine)
+        with engine.connect() as conn:
+            existing_lessons = conn.execute(select(func.count(models.Lesson.id))).scalar()
+        if existing_lessons:
+            with engine.connect() as conn:
+                dataset = {"users": conn.execute(select(func.count(models.User.id))).scalar(),
+                           "lessons": existing_lessons}
+            print(f"Reusing existing dataset: {dataset}", file=sys.stderr)
+        else:
+            started = time.perf_counter()
+            dataset = datagen.generate(engine, lessons=args.lessons, students=args.students, create_schema=False)
+            print(f"Seeded {dataset} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        dataset["database"] = engine.dialect.name
+
+        results = benchmark.run_benchmark(app, sessionmaker(bind=engine), requests=args.requests,
+                                          warmup=args.warmup, dataset=dataset)
+    finally:
+        engine.dispose()
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = benchmark.compare(json.load(f), results, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
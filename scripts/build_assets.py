@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Build fingerprinted, precompressed static assets for production.
+
+    python scripts/build_assets.py                  # static/ -> static/dist/
+    python scripts/build_assets.py --static-dir path/to/static
+
+See app/assets.py for how the output is served.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from app
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app import assets
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--static-dir", default=assets.STATIC_DIR, help="Directory holding the source assets")
+    args = parser.parse_args()
+
+    manifest = assets.build_assets(args.static_dir)
+    for source, hashed in sorted(manifest.items()):
+        print(f"{source} -> {assets.DIST_DIR}/{hashed}")
+    if assets.brotli is None:
+        print("brotli is not installed; only gzip variants were written")
+    print(f"Built {len(manifest)} assets")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+#!/bin/bash
+# Production backend: several uvicorn workers, no autoreload.
+# Each worker keeps its own caches; writes are broadcast between workers
+# (PostgreSQL LISTEN/NOTIFY, or the cache_invalidations table on SQLite).
+cd "$(dirname "$0")"
+source music-u-env/bin/activate
+
+WORKERS="${WEB_CONCURRENCY:-$(( $(nproc) * 2 + 1 ))}"
+PORT="${PORT:-8080}"
+# One log directory per worker process, so workers never rotate the same file
+export LOG_DIR="${LOG_DIR:-logs/worker-{pid\}}"
+
+# Fingerprint and precompress static assets before the workers load the manifest
+python scripts/build_assets.py
+
+echo "Starting Music U Scheduler backend with $WORKERS workers on port $PORT"
+exec uvicorn app.main:app \
+    --host 0.0.0.0 \
+    --port "$PORT" \
+    --workers "$WORKERS" \
+    --proxy-headers \
+    --no-access-log \
+    --timeout-keep-alive 15
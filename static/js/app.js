@@ -18,6 +18,11 @@ function initializeApp() {
         });
     }
 
+    // Dashboard widgets refresh when a lesson changes instead of polling
+    if (authToken && document.querySelector('[hx-trigger^="lesson-changed"]')) {
+        subscribeLessonEvents();
+    }
+
     // Initialize tooltips
     var tooltipTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="tooltip"]'));
     var tooltipList = tooltipTriggerList.map(function (tooltipTriggerEl) {
@@ -61,6 +66,26 @@ function logout() {
     window.location.href = '/auth/login';
 }
 
+// Live lesson updates: widgets listen for "lesson-changed" on the body
+function subscribeLessonEvents() {
+    const source = new EventSource(`/lessons/events?access_token=${encodeURIComponent(authToken)}`);
+    const refresh = () => htmx.trigger(document.body, 'lesson-changed');
+    ['lesson.created', 'lesson.updated', 'lesson.deleted'].forEach(type => source.addEventListener(type, refresh));
+
+    // Events were dropped for this client; start again from the server's view
+    source.addEventListener('resync', () => window.location.reload());
+
+    // EventSource reconnects by itself; catch up on anything missed while it was down
+    let connected = false;
+    source.addEventListener('open', () => {
+        if (connected) {
+            refresh();
+        }
+        connected = true;
+    });
+    return source;
+}
+
 // API helper functions
 function apiCall(url, options = {}) {
     const defaultOptions = {
@@ -257,6 +282,7 @@ window.MusicUScheduler = {
     updateLesson,
     deleteLesson,
     markLessonCompleted,
+    subscribeLessonEvents,
     showAlert,
     formatDate,
     formatTime,
@@ -0,0 +1,40 @@
+"""
+Shared fixtures for the Music U Lesson Scheduler test suite
+"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import cache, query_budget
+from app.database import Base
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Cached values must not leak between tests that use different databases"""
+    cache.invalidate_all_local()
+    yield
+    cache.invalidate_all_local()
+
+
+@pytest.fixture(autouse=True)
+def strict_query_budgets(monkeypatch):
+    """Fail any test whose request breaks its query budget or repeats a statement shape"""
+    monkeypatch.setattr(query_budget, "STRICT", True)
+
+
+@pytest.fixture
+def db():
+    """Session on a private in-memory SQLite database with the full schema"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
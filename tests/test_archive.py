@@ -0,0 +1,92 @@
+"""
+Tests for chunked archival of historical lessons
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from app import crud, models
+
+
+def _user(db, username, role):
+    user = models.User(
+        email=f"{username}@example.com", username=username, full_name=username.title(),
+        hashed_password="x", role=role, is_teacher=role == models.UserRole.INSTRUCTOR
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _lessons(db, teacher, student, count, days_ago, status, cost=50.0):
+    db.add_all([
+        models.Lesson(
+            title=f"Lesson {i}", teacher_id=teacher.id, student_id=student.id,
+            scheduled_at=datetime.utcnow() - timedelta(days=days_ago, minutes=i),
+            status=status, instrument="Piano", cost=cost
+        )
+        for i in range(count)
+    ])
+    db.commit()
+
+
+def test_archive_moves_only_old_completed_lessons_in_chunks(db):
+    teacher = _user(db, "teacher", models.UserRole.INSTRUCTOR)
+    student = _user(db, "student", models.UserRole.STUDENT)
+    _lessons(db, teacher, student, 25, days_ago=120, status=models.LessonStatus.COMPLETED)
+    _lessons(db, teacher, student, 3, days_ago=120, status=models.LessonStatus.CANCELLED)
+    _lessons(db, teacher, student, 4, days_ago=10, status=models.LessonStatus.COMPLETED)
+
+    assert crud.archive_old_lessons(db, older_than_days=90, batch_size=10) == 25
+    assert db.query(models.Lesson).count() == 7
+    assert db.query(models.LessonArchive).count() == 25
+
+    archived = db.query(models.LessonArchive).first()
+    assert archived.status == models.LessonStatus.COMPLETED
+    assert archived.teacher_id == teacher.id
+    assert archived.archived_at is not None
+
+    # A second run finds nothing left to move
+    assert crud.archive_old_lessons(db, older_than_days=90, batch_size=10) == 0
+
+
+def test_lesson_report_reads_archive_on_request(db):
+    teacher = _user(db, "teacher", models.UserRole.INSTRUCTOR)
+    student = _user(db, "student", models.UserRole.STUDENT)
+    _lessons(db, teacher, student, 5, days_ago=120, status=models.LessonStatus.COMPLETED)
+    _lessons(db, teacher, student, 2, days_ago=100, status=models.LessonStatus.CANCELLED)
+    crud.archive_old_lessons(db, older_than_days=90)
+
+    date_from = datetime.utcnow() - timedelta(days=365)
+    date_to = datetime.utcnow()
+
+    hot = crud.get_lesson_report(db, date_from, date_to)
+    assert hot["total_lessons"] == 2
+    assert hot["completed_lessons"] == 0
+
+    full = crud.get_lesson_report(db, date_from, date_to, include_archived=True)
+    assert full["total_lessons"] == 7
+    assert full["completed_lessons"] == 5
+    assert full["cancelled_lessons"] == 2
+    assert full["revenue"] == 250.0
+    assert full["popular_instruments"] == {"Piano": 7}
+    assert full["instructor_stats"]["Teacher"] == {
+        "total_lessons": 7, "completed_lessons": 5, "revenue": 250.0
+    }
+
+
+def test_reused_lesson_ids_archive_again(db):
+    teacher = _user(db, "teacher", models.UserRole.INSTRUCTOR)
+    student = _user(db, "student", models.UserRole.STUDENT)
+    _lessons(db, teacher, student, 1, days_ago=10, status=models.LessonStatus.COMPLETED)
+    _lessons(db, teacher, student, 1, days_ago=120, status=models.LessonStatus.COMPLETED)
+    highest = db.query(func.max(models.Lesson.id)).scalar()
+    assert crud.archive_old_lessons(db, older_than_days=90) == 1
+
+    # SQLite gives the next lesson the archived lesson's id again
+    _lessons(db, teacher, student, 1, days_ago=120, status=models.LessonStatus.COMPLETED)
+    assert db.query(func.max(models.Lesson.id)).scalar() == highest
+    assert crud.archive_old_lessons(db, older_than_days=90) == 1
+
+    assert db.query(models.LessonArchive).filter_by(lesson_id=highest).count() == 2
@@ -0,0 +1,76 @@
+"""
+Tests for fingerprinted, precompressed static assets
+"""
+
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import assets
+
+STYLE = b"body { color: #333; }\n" * 100
+
+
+@pytest.fixture
+def static_dir(tmp_path, monkeypatch):
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "style.css").write_bytes(STYLE)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG" + b"\x00" * 1000)
+    monkeypatch.setattr(assets, "_manifest", None)
+    return tmp_path
+
+
+@pytest.fixture
+def client(static_dir):
+    app = FastAPI()
+    app.mount("/static", assets.StaticAssets(directory=str(static_dir)), name="static")
+    return TestClient(app)
+
+
+def test_build_fingerprints_and_precompresses(static_dir):
+    manifest = assets.build_assets(str(static_dir))
+
+    hashed = manifest["css/style.css"]
+    assert hashed.startswith("css/style.") and hashed.endswith(".css") and hashed != "css/style.css"
+    dist = static_dir / "dist"
+    assert (dist / hashed).read_bytes() == STYLE
+    assert gzip.decompress((dist / (hashed + ".gz")).read_bytes()) == STYLE
+    assert not (dist / (manifest["logo.png"] + ".gz")).exists()  # Already compressed
+    assert assets.build_assets(str(static_dir)) == manifest  # Same content, same names
+
+    (static_dir / "css" / "style.css").write_bytes(STYLE + b"a { color: red; }\n")
+    assert assets.build_assets(str(static_dir))["css/style.css"] != hashed
+    assert (dist / hashed).exists()  # Old build kept for pages still referencing it
+
+
+def test_static_url_uses_manifest_when_built(static_dir):
+    assets.load_manifest(str(static_dir))
+    assert assets.static_url("css/style.css") == "/static/css/style.css"
+
+    manifest = assets.build_assets(str(static_dir))
+    assets.load_manifest(str(static_dir))
+    assert assets.static_url("/css/style.css") == f"/static/dist/{manifest['css/style.css']}"
+    assert assets.static_url("js/missing.js") == "/static/js/missing.js"
+
+
+def test_fingerprinted_assets_are_precompressed_and_immutable(static_dir, client):
+    url = f"/static/dist/{assets.build_assets(str(static_dir))['css/style.css']}"
+
+    compressed = client.get(url, headers={"Accept-Encoding": "br;q=0, gzip"})
+    assert compressed.status_code == 200
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["content-type"].startswith("text/css")
+    assert compressed.headers["cache-control"] == assets.IMMUTABLE_CACHE_CONTROL
+    assert compressed.headers["vary"] == "Accept-Encoding"
+    assert int(compressed.headers["content-length"]) < len(STYLE)
+    assert compressed.content == STYLE  # The client decodes it
+
+    plain = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.content == STYLE
+
+    unversioned = client.get("/static/css/style.css")
+    assert unversioned.headers["cache-control"] == "no-cache"
+    assert client.get("/static/dist/css/missing.css").status_code == 404
@@ -0,0 +1,119 @@
+"""
+Tests for SQLite backup, retention and verified restore
+"""
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app import backup, cache, changes, models
+from app.database import Base
+
+
+@pytest.fixture
+def database(tmp_path):
+    url = f"sqlite:///{tmp_path / 'live.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE notes (id INTEGER PRIMARY KEY, body TEXT)"))
+        conn.execute(text("INSERT INTO notes (body) VALUES (:body)"),
+                     [{"body": f"note {i} " * 50} for i in range(2000)])
+    yield url, engine
+    engine.dispose()
+
+
+def _count(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM notes")).scalar()
+
+
+def test_backup_then_restore_round_trip(database, tmp_path):
+    url, engine = database
+    backup_dir = str(tmp_path / "backups")
+
+    manifest = backup.create_backup("before cleanup", database_url=url, backup_dir=backup_dir)
+    assert manifest["status"] == "completed"
+    assert manifest["size"] < manifest["raw_size"]
+    assert manifest["throughput_mb_s"] > 0
+    assert backup.list_backups(backup_dir) == [manifest]
+
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM notes WHERE id > 10"))
+    assert _count(engine) == 10
+
+    result = backup.restore_backup(manifest["id"], database_url=url, engine=engine, backup_dir=backup_dir)
+    assert result["id"] == manifest["id"]
+    assert _count(engine) == 2000
+
+
+def _log_change(db, resource_id):
+    changes.record(db, "lesson", resource_id, changes.UPDATE)
+    cache.publish(db, "settings")
+    db.commit()
+
+
+def test_restore_expires_lost_cursors_and_caches(database, tmp_path):
+    url, engine = database
+    backup_dir = str(tmp_path / "backups")
+    with Session(engine) as db:
+        for lesson_id in (1, 2):
+            _log_change(db, lesson_id)
+        manifest = backup.create_backup(database_url=url, backup_dir=backup_dir)
+        for lesson_id in (3, 4, 5):
+            _log_change(db, lesson_id)
+    settings = cache.get_cache("settings")
+    settings.set("school_name", "Before restore")
+
+    backup.restore_backup(manifest["id"], database_url=url, engine=engine, backup_dir=backup_dir)
+
+    assert settings.get("school_name") is None
+    with Session(engine) as db:
+        # Cursors 3-5 named changes the restore threw away
+        for lost in (3, 4, 5):
+            with pytest.raises(changes.CursorExpired):
+                changes.read_changes(db, lost, 100)
+        assert changes.read_changes(db, 2, 100) == ([], 6, False)
+        assert [c["resource_id"] for c in changes.read_changes(db, 1, 100)[0]] == [2]
+
+        # New ids continue past everything handed out before the restore
+        published = db.query(models.CacheInvalidation).filter(models.CacheInvalidation.id > 2).all()
+        assert min(row.id for row in published) == 6
+        assert ("settings", None) in [(row.namespace, row.key) for row in published]
+        _log_change(db, 7)
+        assert changes.read_changes(db, 6, 100)[0] == [
+            {"cursor": 7, "resource_type": "lesson", "resource_id": 7, "operation": changes.UPDATE}
+        ]
+
+
+def test_restore_rejects_corrupted_backup(database, tmp_path):
+    url, engine = database
+    backup_dir = str(tmp_path / "backups")
+    manifest = backup.create_backup(database_url=url, backup_dir=backup_dir)
+
+    with open(backup.backup_file_path(manifest, backup_dir), "r+b") as f:
+        f.seek(100)
+        f.write(b"corrupt")
+
+    with pytest.raises(backup.BackupError, match="Checksum mismatch"):
+        backup.restore_backup(manifest["id"], database_url=url, engine=engine, backup_dir=backup_dir)
+    assert _count(engine) == 2000
+
+
+def test_retention_keeps_newest_backups(database, tmp_path, monkeypatch):
+    url, _ = database
+    backup_dir = str(tmp_path / "backups")
+    monkeypatch.setattr(backup, "BACKUP_RETENTION", 2)
+
+    ids = [backup.create_backup(database_url=url, backup_dir=backup_dir)["id"] for _ in range(3)]
+    backup.create_backup(backup_type="automatic", database_url=url, backup_dir=backup_dir)
+
+    # Automatic backups are counted separately from manual ones
+    manual = [m["id"] for m in backup.list_backups(backup_dir) if m["type"] == "manual"]
+    assert manual == [ids[2], ids[1]]
+    assert len(backup.list_backups(backup_dir)) == 3
+
+
+def test_backup_ids_cannot_escape_backup_dir(tmp_path):
+    with pytest.raises(backup.BackupError):
+        backup.get_backup("../app", str(tmp_path))
@@ -0,0 +1,59 @@
+"""
+Tests for the admin batch-get endpoints
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import models
+from app.api.routers import admin
+from app.auth.utils import create_access_token
+from app.database import get_db
+from app.main import app
+
+
+@pytest.fixture
+def people(db):
+    users = [
+        models.User(username=name, email=f"{name}@example.com", full_name=name.title(), hashed_password="x",
+                    role=models.UserRole.ADMIN if name == "admin" else models.UserRole.STUDENT)
+        for name in ("admin", "teacher", "student")
+    ]
+    db.add_all(users)
+    db.flush()
+    db.add_all([models.Lesson(title=f"Lesson {n}", teacher_id=users[1].id, student_id=users[2].id,
+                              scheduled_at=datetime.utcnow() + timedelta(days=n)) for n in range(3)])
+    db.commit()
+    return users
+
+
+def _client(db, user, monkeypatch):
+    monkeypatch.setitem(app.dependency_overrides, get_db, lambda: db)
+    token = create_access_token({"sub": user.username})
+    return TestClient(app, headers={"Authorization": f"Bearer {token}"})
+
+
+def test_batch_get_returns_requested_order_in_one_query(db, people, monkeypatch):
+    client = _client(db, people[0], monkeypatch)
+    lessons = db.query(models.Lesson).order_by(models.Lesson.id).all()
+
+    response = client.get("/admin/lessons/batch", params={"ids": [lessons[2].id, 999, lessons[0].id, lessons[2].id]})
+    assert response.status_code == 200
+    assert int(response.headers["x-query-count"]) == 2  # Auth, then one IN query with the joins
+    assert [lesson["title"] for lesson in response.json()] == ["Lesson 2", "Lesson 0"]
+    assert response.json()[0]["teacher"]["username"] == "teacher"
+
+    users = client.get("/admin/users/batch", params={"ids": [people[2].id, people[1].id]})
+    assert [user["username"] for user in users.json()] == ["student", "teacher"]
+
+
+def test_batch_get_is_admin_only_and_bounded(db, people, monkeypatch):
+    client = _client(db, people[0], monkeypatch)
+    too_many = client.get("/admin/users/batch", params={"ids": list(range(admin.MAX_BATCH_IDS + 1))})
+    assert too_many.status_code == 400
+    assert client.get("/admin/users/batch").json() == []
+
+    student = _client(db, people[2], monkeypatch)
+    assert student.get("/admin/lessons/batch", params={"ids": [1]}).status_code == 403
@@ -0,0 +1,44 @@
+"""
+Tests for the endpoint benchmark suite
+"""
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import benchmark, datagen
+from app.auth.utils import get_pwd_context
+from app.database import get_db
+from app.main import app
+
+
+def _seeded_sessions(tmp_path, lessons=400):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bench.db'}", connect_args={"check_same_thread": False})
+    # bcrypt at its lowest cost keeps the test fast; login still verifies it for real
+    hashed = get_pwd_context().hash(datagen.DEFAULT_PASSWORD, rounds=4)
+    dataset = datagen.generate(engine, lessons=lessons, hashed_password=hashed)
+    return engine, sessionmaker(bind=engine), dataset
+
+
+def test_benchmark_reports_percentiles_and_queries(tmp_path):
+    engine, Session, dataset = _seeded_sessions(tmp_path)
+    try:
+        results = benchmark.run_benchmark(app, Session, requests=5, warmup=1, dataset=dataset)
+    finally:
+        engine.dispose()
+
+    assert set(results["endpoints"]) == {endpoint.name for endpoint in benchmark.ENDPOINTS}
+    for name, result in results["endpoints"].items():
+        assert result["errors"] == 0, name
+        assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"] <= result["max_ms"]
+        assert result["queries_per_request"] >= 1, name
+    assert results["dataset"]["lessons"] == 400
+    assert get_db not in app.dependency_overrides
+
+
+def test_compare_flags_slowdowns_and_extra_queries():
+    baseline = {"endpoints": {"search": {"p95_ms": 10.0, "queries_per_request": 2, "errors": 0}}}
+    current = {"endpoints": {"search": {"p95_ms": 15.0, "queries_per_request": 3, "errors": 0}}}
+
+    assert benchmark.compare(baseline, baseline) == []
+    assert len(benchmark.compare(baseline, current)) == 2
+    assert benchmark.percentile([5, 1, 3, 2, 4], 50) == 3
@@ -0,0 +1,77 @@
+"""
+Tests for bulk lesson status transitions
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import models
+from app.auth.utils import create_access_token
+from app.database import get_db
+from app.main import app
+
+
+@pytest.fixture
+def lessons(db):
+    teacher = models.User(username="teacher", email="teacher@example.com", full_name="Tina Teacher",
+                          hashed_password="x", role=models.UserRole.INSTRUCTOR, is_teacher=True)
+    other = models.User(username="other", email="other@example.com", full_name="Oscar Other",
+                        hashed_password="x", role=models.UserRole.INSTRUCTOR, is_teacher=True)
+    student = models.User(username="student", email="student@example.com", full_name="Sam Student",
+                          hashed_password="x")
+    db.add_all([teacher, other, student])
+    db.flush()
+    lessons = [models.Lesson(title=f"Lesson {n}", teacher_id=teacher.id, student_id=student.id,
+                             scheduled_at=datetime.utcnow() + timedelta(days=n)) for n in range(4)]
+    lessons.append(models.Lesson(title="Not mine", teacher_id=other.id, student_id=student.id,
+                                 scheduled_at=datetime.utcnow()))
+    db.add_all(lessons)
+    db.commit()
+    return lessons
+
+
+@pytest.fixture
+def client(db, lessons, monkeypatch):
+    monkeypatch.setitem(app.dependency_overrides, get_db, lambda: db)
+    token = create_access_token({"sub": "teacher"})
+    return TestClient(app, headers={"Authorization": f"Bearer {token}"})
+
+
+def _statuses(db):
+    db.expire_all()
+    return {lesson.title: lesson.status for lesson in db.query(models.Lesson)}
+
+
+def test_bulk_complete_updates_and_audits_in_one_transaction(db, client, lessons):
+    ids = [lesson.id for lesson in lessons[:3]]
+    response = client.put("/instructor/lessons/bulk/complete", json={"lesson_ids": ids, "notes": "Great week"})
+
+    assert response.status_code == 200, response.text
+    assert response.json()["lesson_ids"] == ids
+    assert int(response.headers["x-query-count"]) <= 6
+    statuses = _statuses(db)
+    assert [statuses[f"Lesson {n}"] for n in range(4)] == [models.LessonStatus.COMPLETED] * 3 + \
+        [models.LessonStatus.SCHEDULED]
+    assert db.query(models.Lesson).get(ids[0]).notes == "Great week"
+    audits = db.query(models.AuditLog).filter(models.AuditLog.action == "COMPLETE").all()
+    assert sorted(audit.resource_id for audit in audits) == sorted(ids)
+
+
+def test_bulk_cancel_rejects_the_whole_set(db, client, lessons):
+    mine, not_mine = lessons[0].id, lessons[4].id
+    response = client.put("/instructor/lessons/bulk/cancel", json={"lesson_ids": [mine, not_mine], "reason": "Ill"})
+    assert response.status_code == 403
+    assert response.json()["detail"]["lesson_ids"] == [not_mine]
+
+    assert client.put("/instructor/lessons/bulk/cancel",
+                      json={"lesson_ids": [mine, 9999], "reason": "Ill"}).status_code == 404
+    assert _statuses(db)["Lesson 0"] == models.LessonStatus.SCHEDULED
+
+    assert client.put("/instructor/lessons/bulk/cancel", json={"lesson_ids": [mine], "reason": "Ill"}).status_code == 200
+    again = client.put("/instructor/lessons/bulk/cancel", json={"lesson_ids": [mine, lessons[1].id], "reason": "Ill"})
+    assert again.status_code == 400
+    assert again.json()["detail"]["lesson_ids"] == [mine]
+    assert _statuses(db)["Lesson 1"] == models.LessonStatus.SCHEDULED
+    assert db.query(models.Lesson).get(mine).instructor_notes == "Cancelled by instructor: Ill"
@@ -0,0 +1,112 @@
+"""
+Tests for worker-local caches and cross-worker invalidation
+"""
+
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import cache, crud, models, schemas
+from app.database import Base
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_local_cache_expires_and_loads_once():
+    settings = cache.LocalCache("test", ttl=0.05)
+    loads = []
+    assert settings.get_or_load("k", lambda: loads.append(1) or "v") == "v"
+    assert settings.get_or_load("k", lambda: loads.append(1) or "v") == "v"
+    assert loads == [1]
+    time.sleep(0.06)
+    assert settings.get("k") is None
+
+
+def test_invalidation_applies_on_commit_only(db):
+    settings = cache.get_cache("settings")
+    settings.set("email", {"smtp_host": "old"})
+
+    cache.publish(db, "settings")
+    db.rollback()
+    assert settings.get("email") == {"smtp_host": "old"}
+
+    crud.create_system_setting(db, schemas.SystemSettingsCreate(key="email.smtp_host", value="new"))
+    assert settings.get("email") is None
+    # Other workers learn about it from the feed written in the same transaction
+    assert db.query(models.CacheInvalidation.namespace).all() == [("settings",)]
+
+
+def test_sqlite_listener_picks_up_other_workers_writes(tmp_path):
+    url = f"sqlite:///{tmp_path / 'shared.db'}"
+    this_worker = create_engine(url, connect_args={"check_same_thread": False})
+    other_worker = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=this_worker)
+
+    users = cache.get_cache("users")
+    users.set("7", "cached principal")
+    users.set("8", "untouched")
+    listener = cache.InvalidationListener(this_worker, poll_interval=0.02)
+    listener.start()
+    try:
+        # The listener starts from a clean slate; repopulate after it is up
+        assert _wait_for(lambda: users.get("7") is None)
+        users.set("7", "cached principal")
+        users.set("8", "untouched")
+
+        db = sessionmaker(bind=other_worker)()
+        db.add(models.CacheInvalidation(namespace="users", key="7"))
+        db.commit()
+        db.close()
+
+        assert _wait_for(lambda: users.get("7") is None)
+        assert users.get("8") == "untouched"
+    finally:
+        listener.stop()
+        this_worker.dispose()
+        other_worker.dispose()
+
+
+def test_sqlite_listener_survives_pruned_and_restarted_ids(tmp_path):
+    url = f"sqlite:///{tmp_path / 'shared.db'}"
+    this_worker = create_engine(url, connect_args={"check_same_thread": False})
+    other_worker = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=this_worker)
+    users = cache.get_cache("users")
+    listener = cache.InvalidationListener(this_worker, poll_interval=0.02)
+    listener.start()
+
+    def publish(key):
+        users.set(key, "cached principal")
+        db = sessionmaker(bind=other_worker)()
+        db.add(models.CacheInvalidation(namespace="users", key=key))
+        db.commit()
+        db.close()
+        return _wait_for(lambda: users.get(key) is None)
+
+    try:
+        assert _wait_for(lambda: users.get("1") is None)
+        assert publish("1") and publish("2")
+
+        # A quiet hour: the prune empties the table, then a write comes in
+        with other_worker.begin() as conn:
+            conn.exec_driver_sql("DELETE FROM cache_invalidations")
+        assert publish("3")
+
+        # A restore rewinds the ids themselves
+        with other_worker.begin() as conn:
+            conn.exec_driver_sql("DELETE FROM cache_invalidations")
+            conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'cache_invalidations'")
+        assert publish("4")
+        assert publish("5")
+    finally:
+        listener.stop()
+        this_worker.dispose()
+        other_worker.dispose()
@@ -0,0 +1,117 @@
+"""
+Tests for the lesson change log and delta sync feed
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import changes, crud, models, schemas
+from app.auth.utils import create_access_token
+from app.database import get_db
+from app.main import app
+
+
+@pytest.fixture
+def teacher(db):
+    teacher = models.User(username="teacher", email="teacher@example.com", full_name="Tina Teacher",
+                          hashed_password="x", role=models.UserRole.INSTRUCTOR, is_teacher=True)
+    db.add(teacher)
+    db.commit()
+    return teacher
+
+
+@pytest.fixture
+def student(db, teacher):
+    return crud.create_user(db, schemas.UserCreate(
+        username="student", email="student@example.com", full_name="Sam Student", password="secret123"
+    ))
+
+
+@pytest.fixture
+def client(db, teacher, monkeypatch):
+    monkeypatch.setitem(app.dependency_overrides, get_db, lambda: db)
+    token = create_access_token({"sub": teacher.username})
+    return TestClient(app, headers={"Authorization": f"Bearer {token}"})
+
+
+def _create_lesson(db, teacher, student, title):
+    return crud.create_lesson(db, schemas.LessonCreate(
+        title=title, teacher_id=teacher.id, student_id=student.id,
+        scheduled_at=datetime.utcnow() + timedelta(days=1)
+    ))
+
+
+def _feed(client, since, **params):
+    response = client.get("/lessons/changes", params={"since": since, **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_change_log_is_written_with_the_transaction(db, teacher, student):
+    lesson = _create_lesson(db, teacher, student, "Piano")
+
+    crud.update_lesson(db, lesson.id, schemas.LessonUpdate(title="Grand piano"))
+    changes.record(db, "lesson", lesson.id, changes.UPDATE)
+    db.rollback()
+
+    rows = [(row.resource_type, row.resource_id, row.operation)
+            for row in db.query(models.ChangeLogEntry).order_by(models.ChangeLogEntry.id)]
+    assert rows == [("user", student.id, "insert"), ("lesson", lesson.id, "insert"),
+                    ("lesson", lesson.id, "update")]
+
+
+def test_feed_returns_only_changes_after_cursor(db, client, teacher, student):
+    start = client.get("/lessons/changes").json()
+    assert start == {"changes": [], "cursor": 1, "has_more": False}
+
+    piano = _create_lesson(db, teacher, student, "Piano")
+    violin = _create_lesson(db, teacher, student, "Violin")
+    crud.update_lesson(db, piano.id, schemas.LessonUpdate(title="Grand piano"))
+    crud.delete_lesson(db, violin.id)
+
+    response = client.get("/lessons/changes", params={"since": start["cursor"]})
+    assert int(response.headers["x-query-count"]) <= 5
+    feed = response.json()
+    assert [(c["resource_id"], c["operation"]) for c in feed["changes"]] == \
+        [(piano.id, "insert"), (violin.id, "delete")]
+    assert feed["changes"][0]["lesson"]["title"] == "Grand piano"
+    assert feed["changes"][0]["lesson"]["student"]["full_name"] == "Sam Student"
+    assert feed["changes"][1]["lesson"] is None  # Tombstone
+    assert _feed(client, feed["cursor"]) == {"changes": [], "cursor": feed["cursor"], "has_more": False}
+
+    crud.update_user(db, student.id, schemas.UserUpdate(full_name="Samantha Student"))
+    renamed = _feed(client, feed["cursor"])["changes"]
+    assert [(c["resource_type"], c["operation"], c["user"]["full_name"]) for c in renamed] == \
+        [("user", "update", "Samantha Student")]
+
+
+def test_feed_pages_with_has_more(db, client, teacher, student):
+    for n in range(5):
+        _create_lesson(db, teacher, student, f"Lesson {n}")
+
+    first = _feed(client, 1, limit=3)
+    assert first["has_more"] and len(first["changes"]) == 3
+    second = _feed(client, first["cursor"], limit=3)
+    assert not second["has_more"]
+    assert [c["lesson"]["title"] for c in first["changes"] + second["changes"]] == \
+        [f"Lesson {n}" for n in range(5)]
+
+
+def test_expired_cursor_is_gone(db, client, teacher, student):
+    for n in range(3):
+        _create_lesson(db, teacher, student, f"Lesson {n}")
+    db.query(models.ChangeLogEntry).update({"changed_at": datetime.utcnow() - timedelta(days=60)})
+    db.commit()
+
+    assert changes.prune(db) == 3  # The newest row is kept
+    assert client.get("/lessons/changes", params={"since": 1}).status_code == 410
+    assert client.get("/lessons/changes", params={"since": 99}).status_code == 410  # Past the log
+    assert [c["lesson"]["title"] for c in _feed(client, 3)["changes"]] == ["Lesson 2"]
+
+
+def test_students_cannot_read_the_feed(db, client, student):
+    token = create_access_token({"sub": student.username})
+    response = client.get("/lessons/changes", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 403
@@ -13,7 +13,7 @@ import time
 # Add the parent directory to the path so we can import from app
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
-from app.database import SessionLocal, Base, engine
+from app.database import SessionLocal, Base, check_schema, engine
 from app.models import User, Lesson
 import hashlib
 
@@ -21,6 +21,12 @@ def hash_password(password: str) -> str:
     """Simple password hashing function for testing"""
     return hashlib.sha256(password.encode()).hexdigest()
 
+@pytest.fixture(scope="module", autouse=True)
+def migrated_database():
+    """Upgrade the development database the way application startup does"""
+    check_schema(engine)
+
+
 @pytest.fixture
 def db_session():
     """Create a fresh database session for each test"""
@@ -0,0 +1,78 @@
+"""
+Tests for the synthetic school generator
+"""
+
+import pytest
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from app import datagen, models
+from app.database import Base
+
+PRECOMPUTED_HASH = "$2b$04$0123456789012345678901uXh8bVsLwQ5yPj8S8p2vAjCVNi2Mf1e"
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'school.db'}")
+    yield engine
+    engine.dispose()
+
+
+def test_generates_exact_lesson_count_with_realistic_shape(engine):
+    counts = datagen.generate(engine, lessons=3000, hashed_password=PRECOMPUTED_HASH)
+    db = sessionmaker(bind=engine)()
+    try:
+        assert db.query(func.count(models.Lesson.id)).scalar() == counts["lessons"] == 3000
+        assert db.query(func.count(models.User.id)).scalar() == counts["users"]
+        assert db.query(models.User).filter_by(username="admin").one().role == models.UserRole.ADMIN
+
+        # Every lesson is taught by an instructor specialised in its instrument
+        for instrument, specializations in db.query(models.Lesson.instrument, models.User.specializations) \
+                .join(models.User, models.Lesson.teacher_id == models.User.id).distinct():
+            assert instrument.lower() in specializations.split(",")
+        assert db.query(models.InstructorSpecialization).count() == counts["instructor_specializations"] > 0
+
+        statuses = dict(db.query(models.Lesson.status, func.count()).group_by(models.Lesson.status).all())
+        assert statuses[models.LessonStatus.COMPLETED] > statuses[models.LessonStatus.CANCELLED] > 0
+        assert statuses[models.LessonStatus.SCHEDULED] > 0
+
+        cancels = db.query(models.AuditLog).filter_by(action="CANCEL").count()
+        assert cancels == statuses[models.LessonStatus.CANCELLED]
+        assert db.get(models.Lesson, db.query(models.AuditLog.resource_id).filter_by(action="CANCEL")
+                      .first()[0]).status == models.LessonStatus.CANCELLED
+        assert db.query(models.User.hashed_password).distinct().all() == [(PRECOMPUTED_HASH,)]
+    finally:
+        db.close()
+
+
+def test_audit_rows_follow_lesson_ids_with_gaps(engine):
+    # Every 100th lesson id jumps ahead, as a PostgreSQL sequence may after a rollback or cache loss
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TRIGGER skip_ids AFTER INSERT ON lessons WHEN NEW.id % 100 = 0 "
+                             "BEGIN UPDATE lessons SET id = NEW.id + 50 WHERE id = NEW.id; END")
+
+    datagen.generate(engine, lessons=1000, hashed_password=PRECOMPUTED_HASH)
+    db = sessionmaker(bind=engine)()
+    try:
+        assert db.query(func.max(models.Lesson.id)).scalar() > 1000
+        logged = db.query(models.AuditLog.action, models.Lesson.status).join(
+            models.Lesson, models.Lesson.id == models.AuditLog.resource_id, isouter=True
+        ).all()
+        assert None not in {status for _, status in logged}  # Every audit row names a real lesson
+        assert {status for action, status in logged if action == "CANCEL"} == {models.LessonStatus.CANCELLED}
+    finally:
+        db.close()
+
+
+def test_refuses_to_fill_a_database_with_users(engine):
+    datagen.generate(engine, lessons=50, hashed_password=PRECOMPUTED_HASH)
+    with pytest.raises(ValueError):
+        datagen.generate(engine, lessons=50, hashed_password=PRECOMPUTED_HASH)
+
+
+def test_copy_format_matches_postgres_csv():
+    assert datagen._copy_value(models.LessonStatus.CANCELLED) == "CANCELLED"
+    assert datagen._copy_value(True) == "t"
+    assert datagen._copy_value(None) == ""
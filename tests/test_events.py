@@ -0,0 +1,145 @@
+"""
+Tests for live lesson events (Server-Sent Events)
+"""
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import crud, events, models, schemas
+from app.api.routers import events as events_router
+from app.auth.dependencies import get_event_stream_user
+from app.database import get_db
+
+
+@pytest.fixture
+def people(db):
+    users = {
+        name: models.User(username=name, email=f"{name}@example.com", full_name=name.title(),
+                          hashed_password="x", role=role)
+        for name, role in (("admin", models.UserRole.ADMIN), ("teacher", models.UserRole.INSTRUCTOR),
+                           ("student", models.UserRole.STUDENT), ("other", models.UserRole.STUDENT))
+    }
+    db.add_all(users.values())
+    db.commit()
+    return users
+
+
+def _event(teacher_id=1, student_id=2, event_id="e1"):
+    return {"id": event_id, "type": "lesson.created", "lesson_id": 9,
+            "teacher_id": teacher_id, "student_id": student_id}
+
+
+def _drain(subscriber):
+    items = []
+    while not subscriber.queue.empty():
+        items.append(subscriber.queue.get_nowait())
+    return items
+
+
+def test_events_reach_only_participants_and_admins():
+    async def scenario():
+        broker = events.LessonEventBroker()
+        teacher, student = broker.subscribe(1), broker.subscribe(2)
+        other, admin = broker.subscribe(3), broker.subscribe(4, is_admin=True)
+
+        broker.dispatch(_event())
+        broker.dispatch(_event())  # Workers hear their own broadcasts too
+        return [len(_drain(s)) for s in (teacher, student, other, admin)]
+
+    assert asyncio.run(scenario()) == [1, 1, 0, 1]
+
+
+def test_slow_subscriber_gets_resync_instead_of_backlog():
+    async def scenario():
+        broker = events.LessonEventBroker()
+        subscriber = broker.subscribe(1)
+        for n in range(events.EVENTS_QUEUE_SIZE + 5):
+            broker.dispatch(_event(event_id=f"e{n}"))
+        return _drain(subscriber)
+
+    queued = asyncio.run(scenario())
+    assert queued[0] == events.RESYNC
+    assert len(queued) == 5
+
+
+def test_worker_refuses_subscribers_beyond_limit():
+    async def scenario():
+        broker = events.LessonEventBroker(max_subscribers=1)
+        first = broker.subscribe(1)
+        refused = broker.subscribe(2)
+        broker.unsubscribe(first)
+        return refused, broker.subscribe(2)
+
+    refused, accepted = asyncio.run(scenario())
+    assert refused is None and accepted is not None
+
+
+def test_lesson_writes_publish_events_on_commit(db, people):
+    teacher, student, other = people["teacher"], people["student"], people["other"]
+
+    async def scenario():
+        subscriber = events.broker.subscribe(student.id)
+        bystander = events.broker.subscribe(other.id)
+        try:
+            lesson = crud.create_lesson(db, schemas.LessonCreate(
+                title="Piano", teacher_id=teacher.id, student_id=student.id,
+                scheduled_at=datetime.utcnow() + timedelta(days=1)
+            ))
+            crud.update_lesson(db, lesson.id, schemas.LessonUpdate(status=models.LessonStatus.CANCELLED))
+
+            lesson.title = "Never saved"
+            db.flush()
+            events.publish_lesson_event(db, lesson, "updated")
+            db.rollback()  # Never committed, never sent
+
+            crud.delete_lesson(db, lesson.id)
+            await asyncio.sleep(0)
+            return lesson.id, _drain(subscriber), _drain(bystander)
+        finally:
+            events.broker.unsubscribe(subscriber)
+            events.broker.unsubscribe(bystander)
+
+    lesson_id, received, unrelated = asyncio.run(scenario())
+    assert [event["type"] for event in received] == ["lesson.created", "lesson.updated", "lesson.deleted"]
+    assert received[0]["lesson_id"] == lesson_id
+    assert received[1]["status"] == "cancelled"
+    assert unrelated == []
+
+
+def test_stream_sends_preamble_heartbeat_and_events():
+    async def scenario():
+        broker = events.LessonEventBroker()
+        subscriber = broker.subscribe(1)
+        stream = broker.stream(subscriber, heartbeat=0.01)
+        chunks = [await stream.__anext__(), await stream.__anext__()]
+        broker.dispatch(_event())
+        chunks.append(await stream.__anext__())
+        await stream.aclose()
+        return chunks, len(broker.subscribers)
+
+    (preamble, heartbeat, message), remaining = asyncio.run(scenario())
+    assert preamble.startswith("retry: ") and "event: ready" in preamble
+    assert heartbeat == ": heartbeat\n\n"
+    assert message.startswith("event: lesson.created\nid: e1\ndata: ")
+    assert json.loads(message.split("data: ", 1)[1])["lesson_id"] == 9
+    assert remaining == 0  # Closing the stream unsubscribes
+
+
+def test_events_endpoint_requires_token_and_sheds_load(db, people, monkeypatch):
+    app = FastAPI()
+    app.include_router(events_router.router)
+    app.dependency_overrides[get_db] = lambda: db
+    client = TestClient(app)
+
+    assert client.get("/lessons/events").status_code == 401
+
+    app.dependency_overrides[get_event_stream_user] = lambda: people["teacher"]
+    monkeypatch.setattr(events, "broker", events.LessonEventBroker(max_subscribers=0))
+    full = client.get("/lessons/events")
+    assert full.status_code == 503
+    assert full.headers["retry-after"] == "5"
@@ -0,0 +1,153 @@
+"""
+Tests for fragment caching on the server-rendered admin pages
+"""
+
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import crud, fragments, models, schemas
+from app.api.routers import web_instructor
+from app.auth.utils import create_access_token
+from app.database import get_db
+from app.main import app
+
+
+@pytest.fixture
+def admin(db):
+    user = models.User(username="admin", email="admin@example.com", full_name="Admin",
+                       hashed_password="x", role=models.UserRole.ADMIN)
+    teacher = models.User(username="teacher", email="teacher@example.com", full_name="Tina Teacher",
+                          hashed_password="x", role=models.UserRole.INSTRUCTOR)
+    student = models.User(username="student", email="student@example.com", full_name="Sam Student",
+                          hashed_password="x", role=models.UserRole.STUDENT)
+    db.add_all([user, teacher, student])
+    db.commit()
+    return user
+
+
+def _client(user):
+    return TestClient(app, headers={"Authorization": f"Bearer {create_access_token({'sub': user.username})}"})
+
+
+@pytest.fixture(autouse=True)
+def use_test_db(db, monkeypatch):
+    monkeypatch.setitem(app.dependency_overrides, get_db, lambda: db)
+
+
+@pytest.fixture
+def client(admin):
+    return _client(admin)
+
+
+@pytest.fixture
+def statements(db):
+    executed = []
+    listener = lambda *args: executed.append(args[2])
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    yield executed
+    event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+
+def _create_lesson(db, title, scheduled_at=None):
+    teacher = crud.get_user_by_username(db, "teacher")
+    student = crud.get_user_by_username(db, "student")
+    return crud.create_lesson(db, schemas.LessonCreate(
+        title=title, teacher_id=teacher.id, student_id=student.id,
+        scheduled_at=scheduled_at or datetime.utcnow() + timedelta(days=1)
+    ))
+
+
+def test_dashboard_fragments_are_served_from_cache(db, admin, client, statements):
+    _create_lesson(db, "Piano basics")
+
+    first = client.get("/web/admin/dashboard")
+    assert first.status_code == 200
+    assert first.headers["content-type"].startswith("text/html")
+    assert 'hx-get="/web/admin/widgets/stats-cards"' in first.text
+    assert "every 60s" not in first.text  # Widgets refresh on lesson events, not a timer
+    assert 'nav-link active" href="/web/admin/dashboard"' in first.text
+    assert "Tina Teacher" in first.text and "Sam Student" in first.text
+    assert statements
+
+    statements.clear()
+    second = client.get("/web/admin/dashboard")
+    assert second.text == first.text
+    assert len(statements) == 1  # Only the authenticated user's lookup
+    assert client.get("/admin/dashboard").headers["content-type"] == "application/json"  # The JSON API's
+
+
+def test_lesson_write_invalidates_dashboard_fragments(db, admin, client):
+    assert "Sam Student" not in client.get("/web/admin/dashboard").text
+    client.get("/web/admin/reports")
+
+    _create_lesson(db, "Violin intro")
+
+    assert "Sam Student" in client.get("/web/admin/dashboard").text
+    reports = client.get("/web/admin/reports")
+    assert reports.status_code == 200
+    assert '<div class="h5 mb-0 font-weight-bold text-gray-800">1</div>' in reports.text
+    assert len(fragments.cache.get_cache(fragments.FRAGMENT_NAMESPACE)) == 3
+
+
+def test_fragment_keys_separate_roles_and_users(admin):
+    instructor = models.User(id=7, role=models.UserRole.INSTRUCTOR)
+
+    assert fragments.fragment_key("stats", instructor) == "instructor:7:stats"
+    assert fragments.fragment_key("stats", admin, per_user=False) == "admin:*:stats"
+    assert fragments.fragment_key("stats", admin) != fragments.fragment_key("stats", instructor)
+
+
+def test_widget_endpoint_revalidates_with_etag(db, client, statements):
+    response = client.get("/web/admin/widgets/stats-cards")
+    assert response.status_code == 200
+    assert response.text.startswith('<div class="row mb-4">')
+    assert response.headers["cache-control"] == "private, no-cache"
+    etag = response.headers["etag"]
+
+    statements.clear()
+    unchanged = client.get("/web/admin/widgets/stats-cards", headers={"If-None-Match": f'W/{etag}'})
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+    assert len(statements) == 1  # Only the authenticated user's lookup
+
+    _create_lesson(db, "Cello")
+    changed = client.get("/web/admin/widgets/stats-cards", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert client.get("/web/admin/widgets/nope").status_code == 404
+
+
+def test_instructor_widgets_show_todays_lessons_and_students(db, admin):
+    teacher = crud.get_user_by_username(db, "teacher")
+    _create_lesson(db, "Scales", scheduled_at=datetime.utcnow().replace(hour=0, minute=0, second=0))
+    client = _client(teacher)
+
+    todays = client.get("/web/instructor/widgets/todays-lessons")
+    assert todays.status_code == 200
+    assert "Sam Student" in todays.text and "60 min" in todays.text
+    assert "Sam Student" in client.get("/web/instructor/widgets/recent-students").text
+    stats = client.get("/web/instructor/widgets/stats-cards")
+    assert stats.headers["etag"] != todays.headers["etag"]
+    assert "instructor:%d:instructor/fragments/stats_cards.html" % teacher.id in \
+        fragments.cache.get_cache(fragments.FRAGMENT_NAMESPACE)._entries
+
+
+def test_instructor_dashboard_polls_reachable_widgets(db, admin):
+    teacher = crud.get_user_by_username(db, "teacher")
+    client = _client(teacher)
+
+    page = client.get("/web/instructor/dashboard")
+    assert page.status_code == 200
+    assert 'nav-link active" href="/web/instructor/dashboard"' in page.text
+    assert page.headers["content-type"].startswith("text/html")
+    widgets = re.findall(r'hx-get="([^"]+)"', page.text)
+    assert widgets == [f"/web/instructor/widgets/{name}" for name in web_instructor.WIDGETS]
+    assert re.findall(r'hx-trigger="([^"]+)"', page.text) == ["lesson-changed from:body delay:1s"] * len(widgets)
+    for url in widgets:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.text in page.text  # The poll swaps in the same fragment the page embedded
@@ -0,0 +1,100 @@
+"""
+Tests for guarded single-statement lesson and user updates (UPDATE ... RETURNING)
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import crud, models, schemas
+from app.auth.utils import create_access_token
+from app.database import get_db
+from app.main import app
+
+
+@pytest.fixture
+def lesson(db):
+    teacher = models.User(username="teacher", email="teacher@example.com", full_name="Tina Teacher",
+                          hashed_password="x", role=models.UserRole.INSTRUCTOR, is_teacher=True)
+    other = models.User(username="other", email="other@example.com", full_name="Oscar Other",
+                        hashed_password="x", role=models.UserRole.INSTRUCTOR, is_teacher=True)
+    student = models.User(username="student", email="student@example.com", full_name="Sam Student",
+                          hashed_password="x")
+    db.add_all([teacher, other, student])
+    db.flush()
+    lesson = models.Lesson(title="Piano", teacher_id=teacher.id, student_id=student.id,
+                           scheduled_at=datetime.utcnow() + timedelta(days=1))
+    db.add(lesson)
+    db.commit()
+    return lesson
+
+
+@pytest.fixture
+def statements(db):
+    executed = []
+    listener = lambda *args: executed.append(args[2])
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    yield executed
+    event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+
+def _client(db, username, monkeypatch):
+    monkeypatch.setitem(app.dependency_overrides, get_db, lambda: db)
+    token = create_access_token({"sub": username})
+    return TestClient(app, headers={"Authorization": f"Bearer {token}"})
+
+
+def test_update_is_one_returning_statement(db, lesson, statements):
+    lesson_id, teacher_id = lesson.id, lesson.teacher_id
+    statements.clear()
+    updated = crud.update_lesson(db, lesson_id, schemas.LessonUpdate(title="Grand piano"),
+                                 conditions=[models.Lesson.teacher_id == teacher_id])
+
+    assert updated.title == "Grand piano"
+    assert [s.split()[0] for s in statements] == ["UPDATE", "INSERT", "INSERT"]  # Invalidations, change log
+    assert "RETURNING" in statements[0]
+    statements.clear()
+    assert updated.status == models.LessonStatus.SCHEDULED and statements == []  # Nothing reloaded after commit
+
+    assert crud.update_lesson(db, lesson_id, schemas.LessonUpdate(title="Nope"),
+                              conditions=[models.Lesson.teacher_id == teacher_id + 100]) is None
+    db.expire_all()
+    assert db.get(models.Lesson, lesson_id).title == "Grand piano"
+
+
+def test_update_falls_back_without_returning(db, lesson, monkeypatch):
+    monkeypatch.setattr(db.get_bind().dialect, "update_returning", False)
+    user = crud.update_user(db, lesson.student_id, schemas.UserUpdate(full_name="Samantha Student"))
+    assert user.full_name == "Samantha Student"
+    assert crud.update_user(db, 9999, schemas.UserUpdate(full_name="Nobody")) is None
+
+
+def test_instructor_complete_checks_in_the_update(db, lesson, monkeypatch):
+    client = _client(db, "teacher", monkeypatch)
+
+    response = client.put(f"/instructor/lessons/{lesson.id}/complete", json={"notes": "Well done"})
+    assert response.status_code == 200
+    assert response.json()["lesson"]["status"] == "completed"
+    assert client.put(f"/instructor/lessons/{lesson.id}/complete", json={}).status_code == 400
+    assert client.put("/instructor/lessons/9999/complete", json={}).status_code == 404
+    assert _client(db, "other", monkeypatch).put(f"/instructor/lessons/{lesson.id}/cancel",
+                                                 params={"cancellation_reason": "Ill"}).status_code == 403
+
+    edited = client.put(f"/instructor/lessons/{lesson.id}", json={"room_number": "B2"})
+    assert edited.status_code == 200
+    assert edited.json()["student"]["username"] == "student"
+
+
+def test_students_may_only_update_notes(db, lesson, monkeypatch):
+    client = _client(db, "student", monkeypatch)
+
+    notes = client.put(f"/lessons/{lesson.id}", json={"notes": "Practised scales"})
+    assert notes.status_code == 200
+    assert notes.json()["notes"] == "Practised scales"
+
+    title = client.put(f"/lessons/{lesson.id}", json={"title": "Drums"})
+    assert title.status_code == 403
+    assert "Forbidden fields" in title.json()["detail"]
+    assert _client(db, "other", monkeypatch).put(f"/lessons/{lesson.id}", json={"notes": "x"}).status_code == 403
@@ -0,0 +1,107 @@
+"""
+Tests for the liveness and readiness endpoints
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import health, jobs, main, models
+from app.database import Base
+
+client = TestClient(main.app)
+
+
+def _engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'health.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def test_liveness_needs_no_dependencies():
+    response = client.get("/health/live")
+    assert response.status_code == 200
+    assert response.json()["status"] == "alive"
+
+
+def test_readiness_is_cached_between_checks(monkeypatch, tmp_path):
+    engine = _engine(tmp_path)
+    probe = health.ReadinessProbe(engine, ttl=60)
+    monkeypatch.setattr(main, "readiness", probe)
+    runs = []
+    original_run = probe.run
+    monkeypatch.setattr(probe, "run", lambda: runs.append(1) or original_run())
+
+    first = client.get("/health/ready")
+    second = client.get("/health")
+    assert first.status_code == second.status_code == 200
+    assert first.json()["status"] == "healthy"
+    assert first.json()["checks"]["database"]["latency_ms"] >= 0
+    assert (first.json()["cached"], second.json()["cached"]) == (False, True)
+    assert runs == [1]
+    engine.dispose()
+
+
+def test_unreachable_database_is_unhealthy(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'missing' / 'app.db'}")
+    monkeypatch.setattr(main, "readiness", health.ReadinessProbe(engine, schedule=lambda: {"x": 60.0}))
+
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "unhealthy"
+    assert "error" in response.json()["checks"]["database"]
+
+
+def test_stale_periodic_task_and_queue_backlog_degrade(monkeypatch, tmp_path):
+    engine = _engine(tmp_path)
+    now = datetime.utcnow()
+    db = sessionmaker(bind=engine)()
+    db.add_all([
+        models.Job(name="deliver_email_outbox", status=models.JobStatus.DONE,
+                   run_at=now - timedelta(hours=1), finished_at=now - timedelta(hours=1)),
+        models.Job(name="backup_database", status=models.JobStatus.DONE, run_at=now, finished_at=now),
+    ] + [models.Job(name="send_lesson_reminders", run_at=now - timedelta(minutes=5)) for _ in range(3)])
+    db.commit()
+    db.close()
+    monkeypatch.setattr(health, "HEALTH_QUEUE_DEGRADED_DEPTH", 2)
+
+    schedule = {"deliver_email_outbox": 60.0, "backup_database": 86400.0}
+    result = health.ReadinessProbe(engine, schedule=lambda: schedule).run()
+    assert result["status"] == "degraded"
+    assert result["checks"]["periodic_tasks"]["stale"] == ["deliver_email_outbox"]
+    assert result["checks"]["job_queue"] == {"status": "degraded", "due": 3, "oldest_due_seconds": 300.0}
+    engine.dispose()
+
+
+def test_periodic_task_that_raises_is_reported(monkeypatch, tmp_path):
+    engine = _engine(tmp_path)
+    session_factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(health, "PROCESS_STARTED_AT", datetime.utcnow() - timedelta(hours=1))
+
+    def deliver():
+        raise ConnectionRefusedError("smtp down")
+
+    schedule = {"deliver_email_outbox": 60.0}
+    runner = jobs.JobRunner(session_factory, {"deliver_email_outbox": deliver}, schedule=schedule)
+    asyncio.run(runner.run_once())
+
+    db = session_factory()
+    check = health.check_periodic_tasks(db, schedule, datetime.utcnow())
+    assert check["status"] == "degraded"
+    assert check["failing"] == {"deliver_email_outbox": "ConnectionRefusedError: smtp down"}
+    # Runs keep failing, so the task goes stale too however often it is attempted
+    later = health.check_periodic_tasks(db, schedule, datetime.utcnow() + timedelta(minutes=3))
+    assert later["stale"] == ["deliver_email_outbox"]
+    db.close()
+    engine.dispose()
+
+
+def test_exhausted_pool_is_unhealthy(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=1, max_overflow=0)
+    with engine.connect():
+        assert health.check_pool(engine)["status"] == "unhealthy"
+    assert health.check_pool(engine) == {"status": "healthy", "checked_out": 0, "capacity": 1, "saturation": 0.0}
+    engine.dispose()
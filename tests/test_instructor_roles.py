@@ -0,0 +1,107 @@
+"""
+Tests for the instructor role catalog and indexed specializations
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import crud, models, schemas
+from app.auth.utils import create_access_token
+from app.database import get_db
+from app.main import app
+
+
+@pytest.fixture
+def people(db):
+    admin = models.User(username="admin", email="admin@example.com", full_name="Ada Admin",
+                        hashed_password="x", role=models.UserRole.ADMIN)
+    teacher = models.User(username="teacher", email="teacher@example.com", full_name="Tina Teacher",
+                          hashed_password="x", role=models.UserRole.INSTRUCTOR, is_teacher=True,
+                          specializations="Jazz piano,violin")
+    db.add_all([admin, teacher])
+    db.commit()
+    return admin, teacher
+
+
+@pytest.fixture
+def client(db, people, monkeypatch):
+    monkeypatch.setitem(app.dependency_overrides, get_db, lambda: db)
+    token = create_access_token({"sub": "admin"})
+    return TestClient(app, headers={"Authorization": f"Bearer {token}"})
+
+
+def _assigned(db, instructor_id):
+    return crud.get_instructor_role_ids(db, instructor_id)
+
+
+def test_catalog_is_seeded_and_cached(db):
+    executed = []
+    listener = lambda *args: executed.append(args[2])
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        roles = crud.get_instructor_roles(db)
+        assert len(executed) == 1
+        assert {role["id"] for role in roles} >= {"piano", "guitar", "violin", "voice"}
+        roles[0]["name"] = "Changed by a caller"
+        assert crud.get_instructor_role(db, roles[0]["id"])["name"] != "Changed by a caller"
+        assert len(executed) == 1  # Served from the worker's cache
+
+        crud.create_instructor_role(db, schemas.InstructorRoleCreate(name="Cello Instructor", instrument="Cello"))
+        assert crud.get_instructor_role(db, "cello")["instrument"] == "Cello"  # Commit dropped the cache
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+
+def test_specializations_link_whole_words_only(db, people):
+    user = crud.create_user(db, schemas.UserCreate(
+        username="pia", email="pia@example.com", full_name="Pia", password="secret123",
+        role=models.UserRole.INSTRUCTOR, specializations="Pian, Guitar, theory"
+    ))
+    assert _assigned(db, user.id) == ["guitar"]
+
+    crud.update_user(db, user.id, schemas.UserUpdate(specializations="piano,voice"))
+    assert _assigned(db, user.id) == ["piano", "voice"]
+
+    crud.delete_user(db, user.id)
+    assert _assigned(db, user.id) == []
+
+
+def test_assign_and_remove_keep_text_in_step(db, people, client):
+    _, teacher = people
+    teacher_id = teacher.id
+    crud._link_specializations(db, teacher_id, teacher.specializations)
+    db.commit()
+    assert _assigned(db, teacher_id) == ["violin"]  # "Jazz piano" is not a role
+
+    assert client.post("/admin/instructor-roles/assign",
+                       json={"instructorId": teacher_id, "roleId": "piano"}).status_code == 200
+    assert client.post("/admin/instructor-roles/assign",
+                       json={"instructor_id": teacher_id, "role_id": "banjo"}).status_code == 404
+    db.expire_all()
+    assert _assigned(db, teacher_id) == ["piano", "violin"]
+    assert db.get(models.User, teacher_id).specializations == "Jazz piano,violin,piano"
+
+    assert client.delete(f"/admin/instructor-roles/remove/{teacher_id}/violin").status_code == 200
+    db.expire_all()
+    assert db.get(models.User, teacher_id).specializations == "Jazz piano,piano"
+
+    roles = client.get(f"/admin/instructors/{teacher_id}/roles").json()["assigned_roles"]
+    assert [role["id"] for role in roles] == ["piano"]
+
+
+def test_role_catalog_endpoints(db, people, client):
+    created = client.post("/admin/instructor-roles", json={"name": "Bass Instructor", "instrument": "Bass Guitar"})
+    assert created.json()["id"] == "bass-guitar"
+    assert client.post("/admin/instructor-roles", json={"id": "piano", "name": "Piano", "instrument": "Piano"}) \
+        .status_code == 400
+
+    updated = client.put("/admin/instructor-roles/bass-guitar", json={"description": "Electric and upright"})
+    assert updated.json()["description"] == "Electric and upright"
+    assert client.put("/admin/instructor-roles/nope", json={"name": "x"}).status_code == 404
+
+    _, teacher = people
+    crud.assign_instructor_role(db, teacher, "bass-guitar")
+    assert client.delete("/admin/instructor-roles/bass-guitar").status_code == 200
+    assert "bass-guitar" not in {role["id"] for role in client.get("/admin/instructor-roles").json()}
+    assert _assigned(db, teacher.id) == []
@@ -0,0 +1,173 @@
+"""
+Tests for the database-backed job queue and in-process runner
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import jobs, metrics, models, tasks
+from app.database import Base
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+def test_claim_is_exclusive_and_reclaims_stale_jobs(session_factory):
+    db = session_factory()
+    for i in range(3):
+        jobs.enqueue(db, "noop", i)
+    jobs.enqueue(db, "noop", 99, run_at=datetime.utcnow() + timedelta(hours=1))
+
+    first = jobs.claim_jobs(db, "worker-a", limit=2)
+    second = jobs.claim_jobs(db, "worker-b", limit=5)
+    assert [job["args"] for job in first] == [[0], [1]]
+    assert [job["args"] for job in second] == [[2]]
+    assert jobs.claim_jobs(db, "worker-c", limit=5) == []
+
+    # A job whose worker died is handed out again once its lease runs out
+    db.query(models.Job).filter(models.Job.id == first[0]["id"]).update(
+        {"locked_at": datetime.utcnow() - timedelta(seconds=jobs.JOB_LEASE_SECONDS + 1)}
+    )
+    db.commit()
+    reclaimed = jobs.claim_jobs(db, "worker-c", limit=5)
+    assert [(job["id"], job["attempts"]) for job in reclaimed] == [(first[0]["id"], 2)]
+    db.close()
+
+
+def test_failed_jobs_back_off_then_give_up(session_factory):
+    db = session_factory()
+    job = jobs.enqueue(db, "flaky", max_attempts=2)
+
+    claimed = jobs.claim_jobs(db, "w", limit=1)[0]
+    jobs.fail_job(db, claimed, RuntimeError("smtp down"))
+    db.refresh(job)
+    assert job.status == models.JobStatus.QUEUED
+    assert job.run_at > datetime.utcnow()
+
+    db.query(models.Job).update({"run_at": datetime.utcnow()})
+    db.commit()
+    claimed = jobs.claim_jobs(db, "w", limit=1)[0]
+    jobs.fail_job(db, claimed, RuntimeError("smtp down"))
+    db.refresh(job)
+    assert job.status == models.JobStatus.FAILED
+    assert job.last_error == "RuntimeError: smtp down"
+    db.close()
+
+
+def test_only_one_runner_holds_the_scheduler_lease(session_factory):
+    db = session_factory()
+    errors = []
+    event.listen(db.get_bind(), "handle_error", errors.append)
+    assert jobs.acquire_lease(db, "scheduler", "a", 30)
+    assert not jobs.acquire_lease(db, "scheduler", "b", 30)
+    assert jobs.acquire_lease(db, "scheduler", "a", 30)
+
+    db.query(models.JobLease).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+    assert jobs.acquire_lease(db, "scheduler", "b", 30)
+    assert errors == []  # Followers never hit the primary key, which PostgreSQL would log
+    db.close()
+
+
+def test_runner_renews_the_lease_of_long_jobs(session_factory, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_HEARTBEAT_SECONDS", 0.05)
+    db = session_factory()
+    job_id = jobs.enqueue(db, "backup").id
+    stolen = []
+
+    def backup():
+        time.sleep(0.3)
+        # Still running past the (shortened) lease, yet no other runner may take it
+        monkeypatch.setattr(jobs, "JOB_LEASE_SECONDS", 0.2)
+        other = session_factory()
+        try:
+            stolen.extend(jobs.claim_jobs(other, "worker-b", limit=1))
+        finally:
+            other.close()
+
+    runner = jobs.JobRunner(session_factory, {"backup": backup})
+    asyncio.run(runner.run_once())
+
+    assert stolen == []
+    assert db.get(models.Job, job_id).status == models.JobStatus.DONE
+    db.close()
+
+
+def test_renewal_skips_jobs_claimed_again(session_factory):
+    db = session_factory()
+    jobs.enqueue(db, "backup")
+    claimed = jobs.claim_jobs(db, "worker-a", limit=1)
+    assert jobs.renew_jobs(db, claimed) == 1
+
+    db.query(models.Job).update({"locked_at": datetime.utcnow() - timedelta(seconds=jobs.JOB_LEASE_SECONDS + 1)})
+    db.commit()
+    assert jobs.claim_jobs(db, "worker-b", limit=1)
+    assert jobs.renew_jobs(db, claimed) == 0
+    db.close()
+
+
+def test_runner_schedules_periodic_tasks_and_runs_queued_jobs(session_factory):
+    calls = []
+    registry = {"tick": lambda: calls.append("tick"), "add": lambda a, b: calls.append(a + b)}
+    leader = jobs.JobRunner(session_factory, registry, schedule={"tick": 3600}, concurrency=5)
+    follower = jobs.JobRunner(session_factory, registry, schedule={"tick": 3600}, concurrency=5)
+
+    db = session_factory()
+    jobs.enqueue(db, "add", 2, 3)
+
+    async def run():
+        await leader.run_once()
+        await follower.run_once()
+        await leader.run_once()
+
+    asyncio.run(run())
+
+    # The periodic task was queued once, by the leader only
+    assert sorted(calls, key=str) == [5, "tick"]
+    assert jobs.get_queue_stats(db) == {"queued": 0, "running": 0, "done": 2, "failed": 0}
+    db.close()
+
+
+def test_runner_retries_tasks_that_raise(session_factory, monkeypatch):
+    def prune(db):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(tasks, "SessionLocal", session_factory)
+    monkeypatch.setattr(tasks.changes, "prune", prune)
+    runner = jobs.JobRunner(session_factory, tasks.TASKS)
+    errors = metrics.JOBS_PROCESSED.value(task="prune_change_log", outcome="error")
+
+    db = session_factory()
+    job = jobs.enqueue(db, "prune_change_log", max_attempts=2)
+    asyncio.run(runner.run_once())
+
+    db.refresh(job)
+    assert job.status == models.JobStatus.QUEUED  # Backing off for a retry, not marked done
+    assert job.last_error == "RuntimeError: disk full"
+    assert metrics.JOBS_PROCESSED.value(task="prune_change_log", outcome="error") == errors + 1
+    db.close()
+
+
+def test_delay_queues_job_with_database_backend(session_factory, monkeypatch):
+    monkeypatch.setattr(tasks, "JOB_BACKEND", "database")
+    monkeypatch.setattr(tasks, "SessionLocal", session_factory)
+
+    tasks.send_welcome_email.delay(42)
+
+    db = session_factory()
+    job = db.query(models.Job).one()
+    assert (job.name, job.args, job.status) == ("send_welcome_email", "[42]", models.JobStatus.QUEUED)
+    assert set(tasks.PERIODIC_TASKS) <= set(tasks.TASKS)
+    db.close()
@@ -0,0 +1,105 @@
+"""
+Tests for queued JSON logging and the access log middleware
+"""
+
+import json
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app import log
+from app.main import app
+
+
+@pytest.fixture
+def log_dir(tmp_path):
+    log.setup_logging(str(tmp_path), level="INFO", log_format="json")
+    yield tmp_path
+    log.stop_logging()
+
+
+def _records(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_records_are_queued_and_written_as_json(log_dir):
+    root_handlers = logging.getLogger().handlers
+    assert any(isinstance(handler, logging.handlers.QueueHandler) for handler in root_handlers)
+
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logging.getLogger("app.tasks").exception("Task %s failed", "backup", extra={"job_id": 7})
+    log.stop_logging()
+
+    (record,) = _records(log_dir / "app.log")
+    assert record["level"] == "ERROR"
+    assert record["logger"] == "app.tasks"
+    assert record["message"] == "Task backup failed"
+    assert record["job_id"] == 7
+    assert "ValueError: boom" in record["exception"]
+    assert not (log_dir / "access.log").exists()
+
+
+def test_access_log_has_route_status_and_query_count(log_dir):
+    TestClient(app).get("/admin/settings/timezone")
+    log.stop_logging()
+
+    (record,) = _records(log_dir / "access.log")
+    assert record["logger"] == "app.access"
+    assert (record["method"], record["path"], record["route"]) == ("GET", "/admin/settings/timezone", "/admin/settings/{key}")
+    assert record["status"] == 401
+    assert record["query_count"] == 0
+    assert record["user_id"] is None
+    assert record["duration_ms"] >= 0
+    assert not (log_dir / "app.log").exists() or "app.access" not in (log_dir / "app.log").read_text()
+
+
+def test_access_log_records_authenticated_user(log_dir):
+    async def whoami(request):
+        log.set_request_user(7)
+        return PlainTextResponse("ok")
+
+    tiny = Starlette(routes=[Route("/users/{user_id}", whoami)])
+    tiny.add_middleware(log.AccessLogMiddleware, router_app=tiny)
+    TestClient(tiny).get("/users/7")
+    log.stop_logging()
+
+    (record,) = _records(log_dir / "access.log")
+    assert (record["route"], record["user_id"], record["status"]) == ("/users/{user_id}", 7, 200)
+
+
+def test_log_files_rotate_by_size(monkeypatch, tmp_path):
+    monkeypatch.setattr(log, "LOG_MAX_BYTES", 2000)
+    log.setup_logging(str(tmp_path), level="INFO", log_format="json")
+    try:
+        for n in range(100):
+            logging.getLogger("app.jobs").info("Processed job %s", n)
+    finally:
+        log.stop_logging()
+
+    assert (tmp_path / "app.log.1").exists()
+    assert (tmp_path / "app.log").stat().st_size <= 2000
+
+
+def test_update_log_is_plain_text_and_tailed(log_dir):
+    logging.getLogger(log.UPDATES_LOGGER).info("Update initiated by %s", "admin")
+    log.stop_logging()
+
+    (line,) = log.tail_updates_log(log_dir=str(log_dir))
+    assert line.startswith("[") and line.endswith("Update initiated by admin")
+
+
+def test_update_log_is_merged_across_workers(tmp_path):
+    for pid, lines in ((101, ["[2026-10-19 09:00:00,000] Update initiated by admin",
+                              "[2026-10-19 09:02:00,000] Update finished"]),
+                       (202, ["[2026-10-19 09:01:00,000] Rollback requested by ops"])):
+        (tmp_path / f"worker-{pid}").mkdir()
+        (tmp_path / f"worker-{pid}" / log.UPDATES_LOG_FILE).write_text("\n".join(lines) + "\n")
+
+    trail = log.tail_updates_log(lines=2, log_dir=str(tmp_path / "worker-{pid}"))
+    assert trail == ["[2026-10-19 09:01:00,000] Rollback requested by ops", "[2026-10-19 09:02:00,000] Update finished"]
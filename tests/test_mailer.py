@@ -0,0 +1,161 @@
+"""
+Tests for the outbound email pipeline against a local aiosmtpd server
+"""
+
+import socket
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import mailer, models, schemas
+from app.database import Base
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+
+class RecordingHandler:
+    """SMTP handler that stores messages and rejects chosen recipients"""
+
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+        self.rejections = {}
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.rejections:
+            return self.rejections[address]
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        self.messages.append(envelope)
+        return "250 Message accepted for delivery"
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    yield handler, controller
+    controller.stop()
+
+
+def _configure(db, controller):
+    mailer.save_email_settings(db, schemas.EmailSettingsUpdate(
+        smtp_host=controller.hostname,
+        smtp_port=controller.port,
+        smtp_use_tls=False,
+        from_email="office@musicu.test"
+    ))
+
+
+def test_settings_round_trip(db):
+    mailer.save_email_settings(db, schemas.EmailSettingsUpdate(
+        smtp_host="mail.example.com", smtp_port=2525, smtp_password="secret", smtp_use_tls=False
+    ))
+    mailer.save_email_settings(db, schemas.EmailSettingsUpdate(smtp_password=""))
+
+    settings = mailer.get_email_settings(db)
+    assert settings["smtp_host"] == "mail.example.com"
+    assert settings["smtp_port"] == 2525
+    assert settings["smtp_use_tls"] is False
+    assert settings["smtp_password"] == "secret"
+    assert mailer.public_email_settings(settings)["smtp_password"] == ""
+
+
+def test_burst_drains_over_pooled_connections(db, smtp_server):
+    handler, controller = smtp_server
+    _configure(db, controller)
+    queued = mailer.enqueue_emails(db, [
+        {"to_address": f"student{i}@example.com", "subject": "Reminder", "body": "See you",
+         "dedupe_key": f"reminder:{i}"}
+        for i in range(500)
+    ])
+    assert queued == 500
+    # Re-queueing the same reminders is a no-op
+    assert mailer.enqueue_emails(db, [
+        {"to_address": "student0@example.com", "subject": "Reminder", "body": "See you",
+         "dedupe_key": "reminder:0"}
+    ]) == 0
+
+    pool = mailer.SMTPConnectionPool(mailer.get_email_settings(db), size=4)
+    connects = []
+    original_connect = pool._connect
+    pool._connect = lambda: connects.append(1) or original_connect()
+    try:
+        totals = mailer.deliver_outbox(db, batch_size=100, pool=pool)
+    finally:
+        pool.close()
+
+    assert totals == {"sent": 500, "retried": 0, "failed": 0}
+    assert len(handler.messages) == 500
+    assert len(connects) <= 4
+    assert mailer.get_outbox_stats(db)["sent"] == 500
+
+
+def test_transient_and_permanent_failures(db, smtp_server):
+    handler, controller = smtp_server
+    _configure(db, controller)
+    handler.rejections = {
+        "busy@example.com": "451 Try again later",
+        "gone@example.com": "550 No such user",
+    }
+    for address in ["ok@example.com", "busy@example.com", "gone@example.com"]:
+        mailer.enqueue_email(db, address, "Hello", "Body")
+
+    totals = mailer.deliver_outbox(db)
+    assert totals == {"sent": 1, "retried": 1, "failed": 1}
+
+    busy = db.query(models.EmailOutbox).filter_by(to_address="busy@example.com").one()
+    assert busy.status == models.EmailStatus.PENDING
+    assert busy.attempts == 1
+    assert busy.next_attempt_at > datetime.utcnow()
+    assert "451" in busy.last_error
+
+    gone = db.query(models.EmailOutbox).filter_by(to_address="gone@example.com").one()
+    assert gone.status == models.EmailStatus.FAILED
+
+    # Nothing is due until the backoff expires
+    assert mailer.deliver_outbox(db) == {"sent": 0, "retried": 0, "failed": 0}
+
+
+def test_interleaved_claims_never_share_a_message(tmp_path):
+    url = f"sqlite:///{tmp_path / 'outbox.db'}"
+    first_worker = create_engine(url, connect_args={"check_same_thread": False})
+    second_worker = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=first_worker)
+    first, second = sessionmaker(bind=first_worker)(), sessionmaker(bind=second_worker)()
+    for n in range(4):
+        mailer.enqueue_email(first, f"student{n}@example.com", "Reminder", "Body")
+
+    # The second run claims between the first run's SELECT and its UPDATE
+    second_batches = []
+
+    def interleave(conn, cursor, statement, *args):
+        if statement.startswith("UPDATE email_outbox") and not second_batches:
+            second_batches.append(mailer._claim_batch(second, batch_size=3))
+
+    event.listen(first_worker, "before_cursor_execute", interleave)
+    try:
+        first_batch = mailer._claim_batch(first, batch_size=3)
+    finally:
+        event.remove(first_worker, "before_cursor_execute", interleave)
+
+    assert [item["to_address"] for item in second_batches[0]] == [f"student{n}@example.com" for n in range(3)]
+    assert first_batch == []  # Its candidates were taken, so it sends nothing twice
+    assert [item["to_address"] for item in mailer._claim_batch(first, batch_size=3)] == ["student3@example.com"]
+    assert mailer._claim_batch(second, batch_size=3) == []
+    first.close()
+    second.close()
+    first_worker.dispose()
+    second_worker.dispose()
@@ -0,0 +1,93 @@
+"""
+Tests for instructor matching
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import crud, matching, models
+from app.auth.utils import create_access_token
+from app.database import get_db
+from app.main import app
+
+MONDAY = (datetime.utcnow() + timedelta(weeks=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+MONDAY -= timedelta(days=MONDAY.weekday())
+
+
+@pytest.fixture
+def school(db):
+    def instructor(username, role_id, is_active=True):
+        user = models.User(username=username, email=f"{username}@example.com", full_name=username.title(),
+                           hashed_password="x", role=models.UserRole.INSTRUCTOR, is_teacher=True,
+                           is_active=is_active)
+        db.add(user)
+        db.flush()
+        db.add(models.InstructorSpecialization(instructor_id=user.id, role_id=role_id))
+        return user
+
+    admin = models.User(username="admin", email="admin@example.com", full_name="Ada Admin",
+                        hashed_password="x", role=models.UserRole.ADMIN)
+    student = models.User(username="student", email="student@example.com", full_name="Sam", hashed_password="x")
+    db.add_all([admin, student])
+    busy, free = instructor("busy", "piano"), instructor("free", "piano")
+    instructor("guitarist", "guitar")
+    instructor("retired", "piano", is_active=False)
+
+    def lesson(teacher, at, status=models.LessonStatus.SCHEDULED):
+        db.add(models.Lesson(title="Piano", teacher_id=teacher.id, student_id=student.id, scheduled_at=at,
+                             duration_minutes=60, status=status))
+
+    lesson(busy, MONDAY + timedelta(days=2, hours=9))  # Load only
+    lesson(busy, MONDAY + timedelta(days=3, hours=9))
+    lesson(free, MONDAY + timedelta(hours=16, minutes=10))  # Pushes free's Monday slot to 17:15
+    lesson(busy, MONDAY + timedelta(hours=16), models.LessonStatus.CANCELLED)
+    db.commit()
+    return busy, free
+
+
+def _windows(*hours):
+    return [(MONDAY + timedelta(days=day, hours=start), MONDAY + timedelta(days=day, hours=end))
+            for day, start, end in hours]
+
+
+def test_ranks_by_window_then_load(db, school):
+    matches = matching.match_instructors(db, "Piano", _windows((0, 16, 19), (1, 10, 11)))
+
+    assert [(m["instructor"].username, m["window"], m["weekly_load"]) for m in matches] == [
+        ("free", 0, 1), ("busy", 0, 2), ("free", 1, 1), ("busy", 1, 2)
+    ]
+    assert matches[0]["start"] == MONDAY + timedelta(hours=17, minutes=15)
+    assert matches[1]["start"] == MONDAY + timedelta(hours=16)  # Cancelled lessons free their slot
+    assert matches[0]["role_id"] == "piano"
+
+
+def test_full_windows_and_unknown_instruments(db, school):
+    assert matching.match_instructors(db, "piano", _windows((0, 16, 17)), duration_minutes=90) == []
+    assert [m["instructor"].username for m in matching.match_instructors(db, "guitar", _windows((0, 9, 10)))] \
+        == ["guitarist"]
+    with pytest.raises(matching.UnknownInstrument):
+        matching.match_instructors(db, "theremin", _windows((0, 9, 10)))
+    with pytest.raises(ValueError):
+        matching.match_instructors(db, "piano", _windows((0, 10, 9)))
+
+
+def test_match_endpoint_stays_within_query_budget(db, school, monkeypatch):
+    monkeypatch.setitem(app.dependency_overrides, get_db, lambda: db)
+    client = TestClient(app, headers={"Authorization": f"Bearer {create_access_token({'sub': 'admin'})}"})
+    crud.get_instructor_roles(db)  # Warm catalog, as in a running worker
+    body = {"instrument": "piano", "duration_minutes": 30, "limit": 3, "windows": [
+        {"start": start.isoformat() + "Z", "end": end.isoformat() + "Z"}
+        for start, end in _windows((0, 16, 18), (1, 10, 11), (2, 9, 10))
+    ]}
+
+    response = client.post("/admin/instructors/match", json=body)
+    assert response.status_code == 200, response.text
+    assert int(response.headers["x-query-count"]) == 3  # Auth, instructors, their lessons
+    assert [match["instructor"]["username"] for match in response.json()] == ["free", "busy", "free"]
+
+    body["instrument"] = "theremin"
+    assert client.post("/admin/instructors/match", json=body).status_code == 404
+    body.update(instrument="piano", windows=[])
+    assert client.post("/admin/instructors/match", json=body).status_code == 400
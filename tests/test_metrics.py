@@ -0,0 +1,91 @@
+"""
+Tests for the /metrics endpoint and its instrumentation
+"""
+
+import asyncio
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app import metrics
+from app.auth import utils
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_routes_are_labelled_by_template(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ALLOWED_HOSTS", {"testclient"})
+    for lesson_id in (101, 102, 103):
+        assert client.get(f"/lessons/{lesson_id}").status_code == 401
+    client.get("/no/such/page")
+
+    body = client.get("/metrics").text
+    assert 'http_requests_total{method="GET",route="/lessons/{lesson_id}",status="401"} 3' in body
+    assert 'route="/no/such/page"' not in body
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"}' in body
+    assert 'http_request_duration_seconds_count{method="GET",route="/lessons/{lesson_id}"} 3' in body
+    assert 'http_requests_in_progress{method="GET",route="/metrics"} 1' in body
+
+
+def test_histogram_exposition_is_cumulative():
+    histogram = metrics.Histogram("test_seconds", "Test", ("op",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, op="x")
+
+    assert histogram.collect()[2:] == [
+        'test_seconds_bucket{op="x",le="0.1"} 1',
+        'test_seconds_bucket{op="x",le="1"} 2',
+        'test_seconds_bucket{op="x",le="+Inf"} 3',
+        'test_seconds_sum{op="x"} 5.55',
+        'test_seconds_count{op="x"} 3',
+    ]
+
+
+def test_engine_queries_and_pool_are_instrumented(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'metrics.db'}")
+    metrics.instrument_engine(engine)
+    before = metrics.DB_QUERIES.value(operation="SELECT")
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+        assert 'db_pool_connections{state="checkedout"} 1' in metrics.render()
+
+    assert metrics.DB_QUERIES.value(operation="SELECT") == before + 2
+    engine.dispose()
+
+
+def test_password_checks_run_on_bcrypt_executor():
+    hashed = utils.get_password_hash("secret")
+    before = metrics.PASSWORD_HASH_LATENCY.count(operation="verify")
+
+    async def verify_many():
+        return await asyncio.gather(*[utils.verify_password_async("secret", hashed) for _ in range(6)])
+
+    assert asyncio.run(verify_many()) == [True] * 6
+    assert metrics.PASSWORD_HASH_LATENCY.count(operation="verify") == before + 6
+    assert utils.password_executor_queue_depth() == 0
+    assert "password_hash_queue_depth 0" in metrics.render()
+
+
+def test_scrapes_need_an_allowed_host_or_the_token(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ALLOWED_HOSTS", {"127.0.0.1", "::1"})
+    assert client.get("/metrics").status_code == 403
+
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics", headers={"Authorization": "Bearer nope"}).status_code == 403
+    response = client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
+    assert "http_requests_total" in response.text
+    assert metrics.scrape_allowed("127.0.0.1", None)
+
+
+def test_callback_gauges_are_cached_between_scrapes():
+    calls = []
+    gauge = metrics.Gauge("test_jobs", "Test", ("status",),
+                          callback=lambda: calls.append(1) or [({"status": "queued"}, len(calls))], ttl=60)
+
+    assert gauge.collect()[2:] == ['test_jobs{status="queued"} 1']
+    assert gauge.collect()[2:] == ['test_jobs{status="queued"} 1']
+    assert calls == [1]
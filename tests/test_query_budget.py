@@ -0,0 +1,93 @@
+"""
+Tests for per-request query budgets and N+1 detection
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app import models, query_budget
+from app.auth.utils import create_access_token
+from app.database import get_db
+from app.main import app
+
+
+def test_statement_shape_ignores_parameters():
+    assert query_budget.statement_shape("SELECT * FROM users WHERE id IN (?, ?, ?)") == \
+        query_budget.statement_shape("SELECT *\n  FROM users WHERE id IN (?)")
+    assert query_budget.statement_shape("SELECT 1 LIMIT 10") == "SELECT N LIMIT N"
+
+
+def test_user_reports_use_constant_queries(db, monkeypatch):
+    admin = models.User(email="admin@example.com", username="admin", full_name="Admin",
+                        hashed_password="x", role=models.UserRole.ADMIN)
+    teacher = models.User(email="t@example.com", username="teacher", full_name="Teacher",
+                          hashed_password="x", role=models.UserRole.INSTRUCTOR, is_teacher=True)
+    students = [models.User(email=f"s{i}@example.com", username=f"student{i}", full_name=f"Student {i}",
+                            hashed_password="x") for i in range(8)]
+    db.add_all([admin, teacher] + students)
+    db.commit()
+    now = datetime.utcnow()
+    for i, student in enumerate(students):
+        db.add_all([
+            models.Lesson(title="Past", teacher_id=teacher.id, student_id=student.id,
+                          scheduled_at=now - timedelta(days=i + 1), status=models.LessonStatus.COMPLETED),
+            models.Lesson(title="Next", teacher_id=teacher.id, student_id=student.id,
+                          scheduled_at=now + timedelta(days=i + 1)),
+        ])
+    db.commit()
+
+    monkeypatch.setitem(app.dependency_overrides, get_db, lambda: db)
+    token = create_access_token({"sub": "admin"})
+    response = TestClient(app).get("/admin/reports/users", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    assert int(response.headers["x-query-count"]) <= 4
+    reports = {report["user"]["username"]: report for report in response.json()}
+    assert reports["teacher"]["total_lessons"] == 16
+    assert reports["student0"]["completed_lessons"] == 1
+    assert reports["student0"]["upcoming_lessons"] == 1
+    assert reports["admin"]["total_lessons"] == 0
+
+
+def _n_plus_one_app(session_factory, budget):
+    demo = FastAPI()
+    demo.add_middleware(query_budget.QueryBudgetMiddleware)
+    query_budget.install()
+
+    @demo.get("/users")
+    @query_budget.query_budget(budget)
+    def list_users(db: Session = Depends(session_factory)):
+        ids = [user_id for (user_id,) in db.query(models.User.id)]
+        return [db.get(models.User, user_id).username for user_id in ids]
+
+    return TestClient(demo)
+
+
+def test_strict_mode_fails_requests_over_budget(db):
+    db.add_all([models.User(email=f"u{i}@example.com", username=f"user{i}", full_name="U",
+                            hashed_password="x") for i in range(6)])
+    db.commit()
+    db.expire_all()
+
+    with pytest.raises(query_budget.QueryBudgetExceeded, match="possible N\\+1"):
+        _n_plus_one_app(lambda: db, budget=20).get("/users")
+
+    db.expire_all()
+    with pytest.raises(query_budget.QueryBudgetExceeded, match="budget is 3"):
+        _n_plus_one_app(lambda: db, budget=3).get("/users")
+
+
+def test_non_strict_mode_only_reports(db, monkeypatch):
+    monkeypatch.setattr(query_budget, "STRICT", False)
+    db.add_all([models.User(email=f"u{i}@example.com", username=f"user{i}", full_name="U",
+                            hashed_password="x") for i in range(6)])
+    db.commit()
+    db.expire_all()
+
+    response = _n_plus_one_app(lambda: db, budget=3).get("/users")
+    assert response.status_code == 200
+    assert response.headers["x-query-count"] == "7"
@@ -0,0 +1,80 @@
+"""
+Tests for the startup schema check and upgrade (app.database.check_schema)
+"""
+
+import pytest
+from alembic.script import ScriptDirectory
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.auth.utils import create_access_token
+from app.database import SCHEMA_MARKERS, Base, _alembic_config, check_schema, get_db
+from app.main import app
+
+BASELINE_TABLES = ["users", "lessons", "system_settings", "audit_logs"]
+
+
+def _engine(tmp_path, name="app.db"):
+    return create_engine(f"sqlite:///{tmp_path / name}")
+
+
+def _baseline_database(engine):
+    """The schema older releases built with create_all: revision bdacb2588e22, never stamped"""
+    Base.metadata.create_all(bind=engine, tables=[Base.metadata.tables[name] for name in BASELINE_TABLES])
+    with engine.begin() as connection:
+        for table in ("users", "lessons"):
+            connection.exec_driver_sql(f"ALTER TABLE {table} DROP COLUMN version_id")
+        for index in ("ix_lessons_status_scheduled", "ix_lessons_teacher_scheduled"):
+            connection.exec_driver_sql(f"DROP INDEX {index}")
+        connection.exec_driver_sql("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL PRIMARY KEY)")
+        connection.exec_driver_sql(
+            "INSERT INTO users (email, username, full_name, hashed_password, is_active, is_teacher, role, "
+            "specializations) VALUES ('tina@example.com', 'tina', 'Tina', 'x', 1, 1, 'INSTRUCTOR', 'Piano, jazz')"
+        )
+
+
+def test_markers_cover_every_migration_in_order():
+    revisions = [script.revision for script in ScriptDirectory.from_config(_alembic_config()).walk_revisions()]
+    assert [revision for revision, _, _ in SCHEMA_MARKERS] == revisions[::-1]
+
+
+def test_new_database_is_created_and_stamped(tmp_path):
+    engine = _engine(tmp_path)
+    assert check_schema(engine) == "created"
+    assert check_schema(engine) == "current"
+    assert "instructor_roles" in inspect(engine).get_table_names()
+
+
+def test_unstamped_baseline_database_is_upgraded_and_boots(tmp_path, monkeypatch):
+    engine = _engine(tmp_path)
+    _baseline_database(engine)
+
+    assert check_schema(engine) == "upgraded"
+    assert check_schema(engine) == "current"
+    with engine.connect() as connection:
+        heads = connection.execute(text("SELECT version_num FROM alembic_version")).scalars().all()
+        assert heads == [SCHEMA_MARKERS[-1][0]]
+        # Data migrations ran too, not just create_all
+        assert connection.execute(text("SELECT role_id FROM instructor_specializations")).scalars().all() == ["piano"]
+
+    db = sessionmaker(bind=engine)()
+    try:
+        monkeypatch.setitem(app.dependency_overrides, get_db, lambda: db)
+        client = TestClient(app, headers={"Authorization": f"Bearer {create_access_token({'sub': 'tina'})}"})
+        response = client.get("/instructor/profile")
+        assert response.status_code == 200, response.text
+        assert response.headers["etag"] == '"1"'
+        assert db.query(models.User).one().version_id == 1
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_refuses_a_foreign_database(tmp_path):
+    engine = _engine(tmp_path)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("CREATE TABLE something_else (id INTEGER PRIMARY KEY)")
+    with pytest.raises(RuntimeError, match="not this application's schema"):
+        check_schema(engine)
@@ -0,0 +1,47 @@
+"""
+Import-time budget for app.main
+
+Every uvicorn worker and every --reload restart pays this cost, so importing
+the application must stay cheap and must not touch the database.
+"""
+
+import os
+import subprocess
+import sys
+
+IMPORT_TIME_BUDGET_SECONDS = float(os.getenv("IMPORT_TIME_BUDGET_SECONDS", "3.0"))
+
+# Only needed once a request (or the job runner) actually uses them
+DEFERRED_MODULES = ("jose", "passlib", "celery", "alembic", "app.tasks", "app.jobs")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _import_app(tmp_path):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'startup.db'}")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line.split("|")
+        if cumulative.strip().isdigit():
+            timings[module.strip()] = int(cumulative) / 1_000_000
+    return timings
+
+
+def test_import_stays_within_budget(tmp_path):
+    _import_app(tmp_path)  # Warm the bytecode cache
+    timings = _import_app(tmp_path)
+
+    assert timings["app.main"] < IMPORT_TIME_BUDGET_SECONDS
+    eager = [name for name in timings if name.split(".")[0] in DEFERRED_MODULES or name in DEFERRED_MODULES]
+    assert eager == []
+
+
+def test_import_does_not_touch_database(tmp_path):
+    _import_app(tmp_path)
+    assert not (tmp_path / "startup.db").exists()
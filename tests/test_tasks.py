@@ -0,0 +1,103 @@
+"""
+Tests for Celery tasks, run eagerly against a SQLite database
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+pytest.importorskip("celery")
+
+from app import models, tasks
+from app.database import Base
+
+
+@pytest.fixture
+def task_engine(tmp_path, monkeypatch):
+    """Point task sessions at a throwaway SQLite file and run tasks eagerly"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'tasks.db'}", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(tasks, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    monkeypatch.setattr(tasks, "engine", engine)
+    monkeypatch.setattr(tasks, "JOB_BACKEND", "celery")
+
+    conf = tasks.celery_app.conf
+    previous = (conf.task_always_eager, conf.task_eager_propagates)
+    conf.task_always_eager = True
+    conf.task_eager_propagates = True
+    yield engine
+    conf.task_always_eager, conf.task_eager_propagates = previous
+    engine.dispose()
+
+
+@pytest.fixture
+def seeded(task_engine):
+    db = tasks.SessionLocal()
+    teacher = models.User(email="t@example.com", username="teacher", full_name="Teacher",
+                          hashed_password="x", role=models.UserRole.INSTRUCTOR, is_teacher=True)
+    student = models.User(email="s@example.com", username="student", full_name="Student",
+                          hashed_password="x", role=models.UserRole.STUDENT)
+    db.add_all([teacher, student])
+    db.commit()
+    now = datetime.utcnow()
+    db.add_all([
+        models.Lesson(title="Soon", teacher_id=teacher.id, student_id=student.id,
+                      scheduled_at=now + timedelta(hours=3)),
+        models.Lesson(title="Later", teacher_id=teacher.id, student_id=student.id,
+                      scheduled_at=now + timedelta(days=3)),
+        models.Lesson(title="Old", teacher_id=teacher.id, student_id=student.id,
+                      scheduled_at=now - timedelta(days=200), status=models.LessonStatus.COMPLETED),
+    ])
+    db.commit()
+    db.close()
+    return task_engine
+
+
+def test_reminders_queue_once_and_trigger_delivery(seeded, monkeypatch):
+    deliveries = []
+    monkeypatch.setattr(tasks.mailer, "deliver_outbox",
+                        lambda db: deliveries.append(1) or {"sent": 1, "retried": 0, "failed": 0})
+
+    assert tasks.send_lesson_reminders.delay().get() == "Queued 1 lesson reminders"
+    # The hourly run must not remind the same lesson twice
+    assert tasks.send_lesson_reminders.delay().get() == "Queued 0 lesson reminders"
+    assert deliveries == [1]
+
+    db = tasks.SessionLocal()
+    outbox = db.query(models.EmailOutbox).one()
+    assert outbox.to_address == "s@example.com"
+    assert "Soon" in outbox.subject
+    db.close()
+
+    # Every task session was returned to the pool
+    assert seeded.pool.checkedout() == 0
+
+
+def test_cleanup_archives_old_lessons(seeded):
+    assert tasks.cleanup_old_lessons.delay().get() == "Archived 1 old lessons"
+    assert seeded.pool.checkedout() == 0
+
+
+def test_task_session_rolls_back_on_error(seeded):
+    with pytest.raises(RuntimeError):
+        with tasks.task_session() as db:
+            db.add(models.SystemSettings(key="scratch", value="1"))
+            db.flush()
+            raise RuntimeError("boom")
+
+    db = tasks.SessionLocal()
+    assert db.query(models.SystemSettings).filter_by(key="scratch").first() is None
+    db.close()
+    assert seeded.pool.checkedout() == 0
+
+
+def test_worker_process_init_replaces_inherited_pool(task_engine):
+    inherited = task_engine.pool
+    with task_engine.connect():
+        pass
+    tasks.init_worker_process()
+    assert task_engine.pool is not inherited
@@ -0,0 +1,112 @@
+"""
+Tests for optimistic concurrency (version columns, ETag and If-Match)
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import crud, models, schemas
+from app.auth.utils import create_access_token
+from app.database import get_db
+from app.main import app
+
+
+@pytest.fixture
+def lesson(db):
+    admin = models.User(username="admin", email="admin@example.com", full_name="Ada Admin",
+                        hashed_password="x", role=models.UserRole.ADMIN)
+    teacher = models.User(username="teacher", email="teacher@example.com", full_name="Tina Teacher",
+                          hashed_password="x", role=models.UserRole.INSTRUCTOR, is_teacher=True)
+    student = models.User(username="student", email="student@example.com", full_name="Sam Student",
+                          hashed_password="x")
+    db.add_all([admin, teacher, student])
+    db.flush()
+    lesson = models.Lesson(title="Piano", teacher_id=teacher.id, student_id=student.id,
+                           scheduled_at=datetime.utcnow() + timedelta(days=1))
+    db.add(lesson)
+    db.commit()
+    return lesson
+
+
+def _client(db, username, monkeypatch):
+    monkeypatch.setitem(app.dependency_overrides, get_db, lambda: db)
+    token = create_access_token({"sub": username})
+    return TestClient(app, headers={"Authorization": f"Bearer {token}"})
+
+
+def test_every_write_path_bumps_the_version(db, lesson):
+    assert lesson.version_id == 1
+
+    updated = crud.update_lesson(db, lesson.id, schemas.LessonUpdate(title="Grand piano"))
+    assert updated.version_id == 2
+
+    lesson.room_number = "B2"  # Unit-of-work flushes go through version_id_col
+    db.commit()
+    assert lesson.version_id == 3
+
+    assert crud.bulk_update_lesson_status(db, [lesson], models.LessonStatus.COMPLETED, updated_by=None,
+                                          audit_action="COMPLETE", audit_details="Done")
+    db.expire_all()
+    assert db.get(models.Lesson, lesson.id).version_id == 4
+
+
+def test_stale_if_match_is_refused(db, lesson, monkeypatch):
+    client = _client(db, "teacher", monkeypatch)
+
+    fetched = client.get(f"/lessons/{lesson.id}")
+    assert fetched.headers["etag"] == '"1"'
+    assert fetched.json()["version_id"] == 1
+
+    first = client.put(f"/lessons/{lesson.id}", json={"title": "Mine"}, headers={"If-Match": '"1"'})
+    assert first.status_code == 200
+    assert first.headers["etag"] == '"2"'
+
+    second = client.put(f"/lessons/{lesson.id}", json={"title": "Lost update"}, headers={"If-Match": '"1"'})
+    assert second.status_code == 412
+    assert second.headers["etag"] == '"2"'
+    db.expire_all()
+    assert db.get(models.Lesson, lesson.id).title == "Mine"
+
+    assert client.put(f"/lessons/{lesson.id}", json={"title": "Weak"},
+                      headers={"If-Match": 'W/"2"'}).status_code == 412
+    assert client.put(f"/lessons/{lesson.id}", json={"title": "Any"}, headers={"If-Match": "*"}).status_code == 200
+    assert client.put(f"/lessons/{lesson.id}", json={"title": "Unconditional"}).status_code == 200
+
+
+def test_instructor_transitions_check_if_match_before_status(db, lesson, monkeypatch):
+    client = _client(db, "teacher", monkeypatch)
+    assert client.get(f"/instructor/lessons/{lesson.id}").headers["etag"] == '"1"'
+
+    stale = client.put(f"/instructor/lessons/{lesson.id}/complete", json={}, headers={"If-Match": '"7"'})
+    assert stale.status_code == 412
+    done = client.put(f"/instructor/lessons/{lesson.id}/complete", json={}, headers={"If-Match": '"1"'})
+    assert done.status_code == 200
+    assert done.json()["lesson"]["version_id"] == 2
+
+    # Someone else completed it after this client fetched version 1
+    assert client.put(f"/instructor/lessons/{lesson.id}/cancel", params={"cancellation_reason": "Ill"},
+                      headers={"If-Match": '"1"'}).status_code == 412
+    assert client.put(f"/instructor/lessons/{lesson.id}", json={"room_number": "C3"},
+                      headers={"If-Match": '"2", "3"'}).status_code == 200
+
+
+def test_user_updates_honour_if_match(db, lesson, monkeypatch):
+    admin = _client(db, "admin", monkeypatch)
+    student_id = lesson.student_id
+    assert admin.get(f"/admin/users/{student_id}").headers["etag"] == '"1"'
+
+    assert admin.put(f"/admin/users/{student_id}", json={"full_name": "Sam S."},
+                     headers={"If-Match": '"1"'}).status_code == 200
+    stale = admin.put(f"/admin/users/{student_id}", json={"full_name": "Samuel"}, headers={"If-Match": '"1"'})
+    assert stale.status_code == 412
+    db.expire_all()
+    assert db.get(models.User, student_id).full_name == "Sam S."
+
+    teacher = _client(db, "teacher", monkeypatch)
+    assert teacher.get("/instructor/profile").headers["etag"] == '"1"'
+    assert teacher.put("/instructor/profile", json={"phone": "555-0100"},
+                       headers={"If-Match": '"0"'}).status_code == 412
+    assert teacher.put("/instructor/profile", json={"phone": "555-0100"},
+                       headers={"If-Match": '"1"'}).headers["etag"] == '"2"'
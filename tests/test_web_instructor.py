@@ -0,0 +1,129 @@
+"""
+Tests for the server-rendered instructor pages
+"""
+
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import models
+from app.api.routers import web_instructor
+from app.auth.utils import create_access_token
+from app.database import get_db
+from app.main import app
+
+
+@pytest.fixture
+def teacher(db):
+    teacher = models.User(username="teacher", email="teacher@example.com", full_name="Tina Teacher",
+                          hashed_password="x", role=models.UserRole.INSTRUCTOR)
+    other = models.User(username="other", email="other@example.com", full_name="Oscar Other",
+                        hashed_password="x", role=models.UserRole.INSTRUCTOR)
+    students = [models.User(username=f"student{n}", email=f"student{n}@example.com", full_name=f"Student {n}",
+                            hashed_password="x", role=models.UserRole.STUDENT) for n in range(3)]
+    db.add_all([teacher, other] + students)
+    db.flush()
+
+    today = datetime.utcnow().replace(hour=10, minute=0, second=0, microsecond=0)
+    lessons = [
+        models.Lesson(title=f"Lesson {n}", teacher_id=teacher.id, student_id=students[n % 3].id,
+                      scheduled_at=today + timedelta(days=n - 50),
+                      status=models.LessonStatus.COMPLETED if n < 50 else models.LessonStatus.SCHEDULED)
+        for n in range(60)
+    ]
+    lessons.append(models.Lesson(title="Not mine", teacher_id=other.id, student_id=students[0].id,
+                                 scheduled_at=today))
+    db.add_all(lessons)
+    db.commit()
+    db.refresh(teacher)
+    return teacher
+
+
+@pytest.fixture
+def client(db, teacher, monkeypatch):
+    monkeypatch.setitem(app.dependency_overrides, get_db, lambda: db)
+    return TestClient(app, headers={"Authorization": f"Bearer {create_access_token({'sub': teacher.username})}"})
+
+
+@pytest.fixture
+def statements(db):
+    executed = []
+    listener = lambda *args: executed.append(args[2])
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    yield executed
+    event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+
+def _titles(html):
+    return re.findall(r'<a href="/web/instructor/lessons/\d+">([^<]+)</a>', html)
+
+
+def test_lessons_page_is_paginated_newest_first(client, statements):
+    first = client.get("/web/instructor/lessons")
+    assert first.status_code == 200
+    assert _titles(first.text)[:2] == ["Lesson 59", "Lesson 58"]
+    assert len(_titles(first.text)) == web_instructor.PAGE_SIZE
+    assert "Page 1 of 3" in first.text
+    assert len(statements) == 3  # The authenticated user, one count, one page
+
+    last = client.get("/web/instructor/lessons", params={"page": 3})
+    assert _titles(last.text) == [f"Lesson {n}" for n in range(9, -1, -1)]
+    assert "Not mine" not in first.text + last.text
+
+    scheduled = client.get("/web/instructor/lessons", params={"status": "scheduled"})
+    assert _titles(scheduled.text) == [f"Lesson {n}" for n in range(59, 49, -1)]
+    assert "Page 1" not in scheduled.text  # A single page needs no pager
+    assert client.get("/instructor/lessons").headers["content-type"] == "application/json"  # The JSON API's
+
+
+def test_schedule_shows_one_date_window(client):
+    response = client.get("/web/instructor/schedule")
+    assert response.status_code == 200
+    assert _titles(response.text) == [f"Lesson {n}" for n in range(50, 57)]
+
+    earlier = client.get("/web/instructor/schedule", params={
+        "start": (datetime.utcnow() - timedelta(days=2)).date().isoformat(), "days": 2
+    })
+    assert _titles(earlier.text) == ["Lesson 48", "Lesson 49"]
+
+
+def test_students_and_reports_use_sql_counts(client, statements):
+    students = client.get("/web/instructor/students")
+    assert students.status_code == 200
+    assert re.findall(r"<td>Student (\d)</td>", students.text) == ["2", "1", "0"]  # Latest lesson first
+    assert "<td>20</td>" in students.text
+
+    statements.clear()
+    reports = client.get("/web/instructor/reports")
+    assert len(statements) == 2  # The authenticated user, then one aggregate
+    figures = re.findall(r'text-gray-800">([^<]+)</div>', reports.text)
+    assert figures == ["60", "50", "10", "83.3%"]
+
+
+def test_lesson_form_offers_only_own_students(db, teacher):
+    stranger = models.User(username="stranger", email="stranger@example.com", full_name="Stella Stranger",
+                           hashed_password="x", role=models.UserRole.STUDENT)
+    db.add(stranger)
+    db.query(models.User).filter(models.User.username == "student1").update({"is_active": False})
+    db.commit()
+
+    students = web_instructor._lesson_form_students(db, teacher)
+    assert [student.username for student in students] == ["student2", "student0"]
+
+
+def test_lessons_of_other_instructors_are_not_found(db, client):
+    other_lesson = db.query(models.Lesson).filter(models.Lesson.title == "Not mine").one()
+    own_lesson = db.query(models.Lesson).filter(models.Lesson.title == "Lesson 3").one()
+
+    assert client.get(f"/web/instructor/lessons/{other_lesson.id}").status_code == 404
+    detail = client.get(f"/web/instructor/lessons/{own_lesson.id}")
+    assert detail.status_code == 200
+    assert "Student 0" in detail.text
+
+
+def test_teacher_schedule_index_exists():
+    indexes = {index.name: [column.name for column in index.columns] for index in models.Lesson.__table__.indexes}
+    assert indexes["ix_lessons_teacher_scheduled"] == ["teacher_id", "scheduled_at"]